@@ -60,7 +60,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    
+
+    # Request latency and SQL metrics, exposed at /api/metrics
+    'core.metrics.MetricsMiddleware',
+
     # CORS
     'corsheaders.middleware.CorsMiddleware',
     
@@ -101,13 +104,40 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+#
+# By default each uwsgi worker keeps a pool of connections shared by
+# its threads (core.backends.pooled_postgresql): Django hands its
+# connection back to the pool at the end of every request, and the
+# pool health checks it before the next request reuses it. The pool
+# opens DB_POOL_MIN_SIZE connections up front and never closes those
+# for idleness. A worker runs UWSGI_THREADS request threads (1 by
+# default, see scripts/run.sh), each holding one connection, plus up
+# to ANALYTICS_QUERY_CONCURRENCY for a dated analytics request, so
+# DB_POOL_MAX_SIZE bounds what they use together. Set DB_POOL=0 to use
+# Django's own persistent connections instead, kept per thread for
+# DB_CONN_MAX_AGE seconds.
+
+DB_POOL = os.environ.get('DB_POOL', '1') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': (
+            'core.backends.pooled_postgresql' if DB_POOL
+            else 'django.db.backends.postgresql'
+        ),
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', 60))
+        ),
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'IDLE_TIMEOUT': float(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        },
     }
 }
 
@@ -162,9 +192,72 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON through orjson, or MessagePack for clients sending
+    # 'Content-Type'/'Accept: application/msgpack'.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'TEST_REQUEST_RENDERER_CLASSES': [
+        'rest_framework.renderers.MultiPartRenderer',
+        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.MessagePackRenderer',
+    ],
 }
 
+# Caches
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+#
+# The 'analytics' cache holds dashboard responses. It is local memory
+# (LRU culled at MAX_ENTRIES) by default; set ANALYTICS_CACHE_BACKEND to
+# e.g. django.core.cache.backends.filebased.FileBasedCache or
+# django.core.cache.backends.db.DatabaseCache (after running
+# 'manage.py createcachetable') to share it between workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'analytics': {
+        'BACKEND': os.environ.get(
+            'ANALYTICS_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('ANALYTICS_CACHE_LOCATION', 'analytics'),
+        'TIMEOUT': int(os.environ.get('ANALYTICS_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('ANALYTICS_CACHE_ENTRIES', 1000)),
+        },
+    },
+}
+
+# Most database connections one request may use to aggregate the Full
+# Orders of a period concurrently, one range of months on each (1 runs
+# a single query). With DB_POOL=1 they come from the worker's pool, so
+# DB_POOL_MAX_SIZE should allow for them.
+ANALYTICS_QUERY_CONCURRENCY = int(
+    os.environ.get('ANALYTICS_QUERY_CONCURRENCY', 3))
+
+# Number of postcode ids each worker keeps in its ingest LRU cache.
+POSTCODE_CACHE_SIZE = int(os.environ.get('POSTCODE_CACHE_SIZE', 100000))
+
+# Directory bulk creates with 'async=true' are spooled to until an
+# ingest worker ('manage.py run_ingest_jobs') writes them.
+INGEST_SPOOL_DIR = os.environ.get('INGEST_SPOOL_DIR', '/vol/web/spool')
+
+# Seconds a running ingest job may go without committing a chunk
+# before another worker takes it over.
+INGEST_JOB_HEARTBEAT_TIMEOUT = int(
+    os.environ.get('INGEST_JOB_HEARTBEAT_TIMEOUT', 600))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
 }
\ No newline at end of file
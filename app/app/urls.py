@@ -23,6 +23,9 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import metrics
+from core.metrics import METRICS_VIEW_NAME
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -32,7 +35,8 @@ urlpatterns = [
         SpectacularSwaggerView.as_view(url_name='api-schema'),
         name='api-docs'
     ),
-    path('api/orders/', include('orders.urls'))
+    path('api/orders/', include('orders.urls')),
+    path('api/metrics', metrics, name=METRICS_VIEW_NAME)
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,76 @@
+"""
+PostgreSQL backend whose connections come from a per-worker pool.
+
+Django still opens and closes its (thread local) connection once per
+request with CONN_MAX_AGE = 0, but 'closing' returns the underlying
+psycopg2 connection to the pool and 'opening' takes one from it, so
+threads of a worker share a bounded set of live connections. The
+pool opens MIN_SIZE connections when the worker first connects, and
+tops itself up to that many whenever Django opens a connection.
+
+Configure the pool with a 'POOL' dict in the database settings:
+
+    'POOL': {
+        'MIN_SIZE': 1,        # connections opened up front and kept open
+        'MAX_SIZE': 10,       # connections per worker process
+        'IDLE_TIMEOUT': 300,  # seconds before an idle one is closed
+        'TIMEOUT': 30,        # seconds to wait for a free connection
+    }
+"""
+
+from django.db.backends.postgresql import base, creation
+
+from core.backends.pooled_postgresql.pool import get_pool, close_pools
+
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 0,
+    'MAX_SIZE': 10,
+    'IDLE_TIMEOUT': 300,
+    'TIMEOUT': 30,
+}
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would keep it
+        # from being dropped.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    @property
+    def pool(self):
+        options = {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+        params = self.get_connection_params()
+
+        return get_pool(
+            (self.alias, repr(sorted(params.items()))),
+            min_size=options['MIN_SIZE'],
+            max_size=options['MAX_SIZE'],
+            idle_timeout=options['IDLE_TIMEOUT'],
+            timeout=options['TIMEOUT']
+        )
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+
+        def connect():
+            return super(DatabaseWrapper, self).get_new_connection(
+                conn_params)
+
+        pool.fill(connect)
+        connection = pool.getconn(connect)
+        # Set by the parent for new connections only.
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,247 @@
+"""
+Thread-safe pool of psycopg2 connections for one uwsgi worker.
+
+Threads check a connection out for the length of a request and
+return it afterwards, so a worker keeps at most 'max_size' open
+connections however many threads it runs, and short requests skip
+the connection handshake. 'min_size' connections are opened ahead
+of the first checkout and kept open however long they sit unused;
+others are closed after 'idle_timeout' seconds unused. Connections
+are health checked when they are checked out.
+"""
+
+from collections import deque
+from time import monotonic
+import os
+import threading
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_UNKNOWN
+)
+
+
+class PoolTimeout(OperationalError):
+    """Raised when no connection is free within the pool timeout."""
+
+
+class ConnectionPool:
+    """A bounded LIFO pool of database connections."""
+
+    def __init__(self, min_size=0, max_size=10, idle_timeout=300.0,
+                 timeout=30.0):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError('Pool sizes must satisfy 0 <= min <= max >= 1.')
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.pid = os.getpid()
+
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+        self._counters = dict.fromkeys((
+            'connections_created', 'connections_closed', 'checkouts',
+            'timeouts', 'health_check_failures'), 0)
+
+    def _discard(self, conn):
+        """Close a connection and free its slot. Needs the lock."""
+
+        self._size -= 1
+        self._counters['connections_closed'] += 1
+        self._condition.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _prune(self):
+        """Close connections idle for too long. Needs the lock."""
+
+        expired = monotonic() - self.idle_timeout
+        # The oldest connections are at the left of the deque.
+        while (self._idle and self._size > self.min_size
+               and self._idle[0][1] < expired):
+            conn, _ = self._idle.popleft()
+            self._discard(conn)
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception:
+            return False
+        # The ping opens a transaction unless autocommit is on.
+        if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+        return True
+
+    def fill(self, connect):
+        """Open idle connections with 'connect()' up to 'min_size'."""
+
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+
+            try:
+                conn = connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                raise
+
+            with self._condition:
+                self._counters['connections_created'] += 1
+                self._idle.append((conn, monotonic()))
+                self._condition.notify()
+
+    def getconn(self, connect):
+        """
+        Return an idle connection, or one made with 'connect()' if
+        the pool is not full. Waits up to 'timeout' seconds otherwise.
+        """
+
+        deadline = monotonic() + self.timeout
+
+        while True:
+            with self._condition:
+                self._prune()
+
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                elif self._size < self.max_size:
+                    conn = None
+                    self._size += 1
+                else:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            f'No database connection free after '
+                            f'{self.timeout} seconds '
+                            f'({self.max_size} in use).')
+                    self._waiting += 1
+                    self._condition.wait(remaining)
+                    self._waiting -= 1
+                    continue
+
+            if conn is None:
+                try:
+                    conn = connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._counters['connections_created'] += 1
+                    self._counters['checkouts'] += 1
+                return conn
+
+            if self._is_healthy(conn):
+                with self._condition:
+                    self._counters['checkouts'] += 1
+                return conn
+
+            with self._condition:
+                self._counters['health_check_failures'] += 1
+                self._discard(conn)
+
+    def putconn(self, conn):
+        """Return a connection, rolling back any open transaction."""
+
+        healthy = not conn.closed
+        if healthy:
+            status = conn.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                healthy = False
+            elif status != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except Exception:
+                    healthy = False
+
+        with self._condition:
+            if healthy:
+                self._idle.append((conn, monotonic()))
+                self._condition.notify()
+            else:
+                self._discard(conn)
+            self._prune()
+
+    def closeall(self):
+        """Close every idle connection."""
+
+        with self._condition:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+
+    def stats(self):
+        """Return the pool sizes and counters, for monitoring."""
+
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self._counters,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, **options):
+    """
+    Return the pool for 'key', an (alias, connection parameters)
+    tuple, creating it on first use. Pools are never shared with a
+    forked child process.
+    """
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(**options)
+        return pool
+
+
+def all_pools():
+    """Return (key, pool) for every pool of this process."""
+
+    with _pools_lock:
+        return [
+            (key, pool) for key, pool in _pools.items()
+            if pool.pid == os.getpid()
+        ]
+
+
+def close_pools():
+    """Close the idle connections of every pool in this process."""
+
+    for _, pool in all_pools():
+        pool.closeall()
+
+
+def pool_stats():
+    """Return the stats of every pool, keyed by database alias."""
+
+    stats = {}
+    for (alias, _), pool in all_pools():
+        for name, value in pool.stats().items():
+            stats.setdefault(alias, {}).setdefault(name, 0)
+            stats[alias][name] += value
+    return stats
@@ -0,0 +1,40 @@
+"""
+Django command to compare the JSON, orjson and MessagePack
+renderers and parsers on a large order payload.
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.benchmarks import benchmark_codecs
+
+
+class Command(BaseCommand):
+    """Print encode/decode throughput of each codec."""
+
+    help = 'Benchmark the API renderers and parsers on order payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=100000,
+            help='Number of orders in the payload.'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per codec; the fastest is reported.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        results = benchmark_codecs(options['orders'], options['repeat'])
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name}: {result["bytes"] / 1e6:.1f} MB, '
+                f'encode {result["encode_orders_per_s"]} orders/s, '
+                f'decode {result["decode_orders_per_s"]} orders/s'
+            )
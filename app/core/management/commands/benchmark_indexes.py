@@ -0,0 +1,154 @@
+"""
+Django command to show the query plans of the analytics filters
+on 'toothbrush_type', with and without their expression indexes.
+
+Run it against a large data set, e.g.
+
+    python manage.py benchmark_indexes --compare
+
+to print the scan types and timings of each query once with the
+indexes in place and once with them dropped inside a transaction
+that is rolled back afterwards.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import FullOrder, NullOrder, TodaysOrder
+
+from orders.aggregations import build_query
+
+
+FILTER = 'UPPER(toothbrush_type) = UPPER(%s)'
+
+# (label, model, SQL) of the order table queries the API runs with
+# a 'toothbrush_type' filter. {table} is the model's table.
+BENCHMARK_QUERIES = (
+    (
+        'todays orders count',
+        TodaysOrder,
+        f'SELECT COUNT(*) FROM {{table}} WHERE {FILTER}'
+    ),
+    (
+        'null orders count',
+        NullOrder,
+        f'SELECT COUNT(id) FROM {{table}} WHERE {FILTER}'
+    ),
+    (
+        'full orders by customer age',
+        FullOrder,
+        f'SELECT customer_age, COUNT(*) FROM {{table}} WHERE {FILTER} '
+        'GROUP BY customer_age'
+    ),
+    (
+        'full orders by delivery status',
+        FullOrder,
+        f'SELECT delivery_status, COUNT(*) FROM {{table}} WHERE {FILTER} '
+        'GROUP BY delivery_status'
+    ),
+    (
+        'latest full orders',
+        FullOrder,
+        f'SELECT * FROM {{table}} WHERE {FILTER} '
+        'ORDER BY order_date DESC LIMIT 100'
+    ),
+)
+
+
+def expression_indexes(model):
+    """Return the names of the model's expression indexes."""
+
+    return [
+        index.name for index in model._meta.indexes
+        if index.contains_expressions
+    ]
+
+
+def scan_nodes(plan):
+    """Yield (node type, index name) for every scan in a plan tree."""
+
+    if 'Scan' in plan['Node Type']:
+        yield plan['Node Type'], plan.get('Index Name')
+
+    for child in plan.get('Plans', ()):
+        yield from scan_nodes(child)
+
+
+def explain(cursor, sql, params, analyze):
+    options = 'ANALYZE, BUFFERS, FORMAT JSON' if analyze else 'FORMAT JSON'
+    cursor.execute(f'EXPLAIN ({options}) {sql}', params)
+
+    result = cursor.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+class Command(BaseCommand):
+    """Print the plans of the toothbrush type filters."""
+
+    help = 'Show the query plans of the toothbrush_type filters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--toothbrush-type',
+            default='Toothbrush 2000',
+            help='Toothbrush type to filter on.'
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help='Also run every query with the indexes dropped.'
+        )
+        parser.add_argument(
+            '--no-analyze',
+            action='store_false',
+            dest='analyze',
+            help='Only plan the queries, without running them.'
+        )
+
+    def queries(self, toothbrush_type):
+        for label, model, sql in BENCHMARK_QUERIES:
+            table = connection.ops.quote_name(model._meta.db_table)
+            yield label, sql.format(table=table), [toothbrush_type]
+
+        sql, params = build_query(toothbrush_type)
+        yield 'full data aggregation', sql, params
+
+    def report(self, toothbrush_type, analyze):
+        with connection.cursor() as cursor:
+            for label, sql, params in self.queries(toothbrush_type):
+                result = explain(cursor, sql, params, analyze)
+                scans = ', '.join(
+                    f'{node} using {index}' if index else node
+                    for node, index in scan_nodes(result['Plan'])
+                )
+
+                line = f'{label}: {scans}'
+                if analyze:
+                    line += f' ({result["Execution Time"]:.2f} ms)'
+                self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        toothbrush_type = options['toothbrush_type']
+
+        self.stdout.write(self.style.MIGRATE_HEADING('With indexes'))
+        self.report(toothbrush_type, options['analyze'])
+
+        if not options['compare']:
+            return
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Without indexes'))
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in (FullOrder, NullOrder, TodaysOrder):
+                for name in expression_indexes(model):
+                    cursor.execute(
+                        f'DROP INDEX {connection.ops.quote_name(name)}')
+
+            self.report(toothbrush_type, options['analyze'])
+            transaction.set_rollback(True)
@@ -0,0 +1,48 @@
+"""
+Django command to create the monthly Full Order partitions
+of the coming months.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.partitions import ensure_partitions, MONTHS_AHEAD
+
+
+class Command(BaseCommand):
+    """Create missing Full Order partitions."""
+
+    help = ('Create the Full Order partitions of the coming months and '
+            'move orders out of the default partition.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=MONTHS_AHEAD,
+            help='Months after the current one to create partitions for.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Keep running, checking again every this many seconds.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        while True:
+            close_old_connections()
+            created = ensure_partitions(
+                months_ahead=options['months_ahead'])
+
+            for name in created:
+                self.stdout.write(f'Created partition {name}')
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(created)} partitions created.'))
+
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,74 @@
+"""
+Django command to load synthetic orders for benchmarking,
+e.g. 'python manage.py generate_orders --rows 1m'.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.generator import (
+    generate_orders,
+    parse_row_count,
+    CHUNK_SIZE
+)
+from orders.importer import ORDER_MODELS
+
+
+class Command(BaseCommand):
+    """Generate Full, Todays or Null orders."""
+
+    help = 'Generate synthetic orders (e.g. 10k, 1m or 10m rows).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            default='10k',
+            help='Number of orders per order type, e.g. 10k, 1m, 10m.'
+        )
+        parser.add_argument(
+            '--order-type',
+            action='append',
+            dest='order_types',
+            choices=sorted(ORDER_MODELS),
+            help='Order table to fill (repeatable, default all).'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed, for reproducible data sets.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Orders generated and copied per transaction.'
+        )
+        parser.add_argument(
+            '--postcodes',
+            type=int,
+            default=10000,
+            help='Number of distinct postcodes to share between orders.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        try:
+            rows = parse_row_count(options['rows'])
+        except ValueError:
+            raise CommandError(f'Invalid row count: {options["rows"]}')
+
+        for order_type in options['order_types'] or sorted(ORDER_MODELS):
+            self.stdout.write(f'Generating {rows} {order_type} orders...')
+
+            counts = generate_orders(
+                rows,
+                order_type,
+                seed=options['seed'],
+                chunk_size=options['chunk_size'],
+                postcodes=options['postcodes'],
+                progress=lambda done: self.stdout.write(f'  {done}/{rows}')
+            )
+
+            self.stdout.write(self.style.SUCCESS(
+                ', '.join(f'{key}: {value}' for key, value in counts.items())
+            ))
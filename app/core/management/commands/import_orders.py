@@ -0,0 +1,53 @@
+"""
+Django command to bulk import orders from a CSV or NDJSON file
+through Postgres COPY.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.importer import (
+    import_orders,
+    guess_file_format,
+    ImportFileError,
+    ORDER_MODELS,
+    FILE_FORMATS
+)
+
+
+class Command(BaseCommand):
+    """Import an order file into Full, Todays or Null orders."""
+
+    help = 'Bulk import orders from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import.')
+        parser.add_argument(
+            '--order-type',
+            choices=sorted(ORDER_MODELS),
+            default='full',
+            help='Order table to import into.'
+        )
+        parser.add_argument(
+            '--file-format',
+            choices=FILE_FORMATS,
+            help='File format (guessed from the extension if omitted).'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        path = options['path']
+        file_format = options['file_format'] or guess_file_format(path)
+
+        self.stdout.write(f'Importing {path}...')
+
+        try:
+            with open(path, 'rb') as stream:
+                counts = import_orders(
+                    stream, options['order_type'], file_format)
+        except (OSError, ImportFileError) as e:
+            raise CommandError(e)
+
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{key}: {value}' for key, value in counts.items())
+        ))
@@ -0,0 +1,29 @@
+"""
+Django command to rebuild the Full Order rollup tables
+from the raw orders, e.g. after a backfill.
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    """Recompute dashboard rollups from scratch."""
+
+    help = 'Rebuild the Full Order rollup tables from the raw orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--toothbrush-type',
+            action='append',
+            dest='toothbrush_types',
+            help='Only rebuild this toothbrush type (repeatable).'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        self.stdout.write('Rebuilding rollups...')
+        rebuild_rollups(options['toothbrush_types'])
+        self.stdout.write(self.style.SUCCESS('Rollups rebuilt!'))
@@ -0,0 +1,23 @@
+"""
+Django command to move Todays Orders into Full and Null Orders
+at the end of the day.
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.rollover import rollover_todays_orders
+
+
+class Command(BaseCommand):
+    """Roll Todays Orders over into Full and Null Orders."""
+
+    help = 'Move Todays Orders into Full/Null Orders and empty the table.'
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        self.stdout.write('Rolling over Todays Orders...')
+        counts = rollover_todays_orders()
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{key}: {value}' for key, value in counts.items())
+        ))
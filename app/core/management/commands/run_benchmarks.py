@@ -0,0 +1,110 @@
+"""
+Django command to benchmark every Orders API endpoint, e.g.
+
+    python manage.py run_benchmarks --output baseline.json
+    python manage.py run_benchmarks --compare baseline.json
+
+Load a data set with 'generate_orders' first.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.benchmarks import (
+    run_benchmarks,
+    compare,
+    ENDPOINTS,
+    DEFAULT_THRESHOLD
+)
+
+
+class Command(BaseCommand):
+    """Record endpoint latency, SQL counts and memory."""
+
+    help = 'Benchmark the Orders API endpoints against the current data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=20,
+            help='Requests per endpoint (at least 2).'
+        )
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            choices=[endpoint.name for endpoint in ENDPOINTS],
+            help='Only benchmark this endpoint (repeatable).'
+        )
+        parser.add_argument(
+            '--warm-cache',
+            action='store_true',
+            help='Keep the analytics cache between requests.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results to this JSON baseline file.'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Baseline file to check the results against.'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=DEFAULT_THRESHOLD,
+            help='Relative slowdown reported as a regression (0.2 = 20%%).'
+        )
+
+    def progress(self, name, result):
+        if result is None:
+            self.stdout.write(f'{name}: skipped (no rows)')
+            return
+
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{name}: p50 {latency["p50"]:.1f} ms, '
+            f'p95 {latency["p95"]:.1f} ms, p99 {latency["p99"]:.1f} ms, '
+            f'{result["queries"]} queries, '
+            f'{result["peak_memory_kb"]:.0f} KB peak'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(e)
+
+        try:
+            results = run_benchmarks(
+                iterations=options['iterations'],
+                names=options['endpoints'],
+                warm_cache=options['warm_cache'],
+                progress=self.progress
+            )
+        except (ValueError, RuntimeError) as e:
+            raise CommandError(e)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+        if baseline is None:
+            return
+
+        regressions = compare(baseline, results, options['threshold'])
+
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f'{len(regressions)} regression(s) found.')
+
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
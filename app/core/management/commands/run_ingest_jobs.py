@@ -0,0 +1,53 @@
+"""
+Django command running an ingest worker, which writes the bulk
+uploads queued with 'async=true'.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from orders.jobs import claim_job, run_job
+
+
+class Command(BaseCommand):
+    """Process queued ingest jobs."""
+
+    help = 'Ingest queued bulk order uploads, one job at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no job is waiting instead of polling.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between checks for new jobs.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+
+        while True:
+            close_old_connections()
+            job = claim_job()
+
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running ingest job {job.pk}...')
+            run_job(job)
+
+            style = (self.style.SUCCESS if job.status == job.SUCCEEDED
+                     else self.style.ERROR)
+            self.stdout.write(style(
+                f'Ingest job {job.pk} {job.status}: '
+                f'{job.processed_rows} rows, {job.rejected_rows} rejected'
+            ))
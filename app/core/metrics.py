@@ -0,0 +1,278 @@
+"""
+Prometheus metrics for every API request.
+
+MetricsMiddleware times each request and installs a database
+'execute_wrapper' that counts the SQL statements the request runs
+and the time spent in them. A streaming response keeps the wrapper
+installed while its content is consumed, so the queries of an export
+are counted too, and its request is recorded once the stream ends.
+DRF responses also record how long they took to render, and
+serializers built on TimedDataMixin how long their '.data' took.
+Metrics are labelled with the URL name of the view.
+
+Under uwsgi each worker is a separate process. When the
+PROMETHEUS_MULTIPROC_DIR environment variable is set (see
+'scripts/run.sh'), every worker writes its samples to that directory
+and '/api/metrics' reports the sum over all workers.
+
+The connection pool of each worker (see core.backends) is reported
+as gauges, refreshed after every request.
+"""
+
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+import os
+import threading
+
+from django.db import connections
+
+from rest_framework import serializers
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess
+)
+
+from core.backends.pooled_postgresql.pool import pool_stats
+
+
+METRICS_VIEW_NAME = 'api-metrics'
+
+LABELS = ('view', 'method')
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Time spent handling a request.',
+    LABELS
+)
+REQUESTS = Counter(
+    'http_requests',
+    'Requests handled, by response status.',
+    LABELS + ('status',)
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_sql_queries',
+    'SQL statements executed per request.',
+    LABELS,
+    buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_SQL_TIME = Histogram(
+    'http_request_sql_duration_seconds',
+    'Time spent in SQL statements per request.',
+    LABELS
+)
+SQL_QUERIES = Counter(
+    'sql_queries',
+    'SQL statements executed.',
+    LABELS
+)
+SQL_TIME = Counter(
+    'sql_duration_seconds',
+    'Time spent in SQL statements.',
+    LABELS
+)
+RENDER_TIME = Histogram(
+    'http_response_render_duration_seconds',
+    'Time spent rendering a response.',
+    LABELS
+)
+SERIALIZE_TIME = Histogram(
+    'http_response_serialize_duration_seconds',
+    "Time spent building serializers' data per request.",
+    LABELS
+)
+
+POOL_STATES = ('idle', 'in_use')
+POOL_EVENTS = ('connections_created', 'connections_closed', 'checkouts',
+               'timeouts', 'health_check_failures')
+
+POOL_CONNECTIONS = Gauge(
+    'db_pool_connections',
+    'Pooled database connections, by state.',
+    ('alias', 'state'),
+    multiprocess_mode='livesum'
+)
+POOL_WAITING = Gauge(
+    'db_pool_waiting_threads',
+    'Threads waiting for a pooled database connection.',
+    ('alias',),
+    multiprocess_mode='livesum'
+)
+POOL_EVENT_COUNTS = Gauge(
+    'db_pool_events',
+    'Connection pool events since each live worker started.',
+    ('alias', 'event'),
+    multiprocess_mode='livesum'
+)
+
+
+class QueryRecorder:
+    """Database execute wrapper counting statements and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # Queries of one request may run on several threads.
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            with self.lock:
+                self.count += 1
+                self.duration += duration
+
+
+class SerializeTimer:
+    """Time spent building serializer data during one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# The timer of the request being handled, set by MetricsMiddleware.
+serialize_timer = ContextVar('serialize_timer', default=None)
+
+
+class TimedDataMixin:
+    """
+    Serializer mixin adding the time taken by '.data' to the timer of
+    the current request. Nested serializers only run
+    'to_representation', so each response is timed once.
+    """
+
+    @property
+    def data(self):
+        start = perf_counter()
+        try:
+            return super().data
+        finally:
+            timer = serialize_timer.get()
+            if timer is not None:
+                timer.count += 1
+                timer.duration += perf_counter() - start
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    """List serializer timing its '.data'."""
+
+
+@contextmanager
+def recording(recorder):
+    """Install the recorder on every database connection."""
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+def metrics_registry():
+    """Return the registry to expose, merging workers if configured."""
+
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def update_pool_metrics():
+    for alias, stats in pool_stats().items():
+        for state in POOL_STATES:
+            POOL_CONNECTIONS.labels(alias, state).set(stats[state])
+        POOL_WAITING.labels(alias).set(stats['waiting'])
+        for event in POOL_EVENTS:
+            POOL_EVENT_COUNTS.labels(alias, event).set(stats[event])
+
+
+def render_metrics():
+    update_pool_metrics()
+    return generate_latest(metrics_registry())
+
+
+class MetricsMiddleware:
+    """Record latency and SQL metrics for every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        timer = SerializeTimer()
+        start = perf_counter()
+
+        token = serialize_timer.set(timer)
+        try:
+            with recording(recorder):
+                response = self.get_response(request)
+        finally:
+            serialize_timer.reset(token)
+
+        view = view_label(request)
+
+        if view == METRICS_VIEW_NAME:
+            return response
+
+        labels = (view, request.method, response.status_code)
+
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, labels, recorder, start)
+        else:
+            self.record(labels, recorder, start)
+        if timer.count:
+            SERIALIZE_TIME.labels(*labels[:2]).observe(timer.duration)
+
+        return response
+
+    def stream(self, content, labels, recorder, start):
+        """Yield the content, recording the request once it ends."""
+
+        try:
+            with recording(recorder):
+                yield from content
+        finally:
+            self.record(labels, recorder, start)
+
+    def record(self, labels, recorder, start):
+        view, method, status_code = labels
+        labels = (view, method)
+
+        REQUEST_LATENCY.labels(*labels).observe(perf_counter() - start)
+        REQUESTS.labels(*labels, status_code).inc()
+        REQUEST_QUERIES.labels(*labels).observe(recorder.count)
+        REQUEST_SQL_TIME.labels(*labels).observe(recorder.duration)
+        SQL_QUERIES.labels(*labels).inc(recorder.count)
+        SQL_TIME.labels(*labels).inc(recorder.duration)
+        update_pool_metrics()
+
+    def process_template_response(self, request, response):
+        """Time the render() Django runs on DRF responses."""
+
+        start = perf_counter()
+
+        def record(response):
+            RENDER_TIME.labels(view_label(request), request.method).observe(
+                perf_counter() - start)
+
+        response.add_post_render_callback(record)
+        return response
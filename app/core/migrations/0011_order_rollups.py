@@ -0,0 +1,59 @@
+# Generated by Django 4.0.8 on 2026-10-17 09:00
+
+import datetime
+from django.db import migrations, models
+
+
+def rollup_fields():
+    return [
+        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+        ('toothbrush_type', models.CharField(max_length=20)),
+        ('order_count', models.BigIntegerField(default=0)),
+        ('order_quantity_sum', models.BigIntegerField(default=0)),
+        ('customer_age_sum', models.BigIntegerField(default=0)),
+        ('customer_age_min', models.IntegerField(null=True)),
+        ('customer_age_max', models.IntegerField(null=True)),
+        ('delivery_delta_sum', models.DurationField(default=datetime.timedelta)),
+        ('delivery_delta_min', models.DurationField(null=True)),
+        ('delivery_delta_max', models.DurationField(null=True)),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_remove_deliverypostcode_country_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostcodeAreaRollup',
+            fields=rollup_fields() + [
+                ('postcode_area', models.CharField(default='', max_length=5)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CustomerAgeRollup',
+            fields=rollup_fields() + [
+                ('customer_age', models.IntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DeliveryStatusRollup',
+            fields=rollup_fields() + [
+                ('delivery_status', models.CharField(max_length=30)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postcodearearollup',
+            constraint=models.UniqueConstraint(fields=('toothbrush_type', 'postcode_area'), name='unique_postcode_area_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='customeragerollup',
+            constraint=models.UniqueConstraint(fields=('toothbrush_type', 'customer_age'), name='unique_customer_age_rollup'),
+        ),
+        migrations.AddConstraint(
+            model_name='deliverystatusrollup',
+            constraint=models.UniqueConstraint(fields=('toothbrush_type', 'delivery_status'), name='unique_delivery_status_rollup'),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.0.8 on 2026-10-17 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+ORDER_TABLES = ('core_fullorder', 'core_todaysorder', 'core_nullorder')
+
+
+def merge_duplicates_sql(postcode_table, column):
+    """
+    Point every order at the lowest id of each postcode,
+    keep any known postcode area, and delete the duplicates.
+
+    Foreign key checks run immediately so no trigger events are
+    left pending when the unique constraint is added afterwards.
+    """
+
+    statements = [
+        'SET CONSTRAINTS ALL IMMEDIATE',
+        f"""
+        UPDATE {postcode_table} keep
+        SET postcode_area = dup.postcode_area
+        FROM (
+            SELECT postcode, MAX(postcode_area) AS postcode_area
+            FROM {postcode_table}
+            GROUP BY postcode
+        ) dup
+        WHERE keep.postcode = dup.postcode
+          AND keep.postcode_area IS NULL
+        """
+    ]
+
+    for order_table in ORDER_TABLES:
+        statements.append(
+            f"""
+            UPDATE {order_table} o
+            SET {column} = canonical.keep_id
+            FROM (
+                SELECT id, MIN(id) OVER (PARTITION BY postcode) AS keep_id
+                FROM {postcode_table}
+            ) canonical
+            WHERE o.{column} = canonical.id
+              AND canonical.id <> canonical.keep_id
+            """
+        )
+
+    statements.append(
+        f"""
+        DELETE FROM {postcode_table} dup
+        USING {postcode_table} keep
+        WHERE dup.postcode = keep.postcode
+          AND dup.id > keep.id
+        """
+    )
+
+    return statements
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_order_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fullorder',
+            name='billing_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='full_billing_pc', to='core.billingpostcode'),
+        ),
+        migrations.AlterField(
+            model_name='fullorder',
+            name='delivery_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='full_delivery_pc', to='core.deliverypostcode'),
+        ),
+        migrations.AlterField(
+            model_name='nullorder',
+            name='billing_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='null_billing_pc', to='core.billingpostcode'),
+        ),
+        migrations.AlterField(
+            model_name='nullorder',
+            name='delivery_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='null_delivery_pc', to='core.deliverypostcode'),
+        ),
+        migrations.AlterField(
+            model_name='todaysorder',
+            name='billing_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='today_billing_pc', to='core.billingpostcode'),
+        ),
+        migrations.AlterField(
+            model_name='todaysorder',
+            name='delivery_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='today_delivery_pc', to='core.deliverypostcode'),
+        ),
+        migrations.RunSQL(
+            merge_duplicates_sql('core_deliverypostcode', 'delivery_postcode_id'),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            merge_duplicates_sql('core_billingpostcode', 'billing_postcode_id'),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='billingpostcode',
+            name='postcode',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='deliverypostcode',
+            name='postcode',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+    ]
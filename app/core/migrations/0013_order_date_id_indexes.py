@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-17 11:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Build the indexes without locking the order tables for writes.
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_shared_postcodes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='fullorder',
+            index=models.Index(fields=['order_date', 'id'], name='fullorder_order_date_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='nullorder',
+            index=models.Index(fields=['order_date', 'id'], name='nullorder_order_date_id_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='todaysorder',
+            index=models.Index(fields=['order_date', 'id'], name='todaysorder_order_date_id_idx'),
+        ),
+    ]
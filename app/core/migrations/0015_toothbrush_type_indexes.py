@@ -0,0 +1,54 @@
+# Generated by Django 4.0.8 on 2026-10-17 12:00
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    # Build the indexes without locking the order tables for writes.
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_dataversion'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='fullorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('customer_age'), name='fullorder_tb_type_age_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='fullorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('order_date'), name='fullorder_tb_type_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='fullorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('delivery_status'), name='fullorder_tb_type_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='nullorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('customer_age'), name='nullorder_tb_type_age_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='nullorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('order_date'), name='nullorder_tb_type_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='nullorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('delivery_status'), name='nullorder_tb_type_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='todaysorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('customer_age'), name='todaysorder_tb_type_age_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='todaysorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('order_date'), name='todaysorder_tb_type_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='todaysorder',
+            index=models.Index(django.db.models.functions.text.Upper('toothbrush_type'), models.F('delivery_status'), name='todaysorder_tb_type_status_idx'),
+        ),
+    ]
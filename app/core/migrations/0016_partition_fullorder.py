@@ -0,0 +1,127 @@
+# Generated by Django 4.0.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+from core.partitions import ensure_partitions, DEFAULT_PARTITION
+
+
+FULL_ORDER_TABLE = 'core_fullorder'
+OLD_TABLE = 'core_fullorder_old'
+
+ORDER_NUMBER_DATE_KEY = models.UniqueConstraint(
+    fields=['order_number', 'order_date'],
+    name='fullorder_order_number_date_key'
+)
+
+
+def copy_table(schema_editor, partitioned):
+    """
+    Rebuild 'core_fullorder' as a new table holding the same rows,
+    partitioned by month of 'order_date' or not. The id sequence is
+    handed over to the new table.
+    """
+
+    execute = schema_editor.execute
+    quote = schema_editor.quote_name
+
+    execute(f'ALTER TABLE {quote(FULL_ORDER_TABLE)} '
+            f'RENAME TO {quote(OLD_TABLE)}')
+    execute(
+        f'CREATE TABLE {quote(FULL_ORDER_TABLE)} '
+        f'(LIKE {quote(OLD_TABLE)} INCLUDING DEFAULTS)' +
+        (' PARTITION BY RANGE (order_date)' if partitioned else '')
+    )
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)',
+                       [OLD_TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+        execute(f'ALTER SEQUENCE {sequence} '
+                f'OWNED BY {quote(FULL_ORDER_TABLE)}.id')
+
+        if partitioned:
+            execute(f'CREATE TABLE {quote(DEFAULT_PARTITION)} '
+                    f'PARTITION OF {quote(FULL_ORDER_TABLE)} DEFAULT')
+            cursor.execute(
+                f'SELECT MIN(order_date) FROM {quote(OLD_TABLE)}')
+            ensure_partitions(schema_editor.connection,
+                              start=cursor.fetchone()[0])
+
+    execute(f'INSERT INTO {quote(FULL_ORDER_TABLE)} '
+            f'SELECT * FROM {quote(OLD_TABLE)}')
+    execute(f'DROP TABLE {quote(OLD_TABLE)}')
+
+
+def add_indexes(schema_editor, model):
+    """
+    Add the foreign keys and indexes Django created for the model.
+    On a partitioned table they are built on every partition.
+    """
+
+    for field in model._meta.local_fields:
+        if field.remote_field is not None:
+            schema_editor.execute(
+                schema_editor._create_index_sql(model, fields=[field]))
+            schema_editor.execute(schema_editor._create_fk_sql(
+                model, field, '_fk_%(to_table)s_%(to_column)s'))
+
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def partition_full_orders(apps, schema_editor):
+    model = apps.get_model('core', 'FullOrder')
+    quote = schema_editor.quote_name
+
+    copy_table(schema_editor, partitioned=True)
+
+    # Keys of a partitioned table must include the partition key.
+    schema_editor.execute(f'ALTER TABLE {quote(FULL_ORDER_TABLE)} '
+                          f'ADD PRIMARY KEY (id, order_date)')
+    schema_editor.add_constraint(model, ORDER_NUMBER_DATE_KEY)
+    add_indexes(schema_editor, model)
+
+
+def unpartition_full_orders(apps, schema_editor):
+    model = apps.get_model('core', 'FullOrder')
+    quote = schema_editor.quote_name
+    order_number = model._meta.get_field('order_number')
+
+    copy_table(schema_editor, partitioned=False)
+
+    schema_editor.execute(f'ALTER TABLE {quote(FULL_ORDER_TABLE)} '
+                          f'ADD PRIMARY KEY (id)')
+    schema_editor.execute(
+        schema_editor._create_unique_sql(model, [order_number]))
+    schema_editor.execute(
+        schema_editor._create_like_index_sql(model, order_number))
+    add_indexes(schema_editor, model)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_toothbrush_type_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(
+                    partition_full_orders,
+                    unpartition_full_orders
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='fullorder',
+                    name='order_number',
+                    field=models.CharField(max_length=30),
+                ),
+                migrations.AddConstraint(
+                    model_name='fullorder',
+                    constraint=ORDER_NUMBER_DATE_KEY,
+                ),
+            ],
+        ),
+    ]
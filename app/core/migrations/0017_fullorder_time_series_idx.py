@@ -0,0 +1,18 @@
+# Generated by Django 4.0.8 on 2026-10-17 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_partition_fullorder'),
+    ]
+
+    # Indexes of a partitioned table cannot be built concurrently.
+    operations = [
+        migrations.AddIndex(
+            model_name='fullorder',
+            index=models.Index(fields=['order_date'], include=('toothbrush_type', 'order_quantity', 'delivery_date'), name='fullorder_time_series_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.0.8 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_fullorder_time_series_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_type', models.CharField(choices=[('full', 'Full Orders'), ('todays', 'Todays Orders'), ('null', 'Null Orders')], max_length=10)),
+                ('upsert', models.BooleanField(default=False)),
+                ('file_path', models.CharField(max_length=255)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('total_rows', models.IntegerField(null=True)),
+                ('processed_rows', models.IntegerField(default=0)),
+                ('counts', models.JSONField(default=dict)),
+                ('rejected_rows', models.IntegerField(default=0)),
+                ('rejected', models.JSONField(default=list)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='ingestjob_pending_idx')],
+            },
+        ),
+    ]
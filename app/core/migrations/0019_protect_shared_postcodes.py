@@ -0,0 +1,44 @@
+# Generated by Django 4.0.8 on 2026-10-17 18:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_ingestjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fullorder',
+            name='billing_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='full_billing_pc', to='core.billingpostcode'),
+        ),
+        migrations.AlterField(
+            model_name='fullorder',
+            name='delivery_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='full_delivery_pc', to='core.deliverypostcode'),
+        ),
+        migrations.AlterField(
+            model_name='nullorder',
+            name='billing_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='null_billing_pc', to='core.billingpostcode'),
+        ),
+        migrations.AlterField(
+            model_name='nullorder',
+            name='delivery_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='null_delivery_pc', to='core.deliverypostcode'),
+        ),
+        migrations.AlterField(
+            model_name='todaysorder',
+            name='billing_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='today_billing_pc', to='core.billingpostcode'),
+        ),
+        migrations.AlterField(
+            model_name='todaysorder',
+            name='delivery_postcode',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='today_delivery_pc', to='core.deliverypostcode'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.8 on 2026-10-17 19:00
+
+from django.db import migrations
+
+
+def fill_rollups(apps, schema_editor):
+    """
+    Compute the rollups of the Full Orders stored before they were
+    introduced, which 'get_full_data' would otherwise report as empty.
+    A new database has none, and keeps its data versions untouched.
+    """
+
+    from orders.rollups import rebuild_rollups
+
+    if not apps.get_model('core', 'FullOrder').objects.exists():
+        return
+
+    rebuild_rollups()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_ingestjob_heartbeat_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.0.8 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+# Row triggers defined on the partitioned table are cloned to every
+# partition. A row an update moves to another partition fires the
+# update trigger on Postgres 15 and later, and the delete and insert
+# triggers on earlier versions; either way its key follows it.
+TRIGGERS_SQL = """
+    INSERT INTO core_fullordernumber (order_number)
+    SELECT DISTINCT order_number FROM core_fullorder;
+
+    CREATE FUNCTION core_fullordernumber_insert() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO core_fullordernumber (order_number)
+        VALUES (NEW.order_number);
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE FUNCTION core_fullordernumber_delete() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM core_fullordernumber
+        WHERE order_number = OLD.order_number;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE FUNCTION core_fullordernumber_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE core_fullordernumber SET order_number = NEW.order_number
+        WHERE order_number = OLD.order_number;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql;
+
+    CREATE TRIGGER core_fullordernumber_insert
+    AFTER INSERT ON core_fullorder
+    FOR EACH ROW EXECUTE FUNCTION core_fullordernumber_insert();
+
+    CREATE TRIGGER core_fullordernumber_delete
+    AFTER DELETE ON core_fullorder
+    FOR EACH ROW EXECUTE FUNCTION core_fullordernumber_delete();
+
+    CREATE TRIGGER core_fullordernumber_update
+    AFTER UPDATE OF order_number ON core_fullorder
+    FOR EACH ROW
+    WHEN (OLD.order_number IS DISTINCT FROM NEW.order_number)
+    EXECUTE FUNCTION core_fullordernumber_update();
+"""
+
+DROP_TRIGGERS_SQL = """
+    DROP TRIGGER core_fullordernumber_insert ON core_fullorder;
+    DROP TRIGGER core_fullordernumber_delete ON core_fullorder;
+    DROP TRIGGER core_fullordernumber_update ON core_fullorder;
+    DROP FUNCTION core_fullordernumber_insert();
+    DROP FUNCTION core_fullordernumber_delete();
+    DROP FUNCTION core_fullordernumber_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_fill_order_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FullOrderNumber',
+            fields=[
+                ('order_number', models.CharField(
+                    max_length=30, primary_key=True, serialize=False)),
+            ],
+        ),
+        migrations.RunSQL(TRIGGERS_SQL, DROP_TRIGGERS_SQL),
+    ]
@@ -5,11 +5,14 @@ All 3 models inherit from parent 'AbstractTBData' class.
 
 from django.db import models
 from django.db.models import Avg
+from django.db.models.functions import Upper
 from django.contrib.auth.models import (BaseUserManager, AbstractBaseUser,
                                         PermissionsMixin)
 
 from django.core.validators import MaxValueValidator
 
+import datetime
+
 
 class UserManager(BaseUserManager):
     """Manager for user models"""
@@ -62,12 +65,13 @@ class DeliveryPostcode(models.Model):
         postcode_type (int):
             1. Delivery
             2. Billing
-        todays_order (TodaysOrder): A reference to a TodaysOrder model
-        full_order (FullOrder): A reference to a FullOrder model (null to start)
+
+    Each postcode is stored once and shared by every order
+    delivered to it.
 
     """
 
-    postcode = models.CharField(max_length=20)
+    postcode = models.CharField(max_length=20, unique=True)
     postcode_area = models.CharField(max_length=5, null=True)
 
     def __str__(self):
@@ -83,12 +87,13 @@ class BillingPostcode(models.Model):
         postcode_type (int):
             1. Delivery
             2. Billing
-        todays_order (TodaysOrder): A reference to a TodaysOrder model
-        full_order (FullOrder): A reference to a FullOrder model (null to start)
+
+    Each postcode is stored once and shared by every order
+    billed to it.
 
     """
 
-    postcode = models.CharField(max_length=20)
+    postcode = models.CharField(max_length=20, unique=True)
     postcode_area = models.CharField(max_length=5, null=True)
 
     def __str__(self):
@@ -102,6 +107,28 @@ class AbstractTBData(models.Model):
 
     class Meta:
         abstract = True
+        indexes = [
+            # Keyset pagination key of the order list endpoints.
+            models.Index(
+                fields=['order_date', 'id'],
+                name='%(class)s_order_date_id_idx'
+            ),
+            # 'toothbrush_type__iexact' compiles to UPPER(col) = UPPER(%s),
+            # so the analytics filters need expression indexes. Each one
+            # also serves plain toothbrush type lookups on its own.
+            models.Index(
+                Upper('toothbrush_type'), 'customer_age',
+                name='%(class)s_tb_type_age_idx'
+            ),
+            models.Index(
+                Upper('toothbrush_type'), 'order_date',
+                name='%(class)s_tb_type_date_idx'
+            ),
+            models.Index(
+                Upper('toothbrush_type'), 'delivery_status',
+                name='%(class)s_tb_type_status_idx'
+            ),
+        ]
 
     order_number = models.CharField(max_length=30, null=False, unique=True)
     toothbrush_type = models.CharField(max_length=20)
@@ -116,11 +143,43 @@ class AbstractTBData(models.Model):
 
 
 class FullOrder(AbstractTBData):
+    """
+    Completed orders, an append-only history. The table is
+    partitioned by month of 'order_date' (see core.partitions).
+
+    Unique keys of a partitioned table must include the partition
+    key, so the table itself is only unique on order number together
+    with order date. Triggers keep every order number in
+    FullOrderNumber, which makes a second order with a number in use
+    fail whatever its order date.
+    """
 
-    delivery_postcode = models.OneToOneField(
-        DeliveryPostcode, on_delete=models.CASCADE, related_name='full_delivery_pc', null=True)
-    billing_postcode = models.OneToOneField(
-        BillingPostcode, on_delete=models.CASCADE, related_name='full_billing_pc', null=True)
+    class Meta(AbstractTBData.Meta):
+        indexes = AbstractTBData.Meta.indexes + [
+            # Covers the sales over time query (orders.timeseries)
+            # for index only scans.
+            models.Index(
+                fields=['order_date'],
+                include=['toothbrush_type', 'order_quantity',
+                         'delivery_date'],
+                name='fullorder_time_series_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['order_number', 'order_date'],
+                name='fullorder_order_number_date_key'
+            ),
+        ]
+
+    order_number = models.CharField(max_length=30)
+
+    delivery_postcode = models.ForeignKey(
+        DeliveryPostcode, on_delete=models.PROTECT,
+        related_name='full_delivery_pc', null=True)
+    billing_postcode = models.ForeignKey(
+        BillingPostcode, on_delete=models.PROTECT,
+        related_name='full_billing_pc', null=True)
 
     def __str__(self):
         return self.order_number
@@ -132,6 +191,19 @@ class FullOrder(AbstractTBData):
 
 
 
+class FullOrderNumber(models.Model):
+    """
+    The order number of every Full Order, written by triggers on the
+    Full Order table in the same transaction as the order (see
+    migration 0022). Not partitioned, so its key is the order number.
+    """
+
+    order_number = models.CharField(max_length=30, primary_key=True)
+
+    def __str__(self):
+        return self.order_number
+
+
 class TodaysOrder(AbstractTBData):
 
     dispatch_status = models.CharField(max_length=30, null=True, blank=True)
@@ -139,10 +211,12 @@ class TodaysOrder(AbstractTBData):
     delivery_status = models.CharField(max_length=30, null=True, blank=True)
     delivery_date = models.DateTimeField(null=True, blank=True)
 
-    delivery_postcode = models.OneToOneField(
-        DeliveryPostcode, on_delete=models.CASCADE, related_name='today_delivery_pc', null=True)
-    billing_postcode = models.OneToOneField(
-        BillingPostcode, on_delete=models.CASCADE, related_name='today_billing_pc', null=True)
+    delivery_postcode = models.ForeignKey(
+        DeliveryPostcode, on_delete=models.PROTECT,
+        related_name='today_delivery_pc', null=True)
+    billing_postcode = models.ForeignKey(
+        BillingPostcode, on_delete=models.PROTECT,
+        related_name='today_billing_pc', null=True)
 
     def __str__(self):
         return self.order_number
@@ -155,10 +229,150 @@ class NullOrder(AbstractTBData):
     delivery_status = models.CharField(max_length=30, null=True, blank=True)
     delivery_date = models.DateTimeField(null=True, blank=True)
 
-    delivery_postcode = models.OneToOneField(
-        DeliveryPostcode, on_delete=models.CASCADE, related_name='null_delivery_pc', null=True)
-    billing_postcode = models.OneToOneField(
-        BillingPostcode, on_delete=models.CASCADE, related_name='null_billing_pc', null=True)
+    delivery_postcode = models.ForeignKey(
+        DeliveryPostcode, on_delete=models.PROTECT,
+        related_name='null_delivery_pc', null=True)
+    billing_postcode = models.ForeignKey(
+        BillingPostcode, on_delete=models.PROTECT,
+        related_name='null_billing_pc', null=True)
 
     def __str__(self):
         return self.order_number
+
+
+class AbstractOrderRollup(models.Model):
+    """
+    Parent model for Full Order summary tables.
+
+    Each row holds running sums, counts and extremes for the
+    Full Orders of one toothbrush type within a single group,
+    so averages can be derived without touching raw orders.
+    """
+
+    class Meta:
+        abstract = True
+
+    toothbrush_type = models.CharField(max_length=20)
+    order_count = models.BigIntegerField(default=0)
+    order_quantity_sum = models.BigIntegerField(default=0)
+    customer_age_sum = models.BigIntegerField(default=0)
+    customer_age_min = models.IntegerField(null=True)
+    customer_age_max = models.IntegerField(null=True)
+    delivery_delta_sum = models.DurationField(default=datetime.timedelta)
+    delivery_delta_min = models.DurationField(null=True)
+    delivery_delta_max = models.DurationField(null=True)
+
+
+class PostcodeAreaRollup(AbstractOrderRollup):
+    """
+    Full Order totals by toothbrush type and delivery postcode area.
+    Orders without a postcode area are grouped under ''.
+    """
+
+    postcode_area = models.CharField(max_length=5, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['toothbrush_type', 'postcode_area'],
+                name='unique_postcode_area_rollup'
+            )
+        ]
+
+
+class CustomerAgeRollup(AbstractOrderRollup):
+    """Full Order totals by toothbrush type and customer age."""
+
+    customer_age = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['toothbrush_type', 'customer_age'],
+                name='unique_customer_age_rollup'
+            )
+        ]
+
+
+class DeliveryStatusRollup(AbstractOrderRollup):
+    """Full Order totals by toothbrush type and delivery status."""
+
+    delivery_status = models.CharField(max_length=30)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['toothbrush_type', 'delivery_status'],
+                name='unique_delivery_status_rollup'
+            )
+        ]
+
+
+class DataVersion(models.Model):
+    """
+    Counter bumped whenever a group of order tables is written to.
+
+    Cached analytics responses are keyed on the current versions
+    of the tables they read, so any write invalidates them.
+    """
+
+    name = models.CharField(max_length=30, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+
+class IngestJob(models.Model):
+    """
+    A bulk order upload spooled to disk, waiting for or being
+    written by an ingest worker ('run_ingest_jobs').
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    ORDER_TYPES = [
+        ('full', 'Full Orders'),
+        ('todays', 'Todays Orders'),
+        ('null', 'Null Orders'),
+    ]
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest pending job.
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status='pending'),
+                name='ingestjob_pending_idx'
+            ),
+        ]
+
+    order_type = models.CharField(max_length=10, choices=ORDER_TYPES)
+    upsert = models.BooleanField(default=False)
+    file_path = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUSES,
+                              default=PENDING)
+    total_rows = models.IntegerField(null=True)
+    processed_rows = models.IntegerField(default=0)
+    counts = models.JSONField(default=dict)
+    rejected_rows = models.IntegerField(default=0)
+    rejected = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    # Set by the worker running the job as it commits each chunk.
+    heartbeat_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f'{self.order_type} ingest {self.pk} ({self.status})'
@@ -0,0 +1,162 @@
+"""
+Monthly range partitions of the Full Order table.
+
+'core_fullorder' is partitioned by range of 'order_date', with one
+partition per calendar month (UTC) named 'core_fullorder_YYYY_MM'.
+A default partition holds orders of any month without a partition
+of its own, so an insert never fails for want of a partition.
+
+'ensure_partitions' creates the partitions of the coming months and
+of every month with orders waiting in the default partition, moving
+those orders into them. It runs from the 'create_order_partitions'
+command, once on startup (see 'scripts/run.sh') and then daily in the
+'partitions' service of 'docker-compose-deploy.yml', which Docker
+restarts if it stops. Months thus get their partitions before their
+orders arrive; if the service is down for longer, their orders wait
+in the default partition.
+"""
+
+import datetime
+
+from django.db import connection as default_connection, transaction
+
+
+PARTITIONED_TABLE = 'core_fullorder'
+DEFAULT_PARTITION = f'{PARTITIONED_TABLE}_default'
+ORDER_NUMBER_TABLE = 'core_fullordernumber'
+
+# Partitions created ahead of the current month.
+MONTHS_AHEAD = 3
+
+PARTITIONS_SQL = """
+    SELECT child.relname
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = %s
+"""
+
+DEFAULT_MONTHS_SQL = """
+    SELECT DISTINCT date_trunc('month', order_date AT TIME ZONE 'UTC')
+    FROM {default}
+"""
+
+MOVE_SQL = """
+    WITH moved AS (
+        DELETE FROM {default}
+        WHERE order_date >= %s AND order_date < %s
+        RETURNING *
+    )
+    INSERT INTO {partition} SELECT * FROM moved
+"""
+
+# Deleting the moved orders from the default partition fired its
+# trigger removing their order numbers (see core.models.FullOrderNumber),
+# and the new partition has no triggers until it is attached.
+RESTORE_NUMBERS_SQL = """
+    INSERT INTO {numbers} (order_number)
+    SELECT order_number FROM {partition}
+"""
+
+
+def month_start(value):
+    """Return the first instant (UTC) of the month of a datetime."""
+
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    return datetime.datetime(value.year, value.month, 1,
+                             tzinfo=datetime.timezone.utc)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month):
+    return f'{PARTITIONED_TABLE}_{month:%Y_%m}'
+
+
+def _literal(value):
+    # Partition bounds are part of the DDL and cannot be parameters.
+    return f"'{value.isoformat()}'"
+
+
+def existing_partitions(cursor):
+    cursor.execute(PARTITIONS_SQL, [PARTITIONED_TABLE])
+    return {row[0] for row in cursor.fetchall()}
+
+
+def create_partition(cursor, month, quote):
+    """
+    Create the partition of one month, moving its orders out of the
+    default partition first: a partition cannot be attached while
+    the default partition holds rows within its bounds.
+    """
+
+    name = quote(partition_name(month))
+    table = quote(PARTITIONED_TABLE)
+    lower, upper = month, add_months(month, 1)
+
+    cursor.execute(
+        f'CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS '
+        f'INCLUDING CONSTRAINTS)'
+    )
+    cursor.execute(
+        MOVE_SQL.format(default=quote(DEFAULT_PARTITION), partition=name),
+        [lower, upper]
+    )
+    if cursor.rowcount:
+        cursor.execute(RESTORE_NUMBERS_SQL.format(
+            numbers=quote(ORDER_NUMBER_TABLE), partition=name))
+    # Indexes, keys and foreign keys of the parent are added to the
+    # partition as it is attached.
+    cursor.execute(
+        f'ALTER TABLE {table} ATTACH PARTITION {name} '
+        f'FOR VALUES FROM ({_literal(lower)}) TO ({_literal(upper)})'
+    )
+
+
+def ensure_partitions(connection=None, start=None, months_ahead=MONTHS_AHEAD,
+                      now=None):
+    """
+    Create any missing partition from the month of 'start' (default
+    the current month) to 'months_ahead' months after the current
+    one, and for every month found in the default partition.
+
+    Returns the names of the partitions created.
+    """
+
+    connection = connection or default_connection
+    quote = connection.ops.quote_name
+    current = month_start(now or datetime.datetime.now(datetime.timezone.utc))
+    month = month_start(start) if start is not None else current
+
+    months = set()
+    while month <= add_months(current, months_ahead):
+        months.add(month)
+        month = add_months(month, 1)
+
+    created = []
+
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        # Tables with deferred foreign key checks pending cannot be
+        # altered, so run any left by this transaction now.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        partitions = existing_partitions(cursor)
+
+        if DEFAULT_PARTITION in partitions:
+            cursor.execute(DEFAULT_MONTHS_SQL.format(
+                default=quote(DEFAULT_PARTITION)))
+            months.update(
+                row[0].replace(tzinfo=datetime.timezone.utc)
+                for row in cursor.fetchall()
+            )
+
+        for month in sorted(months):
+            if partition_name(month) not in partitions:
+                create_partition(cursor, month, quote)
+                created.append(partition_name(month))
+
+    return created
@@ -0,0 +1,70 @@
+"""
+orjson and MessagePack renderers for the API.
+
+Both encode the types orjson or msgpack do not handle natively with
+DRF's own JSONEncoder, so Decimals, timedeltas, lazy strings and
+querysets come out exactly as they do from DRF's JSONRenderer.
+orjson passes dates and datetimes through to that encoder as well,
+so their precision and UTC suffix follow DRF rather than orjson.
+"""
+
+import msgpack
+import orjson
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+# UTF-8 line and paragraph separators, escaped by JSONRenderer.
+LINE_SEPARATORS = (
+    (b'\xe2\x80\xa8', b'\\u2028'),
+    (b'\xe2\x80\xa9', b'\\u2029'),
+)
+
+
+# DRF's own fallback for types orjson and msgpack cannot encode.
+encode_default = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Render JSON with orjson. Output matches JSONRenderer with the
+    default COMPACT_JSON and UNICODE_JSON settings; any indent
+    requested by the client is rendered as two spaces.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        options = ORJSON_OPTIONS
+
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=encode_default, option=options)
+
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render MessagePack, with the same values as the JSON output."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(
+            data, default=encode_default, use_bin_type=True)
@@ -1,10 +1,15 @@
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 from django.db.utils import OperationalError
 
 from django.core.management import call_command
+from django.db import connection
+
+from core.models import IngestJob
+
+from io import StringIO
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -35,3 +40,115 @@ class CommandTests(SimpleTestCase):
         patched_check.assert_called_with(
             databases=['default']
         )
+
+
+class RebuildRollupsCommandTests(SimpleTestCase):
+    """Tests for the rebuild_rollups command."""
+
+    @patch('core.management.commands.rebuild_rollups.rebuild_rollups')
+    def test_rebuild_rollups(self, patched_rebuild):
+        """Test rebuilding every toothbrush type."""
+
+        call_command('rebuild_rollups')
+
+        patched_rebuild.assert_called_once_with(None)
+
+    @patch('core.management.commands.rebuild_rollups.rebuild_rollups')
+    def test_rebuild_rollups_for_toothbrush_type(self, patched_rebuild):
+        """Test rebuilding selected toothbrush types only."""
+
+        call_command('rebuild_rollups', '--toothbrush-type',
+                     'Toothbrush 2000')
+
+        patched_rebuild.assert_called_once_with(['Toothbrush 2000'])
+
+
+class RolloverCommandTests(SimpleTestCase):
+    """Tests for the rollover_todays_orders command."""
+
+    @patch('core.management.commands.rollover_todays_orders.'
+           'rollover_todays_orders')
+    def test_rollover_todays_orders(self, patched_rollover):
+        """Test the rollover runs and its counts are printed."""
+
+        patched_rollover.return_value = {'todays_orders': 3}
+        out = StringIO()
+
+        call_command('rollover_todays_orders', stdout=out)
+
+        patched_rollover.assert_called_once_with()
+        self.assertIn('todays_orders: 3', out.getvalue())
+
+
+class CreateOrderPartitionsCommandTests(SimpleTestCase):
+    """Tests for the create_order_partitions command."""
+
+    @patch('core.management.commands.create_order_partitions.'
+           'ensure_partitions')
+    def test_create_order_partitions(self, patched_ensure):
+        """Test partitions are created the given months ahead."""
+
+        patched_ensure.return_value = ['core_fullorder_2099_01']
+        out = StringIO()
+
+        call_command('create_order_partitions', '--months-ahead', '6',
+                     stdout=out)
+
+        patched_ensure.assert_called_once_with(months_ahead=6)
+        self.assertIn('core_fullorder_2099_01', out.getvalue())
+
+    @patch('core.management.commands.create_order_partitions.time.sleep')
+    @patch('core.management.commands.create_order_partitions.'
+           'ensure_partitions')
+    def test_create_order_partitions_interval(self, patched_ensure,
+                                              patched_sleep):
+        """Test partitions are checked again after each interval."""
+
+        patched_ensure.return_value = []
+        patched_sleep.side_effect = [None, KeyboardInterrupt]
+
+        with self.assertRaises(KeyboardInterrupt):
+            call_command('create_order_partitions', '--interval', '60',
+                         stdout=StringIO())
+
+        self.assertEqual(patched_ensure.call_count, 2)
+        patched_sleep.assert_called_with(60.0)
+
+
+class RunIngestJobsCommandTests(SimpleTestCase):
+    """Tests for the run_ingest_jobs command."""
+
+    @patch('core.management.commands.run_ingest_jobs.run_job')
+    @patch('core.management.commands.run_ingest_jobs.claim_job')
+    def test_run_ingest_jobs_once(self, patched_claim, patched_run):
+        """Test waiting jobs are run until none is left."""
+
+        job = IngestJob(pk=7, status=IngestJob.SUCCEEDED, processed_rows=3)
+        patched_claim.side_effect = [job, None]
+        out = StringIO()
+
+        call_command('run_ingest_jobs', '--once', stdout=out)
+
+        patched_run.assert_called_once_with(job)
+        self.assertEqual(patched_claim.call_count, 2)
+        self.assertIn('Ingest job 7 succeeded: 3 rows', out.getvalue())
+
+
+class BenchmarkIndexesCommandTests(TestCase):
+    """Tests for the benchmark_indexes command."""
+
+    def test_benchmark_indexes_compare(self):
+        """Test plans are printed and the dropped indexes restored."""
+
+        out = StringIO()
+
+        call_command('benchmark_indexes', '--compare', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Without indexes', output)
+        self.assertEqual(output.count('todays orders count:'), 2)
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, 'core_fullorder')
+        self.assertIn('fullorder_tb_type_age_idx', constraints)
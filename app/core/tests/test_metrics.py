@@ -0,0 +1,110 @@
+"""
+Tests for the request metrics.
+"""
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+
+
+METRICS_URL = reverse('api-metrics')
+TODAYS_COUNT_URL = reverse('orders:todays_orders-count')
+TODAYS_LIST_URL = reverse('orders:todays_orders-list')
+EXPORT_URL = reverse('orders:null_orders-export')
+
+VIEW_LABELS = {'view': 'orders:todays_orders-count', 'method': 'GET'}
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, {**VIEW_LABELS, **labels}) or 0
+
+
+class MetricsTests(TestCase):
+    """Test request and SQL metrics are recorded and exposed."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_request_metrics_recorded(self):
+        """Test a request records latency, SQL and render metrics."""
+
+        requests = sample('http_request_duration_seconds_count')
+        queries = sample('sql_queries_total')
+        renders = sample('http_response_render_duration_seconds_count')
+        ok = sample('http_requests_total', status='200')
+
+        res = self.client.get(TODAYS_COUNT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sample('http_request_duration_seconds_count'), requests + 1)
+        self.assertGreater(sample('sql_queries_total'), queries)
+        self.assertEqual(
+            sample('http_response_render_duration_seconds_count'),
+            renders + 1
+        )
+        self.assertEqual(sample('http_requests_total', status='200'), ok + 1)
+
+    def test_serialize_time_recorded(self):
+        """Test building the serializer data of a response is timed."""
+
+        labels = {'view': 'orders:todays_orders-list'}
+        serialized = sample(
+            'http_response_serialize_duration_seconds_count', **labels)
+
+        res = self.client.get(TODAYS_LIST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sample('http_response_serialize_duration_seconds_count',
+                   **labels),
+            serialized + 1
+        )
+
+    def test_streaming_queries_recorded(self):
+        """Test queries run while a response streams are counted."""
+
+        labels = {'view': 'orders:null_orders-export'}
+        requests = sample('http_request_duration_seconds_count', **labels)
+        queries = sample('sql_queries_total', **labels)
+
+        res = self.client.get(EXPORT_URL, {'file_format': 'ndjson'})
+
+        self.assertEqual(
+            sample('http_request_duration_seconds_count', **labels),
+            requests
+        )
+
+        b''.join(res.streaming_content)
+
+        self.assertEqual(
+            sample('http_request_duration_seconds_count', **labels),
+            requests + 1
+        )
+        self.assertGreater(sample('sql_queries_total', **labels), queries)
+
+    def test_metrics_endpoint(self):
+        """Test metrics are exposed in Prometheus text format."""
+
+        self.client.get(TODAYS_COUNT_URL)
+
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+
+        samples = [
+            (metric.name, metric.labels)
+            for family in text_string_to_metric_families(
+                res.content.decode('utf-8'))
+            for metric in family.samples
+        ]
+        self.assertIn(
+            ('http_request_sql_queries_bucket', {**VIEW_LABELS, 'le': '1.0'}),
+            samples
+        )
@@ -0,0 +1,137 @@
+"""Tests for the monthly Full Order partitions."""
+
+from django.test import SimpleTestCase, TestCase
+from django.db import connection, IntegrityError, transaction
+
+from core.models import FullOrder, FullOrderNumber
+from core.partitions import (
+    ensure_partitions,
+    existing_partitions,
+    month_start,
+    add_months,
+    partition_name,
+    DEFAULT_PARTITION
+)
+
+import datetime
+
+
+UTC = datetime.timezone.utc
+
+
+def create_full_order(order_number, order_date):
+    return FullOrder.objects.create(
+        order_number=order_number,
+        toothbrush_type='Toothbrush 2000',
+        order_date=order_date,
+        customer_age=30,
+        order_quantity=1,
+        is_first=True,
+        dispatch_status='Dispatched',
+        dispatch_date=order_date,
+        delivery_status='Delivered',
+        delivery_date=order_date
+    )
+
+
+def stored_in(order):
+    """Return the name of the partition holding an order."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT tableoid::regclass::text FROM core_fullorder '
+            'WHERE id = %s', [order.id])
+        return cursor.fetchone()[0]
+
+
+class MonthTests(SimpleTestCase):
+    """Test the month arithmetic of partition bounds."""
+
+    def test_month_start(self):
+        """Test datetimes are truncated to the month, in UTC."""
+
+        value = datetime.datetime(
+            2023, 3, 1, 0, 30,
+            tzinfo=datetime.timezone(datetime.timedelta(hours=1)))
+
+        self.assertEqual(month_start(value),
+                         datetime.datetime(2023, 2, 1, tzinfo=UTC))
+
+    def test_add_months_across_years(self):
+        """Test adding months rolls over into the next year."""
+
+        month = datetime.datetime(2022, 11, 1, tzinfo=UTC)
+
+        self.assertEqual(add_months(month, 3),
+                         datetime.datetime(2023, 2, 1, tzinfo=UTC))
+        self.assertEqual(partition_name(add_months(month, 1)),
+                         'core_fullorder_2022_12')
+
+
+class PartitionTests(TestCase):
+    """Test creating partitions of the Full Order table."""
+
+    def test_migration_creates_current_partitions(self):
+        """Test the current month and the default partition exist."""
+
+        with connection.cursor() as cursor:
+            partitions = existing_partitions(cursor)
+
+        current = month_start(datetime.datetime.now(UTC))
+        self.assertIn(partition_name(current), partitions)
+        self.assertIn(DEFAULT_PARTITION, partitions)
+
+    def test_ensure_partitions_creates_future_months(self):
+        """Test partitions are created ahead of a later month."""
+
+        now = datetime.datetime(2099, 1, 15, tzinfo=UTC)
+
+        created = ensure_partitions(now=now, months_ahead=1)
+
+        self.assertEqual(created, ['core_fullorder_2099_01',
+                                   'core_fullorder_2099_02'])
+        self.assertEqual(ensure_partitions(now=now, months_ahead=1), [])
+
+    def test_orders_move_out_of_default_partition(self):
+        """Test orders without a partition are moved into a new one."""
+
+        order = create_full_order(
+            'BRU00001', datetime.datetime(2001, 5, 20, tzinfo=UTC))
+        self.assertEqual(stored_in(order), DEFAULT_PARTITION)
+
+        created = ensure_partitions(months_ahead=0)
+
+        self.assertIn('core_fullorder_2001_05', created)
+        self.assertEqual(stored_in(order), 'core_fullorder_2001_05')
+        self.assertEqual(FullOrder.objects.get(pk=order.pk), order)
+        self.assertTrue(
+            FullOrderNumber.objects.filter(order_number='BRU00001').exists())
+
+    def test_order_numbers_unique_across_partitions(self):
+        """Test an order number in use fails whatever its order date."""
+
+        ensure_partitions(
+            now=datetime.datetime(2023, 1, 1, tzinfo=UTC), months_ahead=2)
+        order = create_full_order(
+            'BRU00001', datetime.datetime(2023, 1, 10, tzinfo=UTC))
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            create_full_order(
+                'BRU00001', datetime.datetime(2023, 2, 10, tzinfo=UTC))
+
+        # Moving the order to another month keeps its number.
+        order.order_date = datetime.datetime(2023, 3, 10, tzinfo=UTC)
+        order.save()
+        self.assertEqual(stored_in(order), 'core_fullorder_2023_03')
+        order.order_number = 'BRU00002'
+        order.save()
+
+        self.assertEqual(
+            list(FullOrderNumber.objects.values_list(
+                'order_number', flat=True)),
+            ['BRU00002']
+        )
+
+        order.delete()
+
+        self.assertFalse(FullOrderNumber.objects.exists())
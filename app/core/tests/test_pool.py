@@ -0,0 +1,175 @@
+"""
+Tests for the database connection pool.
+"""
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from unittest import skipUnless
+from unittest.mock import patch
+
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE,
+    TRANSACTION_STATUS_INTRANS
+)
+
+from core.backends.pooled_postgresql.pool import ConnectionPool, PoolTimeout
+
+import threading
+
+
+class FakeInfo:
+    transaction_status = TRANSACTION_STATUS_IDLE
+
+
+class FakeCursor:
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql):
+        if self.conn.broken:
+            raise Exception('server closed the connection')
+
+
+class FakeConnection:
+    """Stands in for a psycopg2 connection."""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.rolled_back = False
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rolled_back = True
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test checking connections in and out of the pool."""
+
+    def test_connections_reused(self):
+        """Test a returned connection is handed out again."""
+
+        pool = ConnectionPool(max_size=2)
+
+        conn = pool.getconn(FakeConnection)
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(FakeConnection), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_full_pool_times_out(self):
+        """Test waiting for a connection gives up after the timeout."""
+
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.getconn(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiting_thread_gets_returned_connection(self):
+        """Test a thread waiting on a full pool is woken up."""
+
+        pool = ConnectionPool(max_size=1, timeout=5)
+        conn = pool.getconn(FakeConnection)
+        result = []
+
+        thread = threading.Thread(
+            target=lambda: result.append(pool.getconn(FakeConnection)))
+        thread.start()
+        pool.putconn(conn)
+        thread.join()
+
+        self.assertEqual(result, [conn])
+
+    def test_unhealthy_connection_replaced(self):
+        """Test a connection failing its health check is discarded."""
+
+        pool = ConnectionPool(max_size=1)
+        conn = pool.getconn(FakeConnection)
+        pool.putconn(conn)
+        conn.broken = True
+
+        new_conn = pool.getconn(FakeConnection)
+
+        self.assertIsNot(new_conn, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['health_check_failures'], 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection returned mid transaction is rolled back."""
+
+        pool = ConnectionPool()
+        conn = pool.getconn(FakeConnection)
+        conn.info.transaction_status = TRANSACTION_STATUS_INTRANS
+
+        pool.putconn(conn)
+
+        self.assertTrue(conn.rolled_back)
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_fill_opens_min_size(self):
+        """Test min_size connections are opened ahead of checkouts."""
+
+        pool = ConnectionPool(min_size=2, max_size=3)
+
+        pool.fill(FakeConnection)
+        pool.getconn(FakeConnection)
+        pool.fill(FakeConnection)
+
+        stats = pool.stats()
+        self.assertEqual(stats['connections_created'], 2)
+        self.assertEqual((stats['idle'], stats['in_use']), (1, 1))
+
+    def test_idle_connections_closed_down_to_min_size(self):
+        """Test connections idle past the timeout are closed."""
+
+        pool = ConnectionPool(min_size=1, max_size=3, idle_timeout=60)
+        conns = [pool.getconn(FakeConnection) for _ in range(3)]
+
+        with patch('core.backends.pooled_postgresql.pool.monotonic',
+                   return_value=0):
+            for conn in conns:
+                pool.putconn(conn)
+
+        with patch('core.backends.pooled_postgresql.pool.monotonic',
+                   return_value=120):
+            pool.putconn(pool.getconn(FakeConnection))
+
+        self.assertEqual(pool.stats()['size'], 1)
+        self.assertEqual(sum(conn.closed for conn in conns), 2)
+
+
+@skipUnless(connection.vendor == 'postgresql'
+            and hasattr(connection, 'pool'), 'Connection pool disabled')
+class PooledBackendTests(TransactionTestCase):
+    """Test Django connections come from the pool."""
+
+    def test_connection_returned_to_pool(self):
+        """Test closing and reopening reuses the same connection."""
+
+        connection.ensure_connection()
+        conn = connection.connection
+
+        connection.close()
+        connection.ensure_connection()
+
+        self.assertIs(connection.connection, conn)
+        self.assertEqual(connection.pool.stats()['in_use'], 1)
@@ -0,0 +1,148 @@
+"""
+Tests for the orjson and MessagePack renderers and parsers.
+"""
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import FullOrder
+from core.parsers import ORJSONParser, MessagePackParser
+from core.renderers import ORJSONRenderer, MessagePackRenderer
+
+from decimal import Decimal
+from io import BytesIO
+
+import datetime
+import msgpack
+import pytz
+
+
+FULL_ORDER_URL = reverse('orders:full_orders-list')
+
+order_date = pytz.utc.localize(
+    datetime.datetime(2023, 1, 10, 12, 0, 0, 123456))
+
+DATA = {
+    'order_date': order_date,
+    'local_date': order_date.astimezone(pytz.timezone('Europe/Paris')),
+    'day': order_date.date(),
+    'delta': datetime.timedelta(days=1, seconds=30),
+    'price': Decimal('12.50'),
+    'text': 'Zürich ',
+    'nested': [{'a': None, 'b': True, 'c': 1.5}],
+}
+
+
+class RendererTests(SimpleTestCase):
+    """Test rendering matches DRF's JSON renderer."""
+
+    def test_orjson_matches_json_renderer(self):
+        """Test datetimes, Decimals and escapes are rendered like DRF."""
+
+        self.assertEqual(
+            ORJSONRenderer().render(DATA),
+            JSONRenderer().render(DATA)
+        )
+
+    def test_orjson_indent(self):
+        """Test an indent requested by the client is honoured."""
+
+        ret = ORJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=4')
+
+        self.assertEqual(ret, b'{\n  "a": 1\n}')
+
+    def test_msgpack_values_match_json(self):
+        """Test MessagePack carries the same values as JSON."""
+
+        ret = msgpack.unpackb(MessagePackRenderer().render(DATA))
+
+        self.assertEqual(
+            ret, JSONParser().parse(BytesIO(JSONRenderer().render(DATA))))
+
+
+class ParserTests(SimpleTestCase):
+    """Test parsing request bodies."""
+
+    def test_orjson_parser(self):
+        """Test JSON bodies parse, and invalid ones raise ParseError."""
+
+        body = JSONRenderer().render(DATA)
+
+        self.assertEqual(
+            ORJSONParser().parse(BytesIO(body)),
+            JSONParser().parse(BytesIO(body))
+        )
+
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"a": NaN}'))
+
+    def test_msgpack_parser_reads_timestamps(self):
+        """Test MessagePack timestamps are read as UTC datetimes."""
+
+        body = msgpack.packb(
+            {'order_date': order_date}, datetime=True)
+
+        data = MessagePackParser().parse(BytesIO(body))
+
+        self.assertEqual(data['order_date'], order_date)
+
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(BytesIO(b'\xc1'))
+
+
+PAYLOAD = {
+    'order_number': 'BRU00001',
+    'toothbrush_type': 'Toothbrush 2000',
+    'order_date': order_date,
+    'customer_age': 30,
+    'order_quantity': 1,
+    'is_first': True,
+    'dispatch_status': 'Dispatched',
+    'dispatch_date': order_date,
+    'delivery_status': 'Delivered',
+    'delivery_date': order_date,
+}
+
+
+class ResponseFormatTests(TestCase):
+    """Test API responses keep the format of DRF's JSON renderer."""
+
+    def test_response_matches_json_renderer(self):
+        """Test an order listing renders as JSONRenderer rendered it."""
+
+        client = APIClient()
+        client.post(FULL_ORDER_URL, PAYLOAD, format='json')
+
+        res = client.get(FULL_ORDER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'12:00:00.123456Z', res.content)
+        self.assertEqual(res.content, JSONRenderer().render(res.data))
+
+
+class MessagePackApiTests(TestCase):
+    """Test the API speaks MessagePack."""
+
+    def test_create_and_list_with_msgpack(self):
+        """Test posting and listing orders as MessagePack."""
+
+        client = APIClient()
+
+        res = client.post(FULL_ORDER_URL, PAYLOAD, format='msgpack',
+                          HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(FullOrder.objects.get().order_date, order_date)
+
+        res = client.get(FULL_ORDER_URL, HTTP_ACCEPT='application/msgpack')
+        data = msgpack.unpackb(res.content)
+
+        self.assertEqual(data['results'][0]['order_number'], 'BRU00001')
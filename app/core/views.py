@@ -0,0 +1,17 @@
+"""
+Views for the core app.
+"""
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from core.metrics import render_metrics
+
+
+@require_GET
+def metrics(request):
+    """Expose request and SQL metrics in Prometheus text format."""
+
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,389 @@
+"""
+Single-pass aggregation of Full Order analytics.
+
+The dashboard sections returned by the 'get_full_data' action are all
+computed by one GROUPING SETS query over 'core_fullorder', and the
+resulting rows are split back into the shapes the existing
+serializers expect.
+
+Postgres cannot run a GROUPING SETS aggregate on parallel workers,
+so one query uses a single core however many months it reads. A
+period spanning several months is therefore split into ranges of
+whole months (each its own set of partitions) that are aggregated
+concurrently, up to settings.ANALYTICS_QUERY_CONCURRENCY at a time,
+and their rows merged.
+"""
+
+from functools import partial
+import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import FullOrder, DeliveryPostcode
+from core.partitions import add_months, month_start
+
+from orders.concurrency import run_concurrently
+
+
+TOOTHBRUSH_2000 = 'Toothbrush 2000'
+TOOTHBRUSH_4000 = 'Toothbrush 4000'
+
+# Values of GROUPING(customer_age, postcode_area) for each grouping set.
+GRAND_TOTAL = 3
+BY_AGE = 1
+BY_POSTCODE_AREA = 2
+
+# Columns scaled up when the query reads a sample of the orders.
+COUNT_COLUMNS = (
+    'total', 'delivery_successful', 'delivery_unsuccessful',
+    'delivery_in_transit', 'tb_2000_sales', 'tb_4000_sales',
+    'tb_4000_sales_iexact',
+)
+
+# Columns added together, and kept at their least or greatest, when
+# the rows of several ranges of orders are merged.
+SUM_COLUMNS = COUNT_COLUMNS + (
+    'customer_age_sum', 'customer_age_count',
+    'delivery_delta_sum', 'delivery_delta_count',
+)
+MIN_COLUMNS = ('min_customer_age', 'min_delivery_delta')
+MAX_COLUMNS = ('max_customer_age', 'max_delivery_delta')
+
+FULL_DATA_SQL = """
+    SELECT
+        GROUPING(o.customer_age, p.postcode_area) AS grouping_id,
+        o.customer_age,
+        p.postcode_area,
+        COUNT(*) AS total,
+        COUNT(*) FILTER (
+            WHERE o.delivery_status = 'Delivered') AS delivery_successful,
+        COUNT(*) FILTER (
+            WHERE o.delivery_status = 'Unsuccessful')
+            AS delivery_unsuccessful,
+        COUNT(*) FILTER (
+            WHERE o.delivery_status = 'In Transit') AS delivery_in_transit,
+        AVG(o.customer_age)::double precision AS avg_customer_age,
+        MAX(o.customer_age) AS max_customer_age,
+        MIN(o.customer_age) AS min_customer_age,
+        SUM(o.customer_age) AS customer_age_sum,
+        COUNT(o.customer_age) AS customer_age_count,
+        AVG(o.delivery_date - o.order_date) AS avg_delivery_delta,
+        MAX(o.delivery_date - o.order_date) AS max_delivery_delta,
+        MIN(o.delivery_date - o.order_date) AS min_delivery_delta,
+        SUM(o.delivery_date - o.order_date) AS delivery_delta_sum,
+        COUNT(o.delivery_date - o.order_date) AS delivery_delta_count,
+        COUNT(*) FILTER (
+            WHERE o.toothbrush_type = %(tb_2000)s) AS tb_2000_sales,
+        COUNT(*) FILTER (
+            WHERE o.toothbrush_type = %(tb_4000)s) AS tb_4000_sales,
+        COUNT(*) FILTER (
+            WHERE UPPER(o.toothbrush_type) = UPPER(%(tb_4000)s))
+            AS tb_4000_sales_iexact
+    FROM {order_table} o {sample}
+    LEFT JOIN {postcode_table} p ON p.id = o.delivery_postcode_id
+    {where}
+    GROUP BY GROUPING SETS ((), (o.customer_age), (p.postcode_area))
+"""
+
+
+def _parse_date(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise ValidationError({name: 'Expected a date as YYYY-MM-DD.'})
+
+    return date
+
+
+def order_date_range(params):
+    """
+    Return the (start, end) datetimes selected by the 'start_date'
+    and 'end_date' query parameters, either of which may be None.
+
+    Both dates are inclusive; 'end' is the midnight after
+    'end_date', so orders match when start <= order_date < end.
+    """
+
+    start_date = _parse_date(params, 'start_date')
+    end_date = _parse_date(params, 'end_date')
+
+    if start_date and end_date and start_date > end_date:
+        raise ValidationError(
+            {'end_date': 'Must not be before start_date.'})
+
+    def midnight(date):
+        return timezone.make_aware(
+            datetime.datetime.combine(date, datetime.time.min))
+
+    return (
+        midnight(start_date) if start_date else None,
+        midnight(end_date + datetime.timedelta(days=1)) if end_date else None
+    )
+
+
+def build_query(toothbrush_type=None, start=None, end=None, sample=None):
+    """
+    Return the SQL and parameters for a single aggregation pass.
+
+    'start' and 'end' bound 'order_date', so only the Full Order
+    partitions of those months are scanned. A 'Sample'
+    (orders.approximate) reads only part of each partition.
+    """
+
+    params = {'tb_2000': TOOTHBRUSH_2000, 'tb_4000': TOOTHBRUSH_4000}
+
+    sql = FULL_DATA_SQL.format(
+        order_table=connection.ops.quote_name(FullOrder._meta.db_table),
+        sample=sample.clause() if sample is not None else '',
+        postcode_table=connection.ops.quote_name(
+            DeliveryPostcode._meta.db_table),
+        where=order_filters(params, toothbrush_type, start, end)
+    )
+
+    return sql, params
+
+
+def order_filters(params, toothbrush_type=None, start=None, end=None):
+    """
+    Return the 'WHERE' clause (over orders aliased 'o') selecting a
+    toothbrush type and range of order dates, adding its values to
+    the 'params' dict.
+    """
+
+    conditions = []
+
+    if toothbrush_type is not None:
+        conditions.append(
+            'UPPER(o.toothbrush_type) = UPPER(%(toothbrush_type)s)')
+        params['toothbrush_type'] = toothbrush_type
+    if start is not None:
+        conditions.append('o.order_date >= %(start)s')
+        params['start'] = start
+    if end is not None:
+        conditions.append('o.order_date < %(end)s')
+        params['end'] = end
+
+    return 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+
+def _fetch_rows(toothbrush_type=None, start=None, end=None, sample=None):
+    """Run the aggregation query and return its rows as dicts."""
+
+    sql, params = build_query(toothbrush_type, start, end, sample)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    if sample is not None:
+        for row in rows:
+            if row['grouping_id'] == GRAND_TOTAL:
+                sample.sampled_rows = row['total']
+        sample.scale_rows(rows, COUNT_COLUMNS)
+
+    return rows
+
+
+def month_ranges(start, end, count):
+    """
+    Split the period from 'start' to 'end' at month boundaries into
+    at most 'count' consecutive (start, end) ranges of similar length.
+    """
+
+    bounds = [start]
+    month = add_months(month_start(start), 1)
+    while month < end:
+        bounds.append(month)
+        month = add_months(month, 1)
+    bounds.append(end)
+
+    months = len(bounds) - 1
+    count = min(count, months)
+    bounds = [bounds[months * index // count] for index in range(count + 1)]
+
+    return list(zip(bounds, bounds[1:]))
+
+
+def _pick(function, a, b):
+    if a is None or b is None:
+        return b if a is None else a
+    return function(a, b)
+
+
+def _add(a, b):
+    return a + b
+
+
+def merge_rows(parts):
+    """
+    Merge the rows of queries over separate ranges of orders into
+    the rows one query over all of them would return.
+    """
+
+    merged = {}
+
+    for rows in parts:
+        for row in rows:
+            key = (row['grouping_id'], row['customer_age'],
+                   row['postcode_area'])
+            into = merged.get(key)
+            if into is None:
+                merged[key] = dict(row)
+                continue
+            for column in SUM_COLUMNS:
+                into[column] = _pick(_add, into[column], row[column])
+            for column in MIN_COLUMNS:
+                into[column] = _pick(min, into[column], row[column])
+            for column in MAX_COLUMNS:
+                into[column] = _pick(max, into[column], row[column])
+
+    for row in merged.values():
+        row['avg_customer_age'] = (
+            row['customer_age_sum'] / row['customer_age_count']
+            if row['customer_age_count'] else None
+        )
+        row['avg_delivery_delta'] = (
+            row['delivery_delta_sum'] / row['delivery_delta_count']
+            if row['delivery_delta_count'] else None
+        )
+
+    return list(merged.values())
+
+
+def _order_quantities(rows, key, column, count_column):
+    """
+    Return non-empty '{key, order_quantity}' rows,
+    largest order quantity first.
+    """
+
+    quantities = [
+        {key: row[column], 'order_quantity': row[count_column]}
+        for row in rows if row[count_column]
+    ]
+
+    return sorted(quantities, key=lambda row: -row['order_quantity'])
+
+
+def sections_from_rows(rows):
+    """
+    Split grouped rows into the 'get_full_data' sections.
+
+    Each row is a dict holding the columns of 'FULL_DATA_SQL', and
+    'grouping_id' says which grouping set the row belongs to.
+    Returns a dict of plain python objects keyed by section name.
+    """
+
+    totals = {}
+    by_age = []
+    by_postcode = []
+
+    for row in rows:
+        if row['grouping_id'] == GRAND_TOTAL:
+            totals = row
+        elif row['grouping_id'] == BY_AGE:
+            by_age.append(row)
+        elif row['grouping_id'] == BY_POSTCODE_AREA:
+            by_postcode.append(row)
+
+    by_age.sort(key=lambda row: row['customer_age'])
+    by_postcode.sort(
+        key=lambda row: (row['postcode_area'] is None,
+                         row['postcode_area'] or ''))
+
+    sales_by_age = [
+        {'customer_age': row['customer_age'], 'total_sales': row['total']}
+        for row in by_age
+    ]
+
+    data_by_postcode = [
+        {
+            'delivery_postcode__postcode_area': row['postcode_area'],
+            'avg_customer_age': row['avg_customer_age'],
+            'total_tb_sales': row['total'],
+            'avg_delivery_delta': row['avg_delivery_delta'],
+            'tb_2000_sales': row['tb_2000_sales'],
+            'tb_4000_sales': row['tb_4000_sales']
+        }
+        for row in sorted(by_postcode, key=lambda row: -row['total'])
+    ]
+
+    return {
+        'total_orders': {'total_orders': totals.get('total', 0)},
+        'delivery_statuses': {
+            'delivery_successful': totals.get('delivery_successful', 0),
+            'delivery_unsuccessful': totals.get('delivery_unsuccessful', 0),
+            'delivery_in_transit': totals.get('delivery_in_transit', 0)
+        },
+        'sales_by_age': sales_by_age,
+        'data_by_postcode': data_by_postcode,
+        'customer_age': {
+            'avg_customer_age': totals.get('avg_customer_age'),
+            'max_customer_age': totals.get('max_customer_age'),
+            'min_customer_age': totals.get('min_customer_age')
+        },
+        'avg_delivery_delta': {
+            'avg_delivery_delta': totals.get('avg_delivery_delta'),
+            'max_delivery_delta': totals.get('max_delivery_delta'),
+            'min_delivery_delta': totals.get('min_delivery_delta')
+        },
+        'tb_2000_orders_by_age': _order_quantities(
+            by_age, 'customer_age', 'customer_age', 'tb_2000_sales'),
+        'tb_4000_orders_by_age': _order_quantities(
+            by_age, 'customer_age', 'customer_age', 'tb_4000_sales_iexact'),
+        'tb_2000_orders_by_postcode': _order_quantities(
+            by_postcode, 'delivery_postcode__postcode_area',
+            'postcode_area', 'tb_2000_sales'),
+        'tb_4000_orders_by_postcode': _order_quantities(
+            by_postcode, 'delivery_postcode__postcode_area',
+            'postcode_area', 'tb_4000_sales')
+    }
+
+
+def aggregate_full_data(toothbrush_type=None, start=None, end=None,
+                        sample=None):
+    """
+    Compute every 'get_full_data' section from the raw Full Orders.
+
+    If 'toothbrush_type' is given, all sections are restricted to
+    that toothbrush type (case insensitive); 'start' and 'end'
+    restrict them to orders placed within that range, which is read
+    in concurrent ranges of months when it spans several. With a
+    'sample', counts are estimated from a sample of the orders, in
+    one query.
+    """
+
+    if start is None or end is None or sample is not None:
+        return sections_from_rows(
+            _fetch_rows(toothbrush_type, start, end, sample))
+
+    ranges = month_ranges(start, end, settings.ANALYTICS_QUERY_CONCURRENCY)
+    if len(ranges) == 1:
+        return sections_from_rows(_fetch_rows(toothbrush_type, start, end))
+
+    return sections_from_rows(merge_rows(run_concurrently([
+        partial(_fetch_rows, toothbrush_type, lower, upper)
+        for lower, upper in ranges
+    ])))
+
+
+def summary_from_sections(sections):
+    """Return the 'toothbrush_summary' fields of full data sections."""
+
+    return {
+        'avg_customer_age': sections['customer_age']['avg_customer_age'],
+        'avg_delivery_delta':
+            sections['avg_delivery_delta']['avg_delivery_delta'],
+        'total_sales': sections['total_orders']['total_orders']
+    }
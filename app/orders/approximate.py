@@ -0,0 +1,176 @@
+"""
+Approximate analytics for very large order tables.
+
+With 'approximate=true', analytics over raw orders read a random
+sample of the table's pages ('TABLESAMPLE SYSTEM') sized to about
+'SAMPLE_ROWS' rows, and scale counts and sums back up by the
+sampling fraction. Averages, percentiles and extremes are taken
+from the sample as they are. Unfiltered counts come from the
+planner's row estimate ('pg_class.reltuples') instead, so both cost
+about the same at any table size.
+
+Tables estimated at no more than 'SAMPLE_ROWS' rows are always
+queried exactly. Responses report the sample with a 95% bound on
+the relative error of the total; the error of a smaller group of
+'k' sampled rows grows as 1 / sqrt(k).
+"""
+
+from math import sqrt
+
+from django.db import connection
+
+
+SAMPLE_ROWS = 100000
+
+# Normal quantile of the two sided 95% confidence interval.
+Z_95 = 1.96
+
+# Rows of a table, or of all partitions of a partitioned table,
+# scaled to its current size as the planner does.
+ESTIMATE_SQL = """
+    SELECT COALESCE(SUM(
+        CASE WHEN c.relpages > 0 THEN
+            c.reltuples / c.relpages
+            * (pg_relation_size(c.oid)
+               / current_setting('block_size')::integer)
+        ELSE 0 END
+    ), 0)::bigint
+    FROM pg_class c
+    WHERE c.relkind IN ('r', 'm')
+      AND (c.oid = %(table)s::regclass
+           OR c.oid IN (SELECT inhrelid FROM pg_inherits
+                        WHERE inhparent = %(table)s::regclass))
+"""
+
+COUNT_SQL = 'SELECT COUNT(*) FROM {table} o {sample} {where}'
+
+
+def wants_approximate(params):
+    """Return whether the query parameters ask for approximate data."""
+
+    return params.get('approximate', '').lower() in ('1', 'true')
+
+
+def estimated_rows(model):
+    """Return the planner's estimate of the rows in a model's table."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(ESTIMATE_SQL, {'table': model._meta.db_table})
+        return cursor.fetchone()[0]
+
+
+class Sample:
+    """
+    A 'TABLESAMPLE' clause reading 'percent' percent of a table,
+    with the arithmetic to scale sampled counts back up.
+    """
+
+    def __init__(self, percent):
+        self.percent = percent
+        self.fraction = percent / 100
+        self.sampled_rows = 0
+
+    @classmethod
+    def of(cls, model, rows=SAMPLE_ROWS):
+        """
+        Return a sample of about 'rows' rows of a model's table, or
+        None if the table is small enough to read in full.
+        """
+
+        estimate = estimated_rows(model)
+        if estimate <= rows:
+            return None
+        return cls(100 * rows / estimate)
+
+    def clause(self):
+        return f'TABLESAMPLE SYSTEM ({self.percent!r})'
+
+    def scale(self, value):
+        return None if value is None else round(value / self.fraction)
+
+    def scale_rows(self, rows, columns, count_column=None):
+        """
+        Scale the 'columns' of every row in place. The rows sampled
+        are counted from 'count_column' of each row.
+        """
+
+        for row in rows:
+            if count_column is not None:
+                self.sampled_rows += row[count_column] or 0
+            for column in columns:
+                row[column] = self.scale(row[column])
+
+        return rows
+
+    def relative_error(self):
+        if not self.sampled_rows:
+            return None
+        return Z_95 * sqrt((1 - self.fraction) / self.sampled_rows)
+
+    def report(self):
+        """Describe the sample for the API response."""
+
+        error = self.relative_error()
+        return {
+            'method': 'sample',
+            'sample_percent': round(self.percent, 4),
+            'sampled_rows': self.sampled_rows,
+            'confidence': 0.95,
+            'relative_error': None if error is None else round(error, 4),
+        }
+
+
+def sample_for(model, params):
+    """
+    Return a Sample of a model's table if the query parameters ask
+    for approximate data and the table is large enough.
+    """
+
+    return Sample.of(model) if wants_approximate(params) else None
+
+
+def with_approximation(data, params, sample):
+    """
+    Add how 'data' was approximated (None if it is exact) to a
+    response dict, if the query parameters asked for approximate data.
+    """
+
+    if wants_approximate(params):
+        data['approximation'] = (
+            sample.report() if sample is not None else None)
+    return data
+
+
+def approximate_count(model, where='', params=None):
+    """
+    Count the rows of a model's table matching a 'WHERE' clause over
+    the table aliased 'o'. Returns the count and a report of how it
+    was approximated, or None if it is exact.
+    """
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    estimate = estimated_rows(model)
+
+    if estimate <= SAMPLE_ROWS:
+        sample = None
+    elif not where:
+        return estimate, {'method': 'estimate'}
+    else:
+        sample = Sample(100 * SAMPLE_ROWS / estimate)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            COUNT_SQL.format(
+                table=table,
+                sample=sample.clause() if sample else '',
+                where=where
+            ),
+            params
+        )
+        count = cursor.fetchone()[0]
+
+    if sample is None:
+        return count, None
+
+    sample.sampled_rows = count
+    return sample.scale(count), sample.report()
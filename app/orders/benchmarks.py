@@ -0,0 +1,386 @@
+"""
+Endpoint benchmarks for the Orders API.
+
+Every endpoint in 'orders/urls.py' is requested in-process through
+the DRF test client. Latency percentiles, SQL statement counts and
+peak Python memory are recorded per endpoint and can be saved as a
+JSON baseline, then compared against later runs.
+
+Write requests run in a transaction that is rolled back, so the
+data set is the same for every iteration and every run.
+"""
+
+from statistics import quantiles
+from time import perf_counter
+import datetime
+import io
+import platform
+import tracemalloc
+import uuid
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.metrics import QueryRecorder
+from core.parsers import ORJSONParser, MessagePackParser
+from core.renderers import ORJSONRenderer, MessagePackRenderer
+from core.models import (
+    FullOrder,
+    TodaysOrder,
+    NullOrder,
+    DeliveryPostcode,
+    BillingPostcode
+)
+
+from orders.cache import ANALYTICS_CACHE
+from orders.generator import OrderGenerator
+
+
+BASELINE_VERSION = 1
+
+# Relative slowdown (or memory growth) reported as a regression.
+DEFAULT_THRESHOLD = 0.2
+
+# (name, renderer, parser) pairs compared by benchmark_codecs().
+CODECS = (
+    ('json', JSONRenderer, JSONParser),
+    ('orjson', ORJSONRenderer, ORJSONParser),
+    ('msgpack', MessagePackRenderer, MessagePackParser),
+)
+
+
+def order_payload(order_type='full'):
+    """Return an API payload for one new order."""
+
+    now = timezone.now()
+    payload = {
+        'order_number': f'BENCH-{uuid.uuid4().hex[:12]}',
+        'toothbrush_type': 'Toothbrush 2000',
+        'order_date': now - datetime.timedelta(days=2),
+        'customer_age': 35,
+        'order_quantity': 1,
+        'is_first': True,
+        'delivery_postcode': {'postcode': 'LS1 1AA', 'postcode_area': 'LS'},
+        'billing_postcode': {'postcode': 'LS1 1AA', 'postcode_area': 'LS'},
+    }
+
+    if order_type != 'null':
+        payload.update({
+            'dispatch_status': 'Dispatched',
+            'dispatch_date': now - datetime.timedelta(days=1),
+            'delivery_status': 'Delivered',
+            'delivery_date': now,
+        })
+
+    return payload
+
+
+def order_file(order_type, rows=100):
+    generator = OrderGenerator(order_type, postcodes=rows)
+    return SimpleUploadedFile(
+        'orders.csv', generator.chunk(rows).getvalue().encode('utf-8'))
+
+
+class Endpoint:
+    """
+    One benchmarked request.
+
+    'data' may be a callable, called for every request so created
+    orders get fresh order numbers. Detail endpoints are requested
+    for the first row of 'detail_model'.
+    """
+
+    def __init__(self, name, url_name, method='get', params=None,
+                 data=None, format='json', detail_model=None):
+        self.name = name
+        self.url_name = url_name
+        self.method = method
+        self.params = params or {}
+        self.data = data
+        self.format = format
+        self.detail_model = detail_model
+
+    def url(self):
+        if self.detail_model is None:
+            return reverse(self.url_name)
+
+        pk = self.detail_model.objects.order_by('pk') \
+            .values_list('pk', flat=True).first()
+        return None if pk is None else reverse(self.url_name, args=[pk])
+
+    def request(self, client, url):
+        if self.method == 'get':
+            return client.get(url, self.params)
+
+        data = self.data() if callable(self.data) else self.data
+        return getattr(client, self.method)(url, data, format=self.format)
+
+
+# The bulk 'delete' and 'rollover' actions are left out: they empty a
+# whole table, so their cost only measures the size of the data set.
+ENDPOINTS = (
+    Endpoint('full_orders.list', 'orders:full_orders-list'),
+    Endpoint('full_orders.list.postal_region', 'orders:full_orders-list',
+             params={'postal_region': 'LS'}),
+    Endpoint('full_orders.retrieve', 'orders:full_orders-detail',
+             detail_model=FullOrder),
+    Endpoint('full_orders.get_full_data',
+             'orders:full_orders-get-full-data'),
+    Endpoint('full_orders.get_full_data.toothbrush_type',
+             'orders:full_orders-get-full-data',
+             params={'toothbrush_type': 'toothbrush_2000'}),
+    Endpoint('full_orders.get_full_data_by_tb_type',
+             'orders:full_orders-get-full-data-by-tb-type',
+             params={'toothbrush_type': 'toothbrush_4000'}),
+    Endpoint('full_orders.get_sales_over_time',
+             'orders:full_orders-get-sales-over-time'),
+    Endpoint('full_orders.get_sales_over_time.month',
+             'orders:full_orders-get-sales-over-time',
+             params={'interval': 'month', 'by_toothbrush_type': '1'}),
+    Endpoint('full_orders.get_distributions',
+             'orders:full_orders-get-distributions'),
+    Endpoint('full_orders.export', 'orders:full_orders-export'),
+    Endpoint('full_orders.create', 'orders:full_orders-list', 'post',
+             data=order_payload),
+    Endpoint('full_orders.bulk_create', 'orders:full_orders-list', 'post',
+             data=lambda: [order_payload() for _ in range(100)]),
+    Endpoint('full_orders.update', 'orders:full_orders-detail', 'patch',
+             data={'customer_age': 36}, detail_model=FullOrder),
+    Endpoint('full_orders.import', 'orders:full_orders-import-file', 'post',
+             data=lambda: {'file': order_file('full')}, format='multipart'),
+    Endpoint('todays_orders.list', 'orders:todays_orders-list'),
+    Endpoint('todays_orders.count', 'orders:todays_orders-count'),
+    Endpoint('todays_orders.count.toothbrush_type',
+             'orders:todays_orders-count',
+             params={'toothbrush_type': 'toothbrush_2000'}),
+    Endpoint('todays_orders.export', 'orders:todays_orders-export'),
+    Endpoint('todays_orders.create', 'orders:todays_orders-list', 'post',
+             data=lambda: order_payload('todays')),
+    Endpoint('todays_orders.import', 'orders:todays_orders-import-file',
+             'post', data=lambda: {'file': order_file('todays')},
+             format='multipart'),
+    Endpoint('null_orders.list', 'orders:null_orders-list'),
+    Endpoint('null_orders.get_null_orders',
+             'orders:null_orders-get-null-orders',
+             params={'toothbrush_type': 'toothbrush_2000'}),
+    Endpoint('null_orders.export', 'orders:null_orders-export'),
+    Endpoint('null_orders.create', 'orders:null_orders-list', 'post',
+             data=lambda: order_payload('null')),
+    Endpoint('count_tb_type', 'orders:count_tb_type'),
+    Endpoint('delivery_postcodes.list', 'orders:delivery_postcodes-list'),
+    Endpoint('delivery_postcodes.retrieve',
+             'orders:delivery_postcodes-detail',
+             detail_model=DeliveryPostcode),
+    Endpoint('billing_postcodes.list', 'orders:billing_postcodes-list'),
+    Endpoint('billing_postcodes.retrieve', 'orders:billing_postcodes-detail',
+             detail_model=BillingPostcode),
+)
+
+
+def percentiles(samples):
+    """Return the p50, p95 and p99 of at least two samples."""
+
+    cuts = quantiles(samples, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+def _request(endpoint, client, url, recorder=None):
+    """Run one request (rolled back), returning its duration."""
+
+    with transaction.atomic():
+        start = perf_counter()
+
+        if recorder is None:
+            response = endpoint.request(client, url)
+        else:
+            with connection.execute_wrapper(recorder):
+                response = endpoint.request(client, url)
+
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+
+        duration = perf_counter() - start
+        transaction.set_rollback(True)
+
+    if response.status_code >= 400:
+        raise RuntimeError(
+            f'{endpoint.name} returned {response.status_code}')
+
+    return duration
+
+
+def run_endpoint(endpoint, client, iterations, warm_cache=False):
+    """Benchmark one endpoint; return None if it has nothing to hit."""
+
+    url = endpoint.url()
+    if url is None:
+        return None
+
+    cache = caches[ANALYTICS_CACHE]
+    durations = []
+    query_counts = []
+
+    for _ in range(iterations):
+        if not warm_cache:
+            cache.clear()
+
+        recorder = QueryRecorder()
+        durations.append(_request(endpoint, client, url, recorder))
+        query_counts.append(recorder.count)
+
+    # Tracing slows every allocation down, so memory is measured in
+    # a separate request that is left out of the latency figures.
+    if not warm_cache:
+        cache.clear()
+
+    tracemalloc.start()
+    try:
+        _request(endpoint, client, url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latency = percentiles([duration * 1000 for duration in durations])
+
+    return {
+        'url': url,
+        'method': endpoint.method.upper(),
+        'latency_ms': {key: round(value, 3) for key, value in latency.items()},
+        'queries': max(query_counts),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(iterations=20, names=None, warm_cache=False,
+                   progress=None):
+    """
+    Benchmark the selected endpoints (all by default) and return
+    the results in the baseline file format.
+    """
+
+    if iterations < 2:
+        raise ValueError('At least 2 iterations are needed.')
+
+    client = APIClient(HTTP_HOST='127.0.0.1')
+    results = {}
+
+    for endpoint in ENDPOINTS:
+        if names and endpoint.name not in names:
+            continue
+
+        result = run_endpoint(endpoint, client, iterations, warm_cache)
+        if result is not None:
+            results[endpoint.name] = result
+
+        if progress is not None:
+            progress(endpoint.name, result)
+
+    return {
+        'version': BASELINE_VERSION,
+        'created': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'iterations': iterations,
+        'warm_cache': warm_cache,
+        'rows': {
+            model._meta.db_table: model.objects.count()
+            for model in (FullOrder, TodaysOrder, NullOrder,
+                          DeliveryPostcode, BillingPostcode)
+        },
+        'endpoints': results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Return a message for every regression of 'current' against
+    'baseline': a p95 latency or peak memory more than 'threshold'
+    above the baseline, or any extra SQL statements.
+    """
+
+    regressions = []
+
+    for name, result in current['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            continue
+
+        p95 = result['latency_ms']['p95']
+        base_p95 = base['latency_ms']['p95']
+        if p95 > base_p95 * (1 + threshold):
+            regressions.append(
+                f'{name}: p95 latency {base_p95:.1f} ms -> {p95:.1f} ms')
+
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: SQL queries {base["queries"]} -> '
+                f'{result["queries"]}')
+
+        memory = result['peak_memory_kb']
+        base_memory = base['peak_memory_kb']
+        if memory > base_memory * (1 + threshold):
+            regressions.append(
+                f'{name}: peak memory {base_memory:.0f} KB -> '
+                f'{memory:.0f} KB')
+
+    return regressions
+
+
+def order_documents(count):
+    """Return 'count' orders shaped like the list and bulk payloads."""
+
+    payload = order_payload()
+    documents = []
+
+    for i in range(count):
+        document = dict(payload, id=i, order_number=f'BENCH-{i:09d}')
+        for field in ('order_date', 'dispatch_date', 'delivery_date'):
+            document[field] = (
+                payload[field] + datetime.timedelta(seconds=i)
+            ).isoformat().replace('+00:00', 'Z')
+        documents.append(document)
+
+    return documents
+
+
+def benchmark_codecs(orders=100000, repeat=3):
+    """
+    Time rendering and parsing 'orders' orders with each codec.
+    Returns the best of 'repeat' runs as orders per second.
+    """
+
+    documents = order_documents(orders)
+    results = {}
+
+    for name, renderer_class, parser_class in CODECS:
+        renderer = renderer_class()
+        parser = parser_class()
+        encode = []
+        decode = []
+
+        for _ in range(repeat):
+            start = perf_counter()
+            body = renderer.render(documents)
+            encode.append(perf_counter() - start)
+
+            start = perf_counter()
+            parsed = parser.parse(io.BytesIO(body))
+            decode.append(perf_counter() - start)
+
+        if len(parsed) != orders:
+            raise RuntimeError(f'{name} did not round trip the orders')
+
+        results[name] = {
+            'bytes': len(body),
+            'encode_orders_per_s': round(orders / min(encode)),
+            'decode_orders_per_s': round(orders / min(decode)),
+        }
+
+    return results
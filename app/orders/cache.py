@@ -0,0 +1,125 @@
+"""
+Response cache for the analytics endpoints.
+
+Responses are stored in the 'analytics' cache (local memory by
+default; any Django cache backend such as the file or database
+backends can be configured) under a key made of the request path,
+the normalized query parameters and the current data versions of
+the order tables the endpoint reads. Every write bumps those
+versions, so a read never returns a response computed before it.
+"""
+
+from functools import wraps
+import hashlib
+
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils.http import urlencode
+
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from core.models import DataVersion
+
+
+ANALYTICS_CACHE = 'analytics'
+
+FULL_ORDERS = 'full_orders'
+TODAYS_ORDERS = 'todays_orders'
+NULL_ORDERS = 'null_orders'
+POSTCODES = 'postcodes'
+
+BUMP_SQL = """
+    INSERT INTO {table} (name, version) VALUES (%s, 1)
+    ON CONFLICT (name) DO UPDATE SET version = {table}.version + 1
+"""
+
+
+def get_data_versions(scopes):
+    """Return the current version of each scope, in order."""
+
+    versions = dict(
+        DataVersion.objects.filter(name__in=scopes)
+        .values_list('name', 'version')
+    )
+    return [versions.get(scope, 0) for scope in scopes]
+
+
+def _bump(scopes):
+    table = connection.ops.quote_name(DataVersion._meta.db_table)
+
+    with connection.cursor() as cursor:
+        for scope in sorted(scopes):
+            cursor.execute(BUMP_SQL.format(table=table), [scope])
+
+
+def bump_data_version(*scopes):
+    """
+    Invalidate cached responses reading the given scopes.
+
+    The bump runs once the current transaction commits, so it never
+    holds a lock on the counter row while the write is in progress.
+    """
+
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def cache_key(request, scopes):
+    params = urlencode(sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    ))
+    versions = ','.join(str(v) for v in get_data_versions(scopes))
+    raw = f'{request.path}?{params}@{versions}'
+
+    return 'analytics:' + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def cache_analytics(*scopes, timeout=None):
+    """
+    Cache the data of successful responses of a viewset method.
+
+    'timeout' overrides the TIMEOUT of the analytics cache.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            cache = caches[ANALYTICS_CACHE]
+            key = cache_key(request, scopes)
+            data = cache.get(key)
+
+            if data is not None:
+                return Response(data)
+
+            response = func(self, request, *args, **kwargs)
+
+            if response.status_code == status.HTTP_200_OK:
+                if timeout is None:
+                    cache.set(key, response.data)
+                else:
+                    cache.set(key, response.data, timeout)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+class DataVersionMixin:
+    """
+    Bump the viewset's data version scopes after every
+    successful write request.
+    """
+
+    data_version_scopes = ()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (request.method not in SAFE_METHODS
+                and status.is_success(response.status_code)):
+            bump_data_version(*self.data_version_scopes)
+
+        return super().finalize_response(request, response, *args, **kwargs)
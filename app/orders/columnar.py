@@ -0,0 +1,318 @@
+"""
+Column-at-a-time validation of bulk order payloads.
+
+DRF validates a list by running every field of the child serializer
+on every row, which dominates the cost of large bulk creates. Here
+the rows are turned into columns, and each column is checked with
+one tight loop covering the types, lengths, ranges and ISO-8601
+datetimes a serializer's fields allow. Unique fields are checked
+with one query per column rather than one per row.
+
+The column checks only accept values the serializer would accept
+unchanged, and return the same validated values. Any row they do
+not accept is validated by the serializer itself, so invalid rows
+get exactly the errors ModelSerializer gives them. Serializers with
+validation this module cannot reproduce (custom 'validate' methods,
+serializer validators, other field types or validators) are
+validated row by row as before.
+"""
+
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.core.validators import (
+    MaxLengthValidator,
+    MinLengthValidator,
+    MaxValueValidator,
+    MinValueValidator,
+    ProhibitNullCharactersValidator
+)
+from django.utils.dateparse import parse_datetime
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.fields import empty
+from rest_framework.settings import api_settings
+from rest_framework.validators import (
+    UniqueValidator,
+    ProhibitSurrogateCharactersValidator
+)
+
+
+# A value the column checks leave to the serializer, and a missing
+# optional value left out of the validated data.
+DEFER = object()
+SKIP = object()
+
+# Values looked up per query by the unique checks.
+UNIQUE_BATCH = 10000
+
+CHAR_VALIDATORS = (MaxLengthValidator, MinLengthValidator,
+                   ProhibitNullCharactersValidator,
+                   ProhibitSurrogateCharactersValidator)
+INTEGER_VALIDATORS = (MaxValueValidator, MinValueValidator)
+
+
+class Unsupported(Exception):
+    """A field whose validation the column checks cannot reproduce."""
+
+
+def _limits(field, min_type, max_type):
+    """Return the tightest limits set by a field's validators."""
+
+    low = high = None
+
+    for validator in field.validators:
+        if not isinstance(validator, (min_type, max_type)):
+            continue
+        if callable(validator.limit_value):
+            raise Unsupported
+        if isinstance(validator, min_type):
+            low = max(low, validator.limit_value) if low is not None \
+                else validator.limit_value
+        else:
+            high = min(high, validator.limit_value) if high is not None \
+                else validator.limit_value
+
+    return low, high
+
+
+def _char(field):
+    low, high = _limits(field, MinLengthValidator, MaxLengthValidator)
+
+    def convert(value):
+        # Non-ASCII strings may hold surrogates: left to the field.
+        if type(value) is not str or not value.isascii() or '\x00' in value:
+            return DEFER
+        if field.trim_whitespace:
+            value = value.strip()
+        if not value:
+            return '' if field.allow_blank else DEFER
+        if ((low is not None and len(value) < low)
+                or (high is not None and len(value) > high)):
+            return DEFER
+        return value
+
+    return convert
+
+
+def _integer(field):
+    low, high = _limits(field, MinValueValidator, MaxValueValidator)
+
+    def convert(value):
+        if (type(value) is not int
+                or (low is not None and value < low)
+                or (high is not None and value > high)):
+            return DEFER
+        return value
+
+    return convert
+
+
+def _boolean(field):
+    def convert(value):
+        return value if type(value) is bool else DEFER
+
+    return convert
+
+
+def _datetime(field):
+    input_formats = getattr(field, 'input_formats',
+                            api_settings.DATETIME_INPUT_FORMATS)
+    if [f.lower() for f in input_formats] != [ISO_8601]:
+        raise Unsupported
+
+    def convert(value):
+        if type(value) is not str:
+            return DEFER
+        try:
+            parsed = parse_datetime(value)
+        except (ValueError, TypeError):
+            return DEFER
+        if parsed is None:
+            return DEFER
+        try:
+            return field.enforce_timezone(parsed)
+        except serializers.ValidationError:
+            return DEFER
+
+    return convert
+
+
+CONVERTERS = {
+    serializers.CharField: (_char, CHAR_VALIDATORS),
+    serializers.IntegerField: (_integer, INTEGER_VALIDATORS),
+    serializers.BooleanField: (_boolean, ()),
+    serializers.DateTimeField: (_datetime, ()),
+}
+
+
+def _converter(field):
+    """
+    Return a function converting a list of the values given for a
+    field (neither missing nor None).
+    """
+
+    if isinstance(field, serializers.Serializer):
+        plan = column_plan(field)
+        if plan is None:
+            raise Unsupported
+        return lambda values: _validate_rows(plan, values)
+
+    if type(field) not in CONVERTERS:
+        raise Unsupported
+
+    build, allowed = CONVERTERS[type(field)]
+
+    for validator in field.validators:
+        if isinstance(validator, UniqueValidator):
+            if validator.lookup != 'exact':
+                raise Unsupported
+        elif not isinstance(validator, allowed):
+            raise Unsupported
+
+    convert = build(field)
+    return lambda values: [convert(value) for value in values]
+
+
+def column_plan(serializer):
+    """
+    Return the writable fields of a serializer with the converters
+    of their columns, or None if its validation is not supported.
+    """
+
+    if (type(serializer).validate is not serializers.Serializer.validate
+            or serializer.validators
+            or getattr(serializer.root, 'partial', False)):
+        return None
+
+    plan = []
+
+    for field in serializer.fields.values():
+        if field.read_only:
+            continue
+        if (hasattr(serializer, f'validate_{field.field_name}')
+                or field.source != field.field_name):
+            return None
+        try:
+            plan.append((field, _converter(field)))
+        except Unsupported:
+            return None
+
+    return plan
+
+
+def _validate_column(field, convert, values):
+    results = [None] * len(values)
+    given = []
+
+    for i, value in enumerate(values):
+        if value is empty:
+            results[i] = (
+                DEFER if field.required or field.default is not empty
+                else SKIP
+            )
+        elif value is None:
+            results[i] = None if field.allow_null else DEFER
+        else:
+            given.append(i)
+
+    for i, value in zip(given, convert([values[i] for i in given])):
+        results[i] = value
+
+    return results
+
+
+def _check_unique(field, validator, column, valid):
+    """Mark the rows holding a value already stored as not valid."""
+
+    # Fields skip their validators for null and blank values.
+    values = list({
+        value for ok, value in zip(valid, column)
+        if ok and value is not None and value is not SKIP and value != ''
+    })
+    taken = set()
+
+    for start in range(0, len(values), UNIQUE_BATCH):
+        taken.update(
+            validator.queryset.filter(**{
+                f'{field.source}__in': values[start:start + UNIQUE_BATCH]
+            }).values_list(field.source, flat=True)
+        )
+
+    if taken:
+        for i, value in enumerate(column):
+            if valid[i] and value in taken:
+                valid[i] = False
+
+
+def _validate_rows(plan, rows):
+    """
+    Return the validated data of each row, or DEFER for the rows the
+    column checks do not accept.
+    """
+
+    valid = [isinstance(row, Mapping) for row in rows]
+    columns = []
+
+    for field, convert in plan:
+        values = [
+            row.get(field.field_name, empty) if ok else empty
+            for row, ok in zip(rows, valid)
+        ]
+        column = _validate_column(field, convert, values)
+
+        for i, value in enumerate(column):
+            if value is DEFER:
+                valid[i] = False
+
+        columns.append((field, column))
+
+    for field, column in columns:
+        for validator in field.validators:
+            if isinstance(validator, UniqueValidator):
+                _check_unique(field, validator, column, valid)
+
+    results = []
+
+    for i, ok in enumerate(valid):
+        if not ok:
+            results.append(DEFER)
+            continue
+
+        attrs = OrderedDict()
+        for field, column in columns:
+            if column[i] is not SKIP:
+                attrs[field.source] = column[i]
+        results.append(attrs)
+
+    return results
+
+
+def validate_rows(serializer, rows):
+    """
+    Validate a list of input rows with a serializer (the child of a
+    ListSerializer). Returns the validated data of each row (None
+    if it is invalid) and the errors of each row ({} if it is valid),
+    as running the serializer on every row would.
+    """
+
+    plan = column_plan(serializer)
+    fast = _validate_rows(plan, rows) if plan is not None \
+        else [DEFER] * len(rows)
+
+    validated = []
+    errors = []
+
+    for row, attrs in zip(rows, fast):
+        if attrs is DEFER:
+            try:
+                attrs = serializer.run_validation(row)
+            except serializers.ValidationError as e:
+                validated.append(None)
+                errors.append(e.detail)
+                continue
+
+        validated.append(attrs)
+        errors.append({})
+
+    return validated, errors
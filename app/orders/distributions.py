@@ -0,0 +1,212 @@
+"""
+Percentiles and histograms of Full Order delivery deltas and
+customer ages.
+
+Everything is computed by one query: the filtered orders are read
+once into a CTE, then 'percentile_cont' gives the percentiles and
+'width_bucket' sorts the values into equal width bins between their
+minimum and maximum. Delivery deltas are measured in seconds.
+"""
+
+from django.db import connection
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import FullOrder, DeliveryPostcode
+
+from orders.aggregations import order_filters
+
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+DEFAULT_BINS = 10
+MAX_BINS = 1000
+
+# (name in the response, expression over the filtered row)
+METRICS = (
+    ('delivery_delta_seconds', 'delivery_delta'),
+    ('customer_age', 'customer_age'),
+)
+
+HISTOGRAM_SQL = """
+    {name}_histogram AS (
+        SELECT
+            CASE WHEN s.{name}_max > s.{name}_min THEN LEAST(
+                width_bucket(f.{column}, s.{name}_min, s.{name}_max,
+                             %(bins)s),
+                %(bins)s)
+            ELSE 1 END AS bucket,
+            COUNT(*) AS count
+        FROM filtered f CROSS JOIN stats s
+        WHERE f.{column} IS NOT NULL
+        GROUP BY 1
+    )
+"""
+
+DISTRIBUTION_SQL = """
+    WITH filtered AS (
+        SELECT
+            EXTRACT(EPOCH FROM o.delivery_date - o.order_date)
+                ::double precision AS delivery_delta,
+            o.customer_age::double precision AS customer_age
+        FROM {order_table} o {sample}
+        LEFT JOIN {postcode_table} p ON p.id = o.delivery_postcode_id
+        {where}
+    ),
+    stats AS (
+        SELECT
+            COUNT(*) AS total,
+            {stats}
+        FROM filtered
+    ),
+    {histograms}
+    SELECT
+        s.*,
+        {histogram_columns}
+    FROM stats s
+"""
+
+STATS_SQL = """
+    MIN({column}) AS {name}_min,
+    MAX({column}) AS {name}_max,
+    percentile_cont(%(fractions)s::double precision[])
+        WITHIN GROUP (ORDER BY {column}) AS {name}_percentiles
+"""
+
+
+def parse_percentiles(value):
+    """Parse a comma separated list of percentiles between 0 and 100."""
+
+    if not value:
+        return list(DEFAULT_PERCENTILES)
+
+    try:
+        percentiles = [float(item) for item in value.split(',')]
+    except ValueError:
+        percentiles = []
+    if not percentiles or not all(0 <= p <= 100 for p in percentiles):
+        raise ValidationError(
+            {'percentiles': 'Expected numbers between 0 and 100, '
+                            'separated by commas.'})
+
+    return percentiles
+
+
+def parse_bins(value):
+    if not value:
+        return DEFAULT_BINS
+
+    try:
+        bins = int(value)
+    except ValueError:
+        bins = 0
+    if not 1 <= bins <= MAX_BINS:
+        raise ValidationError(
+            {'bins': f'Expected a whole number from 1 to {MAX_BINS}.'})
+
+    return bins
+
+
+def build_query(percentiles, bins, toothbrush_type=None, postcode_area=None,
+                start=None, end=None, sample=None):
+    """Return the SQL and parameters of the distribution query."""
+
+    params = {
+        'fractions': [p / 100 for p in percentiles],
+        'bins': bins,
+    }
+    where = order_filters(params, toothbrush_type, start, end)
+
+    if postcode_area is not None:
+        where += ' AND ' if where else 'WHERE '
+        where += 'p.postcode_area = %(postcode_area)s'
+        params['postcode_area'] = postcode_area
+
+    sql = DISTRIBUTION_SQL.format(
+        order_table=connection.ops.quote_name(FullOrder._meta.db_table),
+        sample=sample.clause() if sample is not None else '',
+        postcode_table=connection.ops.quote_name(
+            DeliveryPostcode._meta.db_table),
+        where=where,
+        stats=','.join(
+            STATS_SQL.format(name=name, column=column)
+            for name, column in METRICS
+        ),
+        histograms=','.join(
+            HISTOGRAM_SQL.format(name=name, column=column)
+            for name, column in METRICS
+        ),
+        histogram_columns=', '.join(
+            f'(SELECT json_object_agg(bucket, count) '
+            f'FROM {name}_histogram) AS {name}_histogram'
+            for name, _ in METRICS
+        )
+    )
+
+    return sql, params
+
+
+def _histogram(counts, low, high, bins, scale=None):
+    """Return every bin with its bounds, including empty ones."""
+
+    if scale is not None:
+        counts = {bucket: scale(count) for bucket, count in counts.items()}
+
+    if low is None:
+        return []
+    if high == low:
+        return [{'lower': low, 'upper': high, 'count': counts.get('1', 0)}]
+
+    width = (high - low) / bins
+    return [
+        {
+            'lower': low + width * i,
+            'upper': high if i == bins - 1 else low + width * (i + 1),
+            'count': counts.get(str(i + 1), 0),
+        }
+        for i in range(bins)
+    ]
+
+
+def distributions(percentiles=DEFAULT_PERCENTILES, bins=DEFAULT_BINS,
+                  toothbrush_type=None, postcode_area=None, start=None,
+                  end=None, sample=None):
+    """
+    Return the number of orders matched and, for each metric, its
+    minimum, maximum, percentiles (keyed 'p50', 'p99.9', ...) and a
+    histogram of 'bins' bins. The last bin includes the maximum.
+
+    With a 'sample' (orders.approximate), everything is computed
+    from a sample and the total and bin counts are scaled up.
+    """
+
+    sql, params = build_query(percentiles, bins, toothbrush_type,
+                              postcode_area, start, end, sample)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        row = dict(zip(columns, cursor.fetchone()))
+
+    if sample is not None:
+        sample.sampled_rows = row['total']
+        row['total'] = sample.scale(row['total'])
+
+    data = {'total': row['total']}
+
+    for name, _ in METRICS:
+        low, high = row[f'{name}_min'], row[f'{name}_max']
+        values = row[f'{name}_percentiles'] or [None] * len(percentiles)
+
+        data[name] = {
+            'min': low,
+            'max': high,
+            'percentiles': {
+                f'p{percentile:g}': value
+                for percentile, value in zip(percentiles, values)
+            },
+            'histogram': _histogram(
+                row[f'{name}_histogram'] or {}, low, high, bins,
+                sample.scale if sample is not None else None),
+        }
+
+    return data
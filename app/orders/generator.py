@@ -0,0 +1,230 @@
+"""
+Synthetic order data for benchmarks.
+
+Orders are generated a column at a time for each chunk, written to
+an in-memory CSV file and loaded with the COPY based importer, so
+large data sets (10M rows) take minutes rather than hours and go
+through the same postcode and rollup merges as a real import.
+"""
+
+from pathlib import Path
+import csv
+import datetime
+import io
+import math
+import random
+import uuid
+
+from django.utils import timezone
+
+from orders.importer import import_orders, ORDER_MODELS
+
+
+CHUNK_SIZE = 100000
+
+# Shorthands accepted for the number of rows, e.g. '10k' or '1m'.
+ROW_SUFFIXES = {'k': 1000, 'm': 1000000}
+
+AREAS_FILE = Path(__file__).resolve().parent / 'files' / 'areas.csv'
+
+TOOTHBRUSH_TYPES = (('Toothbrush 2000', 60), ('Toothbrush 4000', 40))
+DELIVERY_STATUSES = (
+    ('Delivered', 85), ('In Transit', 10), ('Unsuccessful', 5))
+ORDER_QUANTITIES = ((1, 50), (2, 25), (3, 12), (4, 7), (5, 6))
+
+GENERATED_COLUMNS = [
+    'order_number', 'toothbrush_type', 'order_date', 'customer_age',
+    'order_quantity', 'is_first', 'dispatch_status', 'dispatch_date',
+    'delivery_status', 'delivery_date', 'delivery_postcode',
+    'delivery_postcode_area', 'billing_postcode', 'billing_postcode_area',
+]
+
+
+def parse_row_count(value):
+    """Parse '10000', '10k' or '10m' into a number of rows."""
+
+    value = str(value).strip().lower()
+    multiplier = ROW_SUFFIXES.get(value[-1:], 1)
+    if multiplier != 1:
+        value = value[:-1]
+
+    rows = int(value) * multiplier
+    if rows <= 0:
+        raise ValueError('Row count must be positive.')
+    return rows
+
+
+def _weighted(rng, choices, k):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights, k=k)
+
+
+def _offsets(rng, k, low, high):
+    """Return k random timedeltas between low and high seconds."""
+
+    return [datetime.timedelta(seconds=rng.randint(low, high))
+            for _ in range(k)]
+
+
+def _format_dates(dates):
+    return [None if date is None else date.isoformat() for date in dates]
+
+
+def postcode_pool(rng, size):
+    """Return (postcode, area) pairs in the UK postcode format."""
+
+    with open(AREAS_FILE) as f:
+        areas = [line.strip() for line in f if line.strip()]
+
+    letters = 'ABDEFGHJLNPQRSTUWXYZ'
+    pool = set()
+
+    while len(pool) < size:
+        area = rng.choice(areas)
+        pool.add((
+            f'{area}{rng.randint(1, 20)} {rng.randint(0, 9)}'
+            f'{rng.choice(letters)}{rng.choice(letters)}',
+            area
+        ))
+
+    return sorted(pool)
+
+
+class OrderGenerator:
+    """
+    Generate orders of one type in chunks of CSV text.
+
+    Full orders are dispatched and mostly delivered over the last
+    year, Todays orders were placed today and are partly dispatched,
+    and Null orders have no dispatch or delivery details.
+    """
+
+    def __init__(self, order_type='full', seed=None, postcodes=10000,
+                 now=None):
+        if order_type not in ORDER_MODELS:
+            raise ValueError(f'Unknown order type: {order_type}')
+
+        self.order_type = order_type
+        self.rng = random.Random(seed)
+        self.now = now or timezone.now()
+        self.postcodes = postcode_pool(self.rng, postcodes)
+        self.run_id = uuid.uuid4().hex[:10]
+        self.generated = 0
+
+        # Customer ages roughly follow a normal distribution.
+        self.ages = [
+            (age, max(1, int(1000 * math.exp(-((age - 40) / 15) ** 2))))
+            for age in range(18, 91)
+        ]
+
+    def _order_dates(self, k):
+        if self.order_type == 'todays':
+            start = self.now.replace(hour=0, minute=0, second=0,
+                                     microsecond=0)
+            span = max(1, int((self.now - start).total_seconds()))
+        else:
+            span = 365 * 24 * 3600
+            start = self.now - datetime.timedelta(seconds=span)
+
+        return [start + offset for offset in _offsets(self.rng, k, 0, span)]
+
+    def _fulfilment(self, order_dates):
+        """Return the dispatch and delivery columns of a chunk."""
+
+        k = len(order_dates)
+
+        if self.order_type == 'null':
+            empty = [None] * k
+            return empty, empty, empty, empty
+
+        dispatch_dates = [
+            date + offset for date, offset
+            in zip(order_dates, _offsets(self.rng, k, 3600, 48 * 3600))
+        ]
+        delivery_statuses = _weighted(self.rng, DELIVERY_STATUSES, k)
+        delivery_dates = [
+            date + offset for date, offset
+            in zip(dispatch_dates, _offsets(self.rng, k, 86400, 5 * 86400))
+        ]
+        dispatch_statuses = ['Dispatched'] * k
+
+        if self.order_type == 'todays':
+            # Orders not dispatched yet have no later details.
+            for i, date in enumerate(dispatch_dates):
+                if date > self.now:
+                    dispatch_statuses[i] = dispatch_dates[i] = None
+                    delivery_statuses[i] = delivery_dates[i] = None
+                elif delivery_dates[i] > self.now:
+                    delivery_statuses[i] = 'In Transit'
+                    delivery_dates[i] = None
+
+        return (dispatch_statuses, dispatch_dates,
+                delivery_statuses, delivery_dates)
+
+    def chunk(self, k):
+        """Return the CSV text (with header) of the next k orders."""
+
+        rng = self.rng
+        start = self.generated
+        self.generated += k
+
+        order_dates = self._order_dates(k)
+        (dispatch_statuses, dispatch_dates,
+         delivery_statuses, delivery_dates) = self._fulfilment(order_dates)
+
+        delivery = rng.choices(self.postcodes, k=k)
+        billing = [
+            postcode if rng.random() < 0.9 else rng.choice(self.postcodes)
+            for postcode in delivery
+        ]
+
+        columns = [
+            [f'SYN-{self.run_id}-{start + i:09d}' for i in range(k)],
+            _weighted(rng, TOOTHBRUSH_TYPES, k),
+            _format_dates(order_dates),
+            _weighted(rng, self.ages, k),
+            _weighted(rng, ORDER_QUANTITIES, k),
+            ['true' if rng.random() < 0.3 else 'false' for _ in range(k)],
+            dispatch_statuses,
+            _format_dates(dispatch_dates),
+            delivery_statuses,
+            _format_dates(delivery_dates),
+            [postcode for postcode, _ in delivery],
+            [area for _, area in delivery],
+            [postcode for postcode, _ in billing],
+            [area for _, area in billing],
+        ]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(GENERATED_COLUMNS)
+        writer.writerows(zip(*columns))
+        buffer.seek(0)
+
+        return buffer
+
+
+def generate_orders(rows, order_type='full', seed=None,
+                    chunk_size=CHUNK_SIZE, postcodes=10000, progress=None):
+    """
+    Generate and COPY 'rows' synthetic orders of one type.
+
+    Each chunk is imported in its own transaction. 'progress' is
+    called with the number of rows loaded so far after each chunk.
+    Returns the summed import counts.
+    """
+
+    generator = OrderGenerator(order_type, seed=seed, postcodes=postcodes)
+    totals = {}
+
+    while generator.generated < rows:
+        k = min(chunk_size, rows - generator.generated)
+        counts = import_orders(generator.chunk(k), order_type, 'csv')
+
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+
+        if progress is not None:
+            progress(generator.generated)
+
+    return totals
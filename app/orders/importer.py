@@ -0,0 +1,249 @@
+"""
+Bulk order import through Postgres COPY.
+
+A CSV or NDJSON file is streamed into an unlogged staging table with
+psycopg2's 'copy_expert', then merged into the postcode and order
+tables with set-based INSERT ... SELECT statements. The whole import
+runs in one transaction; the staging table is dropped at the end.
+"""
+
+import uuid
+
+from django.db import connection, transaction
+
+from core.models import (
+    FullOrder,
+    TodaysOrder,
+    NullOrder,
+    DeliveryPostcode,
+    BillingPostcode
+)
+
+from orders.rollups import record_full_orders_where
+from orders.cache import (
+    bump_data_version,
+    FULL_ORDERS,
+    TODAYS_ORDERS,
+    NULL_ORDERS
+)
+
+
+# Data version scope invalidated by an import of each order type.
+DATA_VERSION_SCOPES = {
+    'full': FULL_ORDERS,
+    'todays': TODAYS_ORDERS,
+    'null': NULL_ORDERS,
+}
+
+ORDER_MODELS = {
+    'full': FullOrder,
+    'todays': TodaysOrder,
+    'null': NullOrder,
+}
+
+FILE_FORMATS = ('csv', 'ndjson')
+
+# Staging column -> SQL type it is cast to when merged.
+IMPORT_COLUMNS = {
+    'order_number': 'text',
+    'toothbrush_type': 'text',
+    'order_date': 'timestamptz',
+    'customer_age': 'integer',
+    'order_quantity': 'integer',
+    'is_first': 'boolean',
+    'dispatch_status': 'text',
+    'dispatch_date': 'timestamptz',
+    'delivery_status': 'text',
+    'delivery_date': 'timestamptz',
+    'delivery_postcode': 'text',
+    'delivery_postcode_area': 'text',
+    'billing_postcode': 'text',
+    'billing_postcode_area': 'text',
+}
+
+ORDER_COLUMNS = [
+    'order_number', 'toothbrush_type', 'order_date', 'customer_age',
+    'order_quantity', 'is_first', 'dispatch_status', 'dispatch_date',
+    'delivery_status', 'delivery_date',
+]
+
+# NDJSON lines are loaded whole into one jsonb column. These
+# characters never occur in JSON text, so no quoting is applied.
+NDJSON_COPY_OPTIONS = "FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02'"
+
+NDJSON_POSTCODE_SQL = """
+    CASE jsonb_typeof(doc->'{field}')
+        WHEN 'object' THEN doc->'{field}'->>'{key}'
+        ELSE doc->>'{column}'
+    END
+"""
+
+INSERT_POSTCODES_SQL = """
+    INSERT INTO {postcode_table} (postcode, postcode_area)
+    SELECT DISTINCT ON ({field}) {field}, {field}_area
+    FROM {staging}
+    WHERE {field} IS NOT NULL
+    ORDER BY {field}, {field}_area NULLS LAST
+    ON CONFLICT (postcode) DO NOTHING
+"""
+
+INSERT_ORDERS_SQL = """
+    INSERT INTO {order_table} ({columns},
+                               delivery_postcode_id, billing_postcode_id)
+    SELECT {casts}, dp.id, bp.id
+    FROM {staging} s
+    LEFT JOIN {delivery_table} dp ON dp.postcode = s.delivery_postcode
+    LEFT JOIN {billing_table} bp ON bp.postcode = s.billing_postcode
+    RETURNING id
+"""
+
+
+class ImportFileError(ValueError):
+    """Raised when an import file cannot be read."""
+
+
+def guess_file_format(filename):
+    """Return the import format implied by a file name, if any."""
+
+    suffix = filename.rsplit('.', 1)[-1].lower()
+    if suffix in ('ndjson', 'jsonl'):
+        return 'ndjson'
+    return 'csv' if suffix == 'csv' else None
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _readline(stream):
+    line = stream.readline()
+    if isinstance(line, bytes):
+        line = line.decode('utf-8-sig')
+    return line
+
+
+def _csv_header(stream):
+    """Read and validate the CSV header line."""
+
+    line = _readline(stream).strip()
+
+    if not line:
+        raise ImportFileError('CSV file has no header row.')
+
+    header = [column.strip().strip('"') for column in line.split(',')]
+    unknown = [column for column in header if column not in IMPORT_COLUMNS]
+
+    if unknown:
+        raise ImportFileError(f'Unknown CSV columns: {", ".join(unknown)}')
+
+    return header
+
+
+def _copy_csv(cursor, staging, stream):
+    header = _csv_header(stream)
+    cursor.copy_expert(
+        f'COPY {staging} ({", ".join(header)}) '
+        'FROM STDIN WITH (FORMAT csv)',
+        stream
+    )
+
+
+def _ndjson_expression(column):
+    """
+    Return the SQL reading a staging column from an NDJSON line.
+    Postcodes may be nested objects, as in the API payload, or flat.
+    """
+
+    for field in ('delivery_postcode', 'billing_postcode'):
+        if column == field:
+            return NDJSON_POSTCODE_SQL.format(
+                field=field, key='postcode', column=column)
+        if column == f'{field}_area':
+            return NDJSON_POSTCODE_SQL.format(
+                field=field, key='postcode_area', column=column)
+
+    return f"doc->>'{column}'"
+
+
+def _copy_ndjson(cursor, staging, stream):
+    """Load NDJSON lines, then project them into the staging table."""
+
+    raw = f'{staging}_raw'
+    cursor.execute(f'CREATE UNLOGGED TABLE {raw} (doc jsonb)')
+    cursor.copy_expert(
+        f'COPY {raw} (doc) FROM STDIN WITH ({NDJSON_COPY_OPTIONS})',
+        stream
+    )
+
+    expressions = ', '.join(
+        _ndjson_expression(column) for column in IMPORT_COLUMNS)
+
+    cursor.execute(
+        f'INSERT INTO {staging} ({", ".join(IMPORT_COLUMNS)}) '
+        f'SELECT {expressions} FROM {raw}'
+    )
+    cursor.execute(f'DROP TABLE {raw}')
+
+
+def import_orders(stream, order_type='full', file_format='csv'):
+    """
+    Import orders from a CSV or NDJSON file-like object.
+
+    CSV files need a header row naming their columns (any subset of
+    'IMPORT_COLUMNS'); NDJSON lines use the same shape as the API
+    payload. Returns a dict of row counts.
+    """
+
+    if order_type not in ORDER_MODELS:
+        raise ImportFileError(f'Unknown order type: {order_type}')
+    if file_format not in FILE_FORMATS:
+        raise ImportFileError(f'Unknown file format: {file_format}')
+
+    model = ORDER_MODELS[order_type]
+    staging = f'order_import_{uuid.uuid4().hex}'
+    counts = {}
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE UNLOGGED TABLE {staging} (' +
+            ', '.join(f'{column} text' for column in IMPORT_COLUMNS) + ')'
+        )
+
+        if file_format == 'csv':
+            _copy_csv(cursor, staging, stream)
+        else:
+            _copy_ndjson(cursor, staging, stream)
+
+        cursor.execute(f'SELECT COUNT(*) FROM {staging}')
+        counts['rows'] = cursor.fetchone()[0]
+
+        for field, postcode_model in (('delivery_postcode', DeliveryPostcode),
+                                      ('billing_postcode', BillingPostcode)):
+            cursor.execute(INSERT_POSTCODES_SQL.format(
+                postcode_table=_quote(postcode_model._meta.db_table),
+                field=field,
+                staging=staging
+            ))
+            counts[f'{field}s_created'] = cursor.rowcount
+
+        cursor.execute(INSERT_ORDERS_SQL.format(
+            order_table=_quote(model._meta.db_table),
+            columns=', '.join(ORDER_COLUMNS),
+            casts=', '.join(
+                f's.{column}::{IMPORT_COLUMNS[column]}'
+                for column in ORDER_COLUMNS
+            ),
+            staging=staging,
+            delivery_table=_quote(DeliveryPostcode._meta.db_table),
+            billing_table=_quote(BillingPostcode._meta.db_table)
+        ))
+        ids = [row[0] for row in cursor.fetchall()]
+        counts['orders_created'] = len(ids)
+
+        if model is FullOrder and ids:
+            record_full_orders_where('WHERE o.id = ANY(%s)', [ids])
+
+        cursor.execute(f'DROP TABLE {staging}')
+        bump_data_version(DATA_VERSION_SCOPES[order_type])
+
+    return counts
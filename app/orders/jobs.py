@@ -0,0 +1,292 @@
+"""
+Asynchronous bulk ingest.
+
+With 'async=true', a bulk create streams the request body to a file
+under 'INGEST_SPOOL_DIR' and returns an IngestJob at once, so the
+web worker never validates or writes the orders. Ingest workers
+('manage.py run_ingest_jobs') claim pending jobs with 'SELECT ...
+FOR UPDATE SKIP LOCKED' and write each job 'CHUNK_ROWS' orders at a
+time through the bulk create serializer. The spool file is parsed
+incrementally, so a worker holds one chunk of orders in memory
+however large the upload. Each chunk is written in one transaction with the
+job's progress and heartbeat, so the progress reported always
+matches what was written.
+
+A running job whose heartbeat is older than
+'INGEST_JOB_HEARTBEAT_TIMEOUT' is claimed again, and resumes after
+its last committed chunk. The heartbeat is also the claim: a worker
+that finds it changed has lost the job and stops.
+
+Jobs always skip invalid orders: the valid orders of every chunk
+are written and the rest reported by index with their errors (the
+first 'MAX_REJECTED' of them), as with 'skip_invalid=true'.
+"""
+
+from itertools import islice
+import codecs
+import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import IngestJob
+
+from orders.cache import bump_data_version
+from orders.importer import DATA_VERSION_SCOPES
+from orders.serializers import (
+    FullOrderSerializer,
+    TodaysOrderSerializer,
+    NullOrderSerializer
+)
+
+
+logger = logging.getLogger(__name__)
+
+SERIALIZERS = {
+    'full': FullOrderSerializer,
+    'todays': TodaysOrderSerializer,
+    'null': NullOrderSerializer,
+}
+
+CHUNK_ROWS = 5000
+MAX_REJECTED = 1000
+
+# Bytes copied from the request to the spool file, and read back
+# from it, at a time.
+SPOOL_BUFFER = 1024 * 1024
+
+NUMBER_CHARS = frozenset('0123456789+-.eE')
+
+
+def spool_upload(stream, order_type, upsert=False):
+    """
+    Copy a JSON list of orders from 'stream' to the spool directory
+    and queue a job to ingest it.
+    """
+
+    os.makedirs(settings.INGEST_SPOOL_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(
+        prefix=f'{order_type}-', suffix='.json',
+        dir=settings.INGEST_SPOOL_DIR
+    )
+
+    with os.fdopen(fd, 'wb') as spool:
+        shutil.copyfileobj(stream, spool, SPOOL_BUFFER)
+
+    return IngestJob.objects.create(
+        order_type=order_type, upsert=upsert, file_path=path)
+
+
+class JobReclaimed(Exception):
+    """The job was claimed again by another worker."""
+
+
+def claim_job():
+    """
+    Mark the oldest waiting job as running and return it, or None
+    if no job is waiting. Jobs claimed by other workers are skipped,
+    unless their heartbeat has timed out.
+    """
+
+    now = timezone.now()
+    stale = now - datetime.timedelta(
+        seconds=settings.INGEST_JOB_HEARTBEAT_TIMEOUT)
+
+    with transaction.atomic():
+        job = IngestJob.objects.select_for_update(skip_locked=True) \
+            .filter(Q(status=IngestJob.PENDING)
+                    | Q(status=IngestJob.RUNNING, heartbeat_at__lt=stale)) \
+            .order_by('created_at').first()
+
+        if job is None:
+            return None
+
+        if job.status == IngestJob.RUNNING:
+            logger.warning('Reclaiming ingest job %s after %s rows',
+                           job.pk, job.processed_rows)
+
+        job.status = IngestJob.RUNNING
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+
+    return job
+
+
+def _save_held(job, fields):
+    """
+    Save fields of a job with a new heartbeat, inside the current
+    transaction. Raises JobReclaimed if another worker has claimed
+    the job since this one last saved it.
+    """
+
+    held = IngestJob.objects.select_for_update() \
+        .filter(pk=job.pk, heartbeat_at=job.heartbeat_at).exists()
+    if not held:
+        raise JobReclaimed(job.pk)
+
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=fields + ['heartbeat_at'])
+
+
+def iter_json_list(stream, buffer_size=SPOOL_BUFFER):
+    """
+    Yield the items of the JSON list in a binary file object,
+    reading 'buffer_size' bytes at a time. Raises ValueError if the
+    file does not hold a single JSON list.
+    """
+
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def read_more():
+        nonlocal buffer, pos, eof
+        data = stream.read(buffer_size)
+        eof = not data
+        buffer, pos = buffer[pos:] + utf8.decode(data, final=eof), 0
+
+    def next_char():
+        """Skip whitespace and return the next character, if any."""
+
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\n\r':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            read_more()
+
+    def next_item():
+        nonlocal pos
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A number may go on past what has been read so far.
+                number = type(item) in (int, float)
+                if eof or not number or (end < len(buffer) and
+                                         buffer[end] not in NUMBER_CHARS):
+                    pos = end
+                    return item
+            read_more()
+
+    if next_char() != '[':
+        raise ValueError('Expected a list of orders.')
+    pos += 1
+
+    if next_char() == ']':
+        pos += 1
+    else:
+        while True:
+            next_char()
+            yield next_item()
+
+            char = next_char()
+            pos += 1
+            if char == ']':
+                break
+            if char != ',':
+                raise ValueError('Expected "," or "]" after an order.')
+
+    if next_char():
+        raise ValueError('Unexpected data after the list of orders.')
+
+
+def _ingest_chunk(job, rows, offset):
+    serializer = SERIALIZERS[job.order_type](
+        data=rows, many=True,
+        context={'upsert': job.upsert, 'skip_invalid': True}
+    )
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+
+    if job.upsert:
+        for key, count in serializer.upsert_counts.items():
+            job.counts[key] = job.counts.get(key, 0) + count
+    else:
+        job.counts['created'] = (
+            job.counts.get('created', 0) + len(serializer.instance))
+
+    job.rejected_rows += len(serializer.rejected)
+    room = MAX_REJECTED - len(job.rejected)
+    job.rejected.extend(
+        dict(row, index=row['index'] + offset)
+        for row in serializer.rejected[:max(room, 0)]
+    )
+    job.processed_rows += len(rows)
+
+    bump_data_version(DATA_VERSION_SCOPES[job.order_type])
+
+
+def run_job(job):
+    """
+    Ingest the spooled orders of a claimed job from its first
+    unprocessed row, committing its progress with every chunk. The
+    spool file is removed once the job has succeeded and kept for
+    inspection if it failed.
+    """
+
+    progress = ['total_rows', 'processed_rows', 'counts',
+                'rejected_rows', 'rejected']
+
+    try:
+        if job.total_rows is None:
+            # A first pass counts the orders, holding none of them.
+            with open(job.file_path, 'rb') as spool:
+                total = sum(1 for _ in iter_json_list(spool))
+            with transaction.atomic():
+                job.total_rows = total
+                _save_held(job, ['total_rows'])
+
+        with open(job.file_path, 'rb') as spool:
+            rows = islice(iter_json_list(spool), job.processed_rows, None)
+            offset = job.processed_rows
+
+            while True:
+                chunk = list(islice(rows, CHUNK_ROWS))
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    _ingest_chunk(job, chunk, offset)
+                    _save_held(job, progress)
+                offset += len(chunk)
+    except JobReclaimed:
+        logger.warning('Ingest job %s was claimed by another worker',
+                       job.pk)
+        return job
+    except Exception as e:
+        logger.exception('Ingest job %s failed', job.pk)
+        # Progress of a chunk that was rolled back is discarded.
+        job.refresh_from_db(fields=progress)
+        job.status = IngestJob.FAILED
+        job.error = str(e)
+    else:
+        job.status = IngestJob.SUCCEEDED
+
+    job.finished_at = timezone.now()
+
+    try:
+        with transaction.atomic():
+            _save_held(job, ['status', 'error', 'finished_at'])
+    except JobReclaimed:
+        logger.warning('Ingest job %s was claimed by another worker',
+                       job.pk)
+        return job
+
+    if job.status == IngestJob.SUCCEEDED:
+        os.remove(job.file_path)
+
+    return job
@@ -0,0 +1,186 @@
+"""
+Keyset (cursor) pagination for the Orders API.
+
+Pages are selected with a row comparison on the ordering columns,
+e.g. '(order_date, id) > (%s, %s)', which Postgres answers with an
+index range scan, so every page costs the same however deep it is.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+import binascii
+import json
+
+from django.db import connection
+from django.db.models import QuerySet
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate on a unique, ascending tuple of model fields.
+
+    The cursor holds the ordering values of the last (or first)
+    row of the current page and the direction to read in.
+    """
+
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not isinstance(queryset, QuerySet):
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            queryset.model._meta.get_field(name) for name in self.ordering
+        ]
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor['reverse']
+
+        if cursor is not None:
+            queryset = self._seek(queryset, cursor['position'], reverse)
+
+        order = [f'-{name}' if reverse else name for name in self.ordering]
+        page = list(queryset.order_by(*order)[:self.page_size + 1])
+
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+
+        if reverse:
+            page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = page
+        return page
+
+    def _seek(self, queryset, position, reverse):
+        """Keep only the rows after (or before) 'position'."""
+
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        columns = ', '.join(
+            f'{table}.{connection.ops.quote_name(field.column)}'
+            for field in self.fields
+        )
+        placeholders = ', '.join(['%s'] * len(self.fields))
+        operator = '<' if reverse else '>'
+
+        return queryset.extra(
+            where=[f'({columns}) {operator} ({placeholders})'],
+            params=position
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+
+        if encoded is None:
+            return None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            values = cursor['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, KeyError, UnicodeError,
+                binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {'position': position, 'reverse': bool(cursor.get('r'))}
+
+    def encode_cursor(self, row, reverse):
+        cursor = {
+            'p': [field.value_to_string(row) for field in self.fields],
+            'r': int(reverse)
+        }
+        encoded = urlsafe_b64encode(
+            json.dumps(cursor).encode('ascii')).decode('ascii')
+
+        url = remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page '
+                               f'(at most {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+
+class OrderKeysetPagination(KeysetPagination):
+    """Paginate orders by (order_date, id)."""
+
+    ordering = ('order_date', 'id')
+
+
+class PostcodeKeysetPagination(KeysetPagination):
+    """Paginate postcodes by id."""
+
+    ordering = ('id',)
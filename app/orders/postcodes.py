@@ -0,0 +1,150 @@
+"""
+Postcode lookups for order ingest.
+
+Postcodes are a deduplicated dimension shared by every order, so
+ingest only needs the id of each postcode. Ids are looked up through
+a bounded LRU cache held by each worker process, falling back to one
+SELECT and one INSERT for the postcodes the cache does not know.
+
+Editing or deleting a postcode bumps the 'postcodes' data version
+(see orders.cache). Each lookup reads that version first, and a
+worker whose cache was filled under an older one empties it, so no
+worker keeps handing out the ids of edited or deleted postcodes.
+"""
+
+from collections import OrderedDict
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from orders.cache import get_data_versions, POSTCODES
+
+
+class PostcodeCache:
+    """
+    Thread-safe LRU mapping of postcode -> primary key, valid for
+    one version of the stored postcodes.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.version = None
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def sync(self, version):
+        """Empty the cache if it was filled under another version."""
+
+        with self._lock:
+            if self.version != version:
+                self._ids.clear()
+                self.version = version
+
+    def get_many(self, postcodes):
+        """Return the cached ids of the given postcodes."""
+
+        found = {}
+
+        with self._lock:
+            for postcode in postcodes:
+                if postcode in self._ids:
+                    self._ids.move_to_end(postcode)
+                    found[postcode] = self._ids[postcode]
+
+        return found
+
+    def set_many(self, ids, version=None):
+        """
+        Cache the given postcode ids, evicting the least recent.
+        Ids read under a 'version' the cache has moved on from
+        are dropped.
+        """
+
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+
+            for postcode, pk in ids.items():
+                self._ids[postcode] = pk
+                self._ids.move_to_end(postcode)
+
+            while len(self._ids) > self.maxsize:
+                self._ids.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+
+    def __len__(self):
+        return len(self._ids)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_postcode_cache(model):
+    """Return the process-wide cache for a postcode model."""
+
+    with _caches_lock:
+        if model not in _caches:
+            _caches[model] = PostcodeCache(settings.POSTCODE_CACHE_SIZE)
+        return _caches[model]
+
+
+def resolve_postcodes(postcodes, batch_size=1000):
+    """
+    Point unsaved postcode instances at their stored rows.
+
+    'postcodes' is a list of instances of a single postcode model.
+    Each one gets the primary key of the stored row with the same
+    postcode, inserting rows for postcodes not seen before. Newly
+    resolved ids are only cached once the transaction commits, so
+    a rollback can never leave the cache pointing at missing rows.
+    """
+
+    if not postcodes:
+        return
+
+    model = type(postcodes[0])
+    cache = get_postcode_cache(model)
+    version, = get_data_versions([POSTCODES])
+    cache.sync(version)
+
+    by_value = {}
+    for postcode in postcodes:
+        by_value.setdefault(postcode.postcode, postcode)
+
+    ids = cache.get_many(by_value)
+    missing = [value for value in by_value if value not in ids]
+
+    if missing:
+        found = dict(
+            model.objects.filter(postcode__in=missing)
+            .values_list('postcode', 'id')
+        )
+        new = sorted(value for value in missing if value not in found)
+
+        if new:
+            model.objects.bulk_create(
+                [
+                    model(
+                        postcode=value,
+                        postcode_area=by_value[value].postcode_area
+                    )
+                    for value in new
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True
+            )
+            found.update(
+                model.objects.filter(postcode__in=new)
+                .values_list('postcode', 'id')
+            )
+
+        ids.update(found)
+        transaction.on_commit(lambda: cache.set_many(found, version))
+
+    for postcode in postcodes:
+        postcode.pk = ids[postcode.postcode]
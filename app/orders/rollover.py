@@ -0,0 +1,110 @@
+"""
+End of day rollover of Todays Orders.
+
+In one transaction, Todays Orders with complete dispatch and
+delivery details are copied into Full Orders, the rest into Null
+Orders, with set-based INSERT ... SELECT statements, and the Todays
+Order table is truncated. Rows never leave the database.
+"""
+
+from django.db import connection, transaction
+
+from core.models import FullOrder, FullOrderNumber, NullOrder, TodaysOrder
+
+from orders.cache import (
+    bump_data_version,
+    FULL_ORDERS,
+    TODAYS_ORDERS,
+    NULL_ORDERS
+)
+from orders.importer import ORDER_COLUMNS
+from orders.rollups import record_full_orders_where
+
+
+ROLLOVER_COLUMNS = ORDER_COLUMNS + [
+    'delivery_postcode_id', 'billing_postcode_id']
+
+# A Todays Order has everything a Full Order requires.
+COMPLETE_SQL = """
+    dispatch_date IS NOT NULL AND delivery_date IS NOT NULL
+    AND COALESCE(dispatch_status, '') <> ''
+    AND COALESCE(delivery_status, '') <> ''
+"""
+
+# Orders already rolled over (same order number) are skipped.
+ROLLOVER_SQL = """
+    INSERT INTO {target} ({columns})
+    SELECT {columns} FROM {todays}
+    WHERE {condition}
+    ORDER BY id
+    ON CONFLICT ({conflict}) DO NOTHING
+    RETURNING id
+"""
+
+# The unique key of the partitioned Full Order table includes the
+# order date, so order numbers in use on any date are left out here.
+NEW_FULL_ORDER_SQL = """
+    AND order_number NOT IN (SELECT order_number FROM {numbers})
+"""
+
+
+def _quote(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def rollover_todays_orders():
+    """
+    Move every Todays Order into Full or Null Orders.
+
+    Returns the number of Todays Orders, the Full and Null Orders
+    created, and the orders skipped because their order number had
+    already been rolled over.
+    """
+
+    todays = _quote(TodaysOrder)
+    columns = ', '.join(ROLLOVER_COLUMNS)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Reads may continue, but no order can be added to Todays
+        # Orders between the copy and the truncate.
+        cursor.execute(f'LOCK TABLE {todays} IN EXCLUSIVE MODE')
+
+        cursor.execute(f'SELECT COUNT(*) FROM {todays}')
+        total = cursor.fetchone()[0]
+
+        cursor.execute(ROLLOVER_SQL.format(
+            target=_quote(FullOrder),
+            # The unique key of the partitioned Full Order table.
+            conflict='order_number, order_date',
+            columns=columns,
+            todays=todays,
+            condition=COMPLETE_SQL + NEW_FULL_ORDER_SQL.format(
+                numbers=_quote(FullOrderNumber))
+        ))
+        full_ids = [row[0] for row in cursor.fetchall()]
+
+        if full_ids:
+            record_full_orders_where('WHERE o.id = ANY(%s)', [full_ids])
+
+        cursor.execute(ROLLOVER_SQL.format(
+            target=_quote(NullOrder),
+            conflict='order_number',
+            columns=columns,
+            todays=todays,
+            condition=f'NOT ({COMPLETE_SQL})'
+        ))
+        null_created = cursor.rowcount
+
+        # TRUNCATE refuses tables with deferred foreign key checks
+        # still pending in this transaction, so run them now.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'TRUNCATE {todays}')
+
+        bump_data_version(TODAYS_ORDERS, FULL_ORDERS, NULL_ORDERS)
+
+    return {
+        'todays_orders': total,
+        'full_orders_created': len(full_ids),
+        'null_orders_created': null_created,
+        'duplicates_skipped': total - len(full_ids) - null_created,
+    }
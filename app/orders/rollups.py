@@ -0,0 +1,445 @@
+"""
+Summary tables for the Full Order dashboards.
+
+Rollups are kept per toothbrush type for three dimensions
+(postcode area, customer age and delivery status). They are
+incremented in the same transaction that ingests Full Orders, and
+the dashboard endpoints read these small tables instead of
+aggregating the raw orders on every request.
+"""
+
+from django.db import connection, transaction
+
+from core.models import (
+    FullOrder,
+    DeliveryPostcode,
+    PostcodeAreaRollup,
+    CustomerAgeRollup,
+    DeliveryStatusRollup
+)
+
+from orders.aggregations import (
+    TOOTHBRUSH_2000,
+    TOOTHBRUSH_4000,
+    GRAND_TOTAL,
+    BY_AGE,
+    BY_POSTCODE_AREA,
+    sections_from_rows
+)
+
+from orders.cache import bump_data_version, FULL_ORDERS
+
+import datetime
+
+
+# (rollup model, dimension column, SQL expression over raw orders)
+ROLLUP_DIMENSIONS = (
+    (PostcodeAreaRollup, 'postcode_area', "COALESCE(p.postcode_area, '')"),
+    (CustomerAgeRollup, 'customer_age', 'o.customer_age'),
+    (DeliveryStatusRollup, 'delivery_status', 'o.delivery_status'),
+)
+
+ROLLUP_COLUMNS = (
+    'order_count',
+    'order_quantity_sum',
+    'customer_age_sum',
+    'customer_age_min',
+    'customer_age_max',
+    'delivery_delta_sum',
+    'delivery_delta_min',
+    'delivery_delta_max',
+)
+
+ON_CONFLICT_SQL = """
+    ON CONFLICT (toothbrush_type, {dimension}) DO UPDATE SET
+        order_count = r.order_count + EXCLUDED.order_count,
+        order_quantity_sum = r.order_quantity_sum
+            + EXCLUDED.order_quantity_sum,
+        customer_age_sum = r.customer_age_sum + EXCLUDED.customer_age_sum,
+        customer_age_min = LEAST(r.customer_age_min,
+                                 EXCLUDED.customer_age_min),
+        customer_age_max = GREATEST(r.customer_age_max,
+                                    EXCLUDED.customer_age_max),
+        delivery_delta_sum = r.delivery_delta_sum
+            + EXCLUDED.delivery_delta_sum,
+        delivery_delta_min = LEAST(r.delivery_delta_min,
+                                   EXCLUDED.delivery_delta_min),
+        delivery_delta_max = GREATEST(r.delivery_delta_max,
+                                      EXCLUDED.delivery_delta_max)
+"""
+
+UPSERT_SQL = """
+    INSERT INTO {table} AS r (toothbrush_type, {dimension}, {columns})
+    VALUES {values}
+""" + ON_CONFLICT_SQL
+
+# Takes orders out of their groups. Extremes cannot be decremented,
+# so each group reports whether a removed order may have held one.
+SUBTRACT_SQL = """
+    UPDATE {table} AS r SET
+        order_count = r.order_count - v.order_count,
+        order_quantity_sum = r.order_quantity_sum - v.order_quantity_sum,
+        customer_age_sum = r.customer_age_sum - v.customer_age_sum,
+        delivery_delta_sum = r.delivery_delta_sum - v.delivery_delta_sum
+    FROM (VALUES {values}) AS v (toothbrush_type, {dimension}, {columns})
+    WHERE r.toothbrush_type = v.toothbrush_type
+        AND r.{dimension} = v.{dimension}
+    RETURNING
+        r.toothbrush_type,
+        r.{dimension},
+        r.order_count,
+        v.customer_age_min <= r.customer_age_min
+            OR v.customer_age_max >= r.customer_age_max
+            OR v.delivery_delta_min <= r.delivery_delta_min
+            OR v.delivery_delta_max >= r.delivery_delta_max
+"""
+
+# Recomputes the extremes of one group from its own orders. The
+# UPPER() condition lets the toothbrush type indexes find them.
+EXTREMES_SQL = """
+    UPDATE {table} AS r SET
+        customer_age_min = s.customer_age_min,
+        customer_age_max = s.customer_age_max,
+        delivery_delta_min = s.delivery_delta_min,
+        delivery_delta_max = s.delivery_delta_max
+    FROM (
+        SELECT
+            MIN(o.customer_age) AS customer_age_min,
+            MAX(o.customer_age) AS customer_age_max,
+            MIN(o.delivery_date - o.order_date) AS delivery_delta_min,
+            MAX(o.delivery_date - o.order_date) AS delivery_delta_max
+        FROM {order_table} o
+        LEFT JOIN {postcode_table} p ON p.id = o.delivery_postcode_id
+        WHERE UPPER(o.toothbrush_type) = UPPER(%(toothbrush_type)s)
+            AND o.toothbrush_type = %(toothbrush_type)s
+            AND {expression} = %(value)s
+    ) AS s
+    WHERE r.toothbrush_type = %(toothbrush_type)s
+        AND r.{dimension} = %(value)s
+"""
+
+AGGREGATE_SQL = """
+    INSERT INTO {table} AS r (toothbrush_type, {dimension}, {columns})
+    SELECT
+        o.toothbrush_type,
+        {expression},
+        COUNT(*),
+        SUM(o.order_quantity),
+        SUM(o.customer_age),
+        MIN(o.customer_age),
+        MAX(o.customer_age),
+        SUM(o.delivery_date - o.order_date),
+        MIN(o.delivery_date - o.order_date),
+        MAX(o.delivery_date - o.order_date)
+    FROM {order_table} o
+    LEFT JOIN {postcode_table} p ON p.id = o.delivery_postcode_id
+    {where}
+    GROUP BY 1, 2
+    ORDER BY 1, 2
+    {on_conflict}
+"""
+
+
+def _quote(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _dimension_value(order, dimension):
+    """Return the rollup group an in-memory order belongs to."""
+
+    if dimension == 'postcode_area':
+        postcode = order.delivery_postcode
+        return (postcode.postcode_area if postcode else None) or ''
+
+    return getattr(order, dimension)
+
+
+def _group_orders(orders, dimension):
+    """Sum up in-memory orders by (toothbrush type, dimension)."""
+
+    groups = {}
+
+    for order in orders:
+        key = (order.toothbrush_type, _dimension_value(order, dimension))
+        delta = order.delivery_date - order.order_date
+        age = order.customer_age
+        group = groups.get(key)
+
+        if group is None:
+            groups[key] = [1, order.order_quantity, age, age, age,
+                           delta, delta, delta]
+            continue
+
+        group[0] += 1
+        group[1] += order.order_quantity
+        group[2] += age
+        group[3] = min(group[3], age)
+        group[4] = max(group[4], age)
+        group[5] += delta
+        group[6] = min(group[6], delta)
+        group[7] = max(group[7], delta)
+
+    return groups
+
+
+def record_full_orders(orders):
+    """
+    Add newly created Full Orders to every rollup table.
+
+    Must be called inside the transaction that inserts the orders.
+    Groups are upserted in key order so that concurrent ingests
+    lock rollup rows in the same order.
+    """
+
+    if not orders:
+        return
+
+    with connection.cursor() as cursor:
+        for model, dimension, _ in ROLLUP_DIMENSIONS:
+            groups = _group_orders(orders, dimension)
+            placeholders = '({})'.format(
+                ', '.join(['%s'] * (len(ROLLUP_COLUMNS) + 2)))
+            params = []
+
+            for key in sorted(groups):
+                params.extend(key)
+                params.extend(groups[key])
+
+            cursor.execute(
+                UPSERT_SQL.format(
+                    table=_quote(model),
+                    dimension=dimension,
+                    columns=', '.join(ROLLUP_COLUMNS),
+                    values=', '.join([placeholders] * len(groups))
+                ),
+                params
+            )
+
+
+def remove_full_orders(orders):
+    """
+    Take deleted Full Orders, or the previous values of updated
+    ones, out of every rollup table.
+
+    Counts and sums are decremented in place. Only groups that may
+    have lost their minimum or maximum are re-read from their own
+    orders, and emptied groups are deleted. Must be called inside
+    the transaction that changes the orders, after the change.
+    """
+
+    if not orders:
+        return
+
+    with connection.cursor() as cursor:
+        for model, dimension, expression in ROLLUP_DIMENSIONS:
+            groups = _group_orders(orders, dimension)
+            placeholders = '({})'.format(
+                ', '.join(['%s'] * (len(ROLLUP_COLUMNS) + 2)))
+            params = []
+
+            for key in sorted(groups):
+                params.extend(key)
+                params.extend(groups[key])
+
+            cursor.execute(
+                SUBTRACT_SQL.format(
+                    table=_quote(model),
+                    dimension=dimension,
+                    columns=', '.join(ROLLUP_COLUMNS),
+                    values=', '.join([placeholders] * len(groups))
+                ),
+                params
+            )
+
+            emptied = []
+            for toothbrush_type, value, count, stale in cursor.fetchall():
+                if count <= 0:
+                    emptied.append((toothbrush_type, value))
+                elif stale:
+                    cursor.execute(
+                        EXTREMES_SQL.format(
+                            table=_quote(model),
+                            dimension=dimension,
+                            expression=expression,
+                            order_table=_quote(FullOrder),
+                            postcode_table=_quote(DeliveryPostcode)
+                        ),
+                        {'toothbrush_type': toothbrush_type,
+                         'value': value}
+                    )
+
+            for toothbrush_type, value in emptied:
+                model.objects.filter(
+                    toothbrush_type=toothbrush_type,
+                    **{dimension: value}
+                ).delete()
+
+
+def _aggregate_sql(model, dimension, expression, where, on_conflict=''):
+    return AGGREGATE_SQL.format(
+        table=_quote(model),
+        dimension=dimension,
+        columns=', '.join(ROLLUP_COLUMNS),
+        expression=expression,
+        order_table=_quote(FullOrder),
+        postcode_table=_quote(DeliveryPostcode),
+        where=where,
+        on_conflict=on_conflict.format(dimension=dimension)
+    )
+
+
+def record_full_orders_where(where, params=()):
+    """
+    Add the Full Orders matched by a SQL 'WHERE' clause (over the
+    order table aliased 'o') to every rollup table, set-based.
+
+    Used by bulk loaders that insert orders without building
+    model instances. Must be called inside the inserting transaction.
+    """
+
+    with connection.cursor() as cursor:
+        for model, dimension, expression in ROLLUP_DIMENSIONS:
+            cursor.execute(
+                _aggregate_sql(model, dimension, expression, where,
+                               ON_CONFLICT_SQL),
+                params
+            )
+
+
+def rebuild_rollups(toothbrush_types=None):
+    """
+    Recompute rollups from the raw Full Orders.
+
+    Rebuilds every toothbrush type, or only those listed in
+    'toothbrush_types'. Rollup tables are locked for the duration,
+    so concurrent ingests wait rather than being lost.
+    """
+
+    where = ''
+    params = []
+
+    if toothbrush_types is not None:
+        where = 'WHERE o.toothbrush_type = ANY(%s)'
+        params = [list(toothbrush_types)]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, dimension, expression in ROLLUP_DIMENSIONS:
+            cursor.execute(
+                f'LOCK TABLE {_quote(model)} IN EXCLUSIVE MODE')
+
+            rollups = model.objects.all()
+            if toothbrush_types is not None:
+                rollups = rollups.filter(
+                    toothbrush_type__in=toothbrush_types)
+            rollups.delete()
+
+            cursor.execute(
+                _aggregate_sql(model, dimension, expression, where),
+                params
+            )
+
+        bump_data_version(FULL_ORDERS)
+
+
+def _rollup_row(grouping_id, rollups, customer_age=None,
+                postcode_area=None):
+    """
+    Combine rollup rows into one row shaped like those of
+    'orders.aggregations.FULL_DATA_SQL'.
+    """
+
+    def count_where(predicate):
+        return sum(r.order_count for r in rollups if predicate(r))
+
+    def delivery_status_is(value):
+        return count_where(
+            lambda r: getattr(r, 'delivery_status', None) == value)
+
+    total = count_where(lambda r: True)
+    tb_4000 = TOOTHBRUSH_4000.upper()
+
+    return {
+        'grouping_id': grouping_id,
+        'customer_age': customer_age,
+        'postcode_area': postcode_area,
+        'total': total,
+        'delivery_successful': delivery_status_is('Delivered'),
+        'delivery_unsuccessful': delivery_status_is('Unsuccessful'),
+        'delivery_in_transit': delivery_status_is('In Transit'),
+        'avg_customer_age': (
+            sum(r.customer_age_sum for r in rollups) / total
+            if total else None
+        ),
+        'max_customer_age': max(
+            (r.customer_age_max for r in rollups), default=None),
+        'min_customer_age': min(
+            (r.customer_age_min for r in rollups), default=None),
+        'avg_delivery_delta': (
+            sum((r.delivery_delta_sum for r in rollups),
+                datetime.timedelta()) / total
+            if total else None
+        ),
+        'max_delivery_delta': max(
+            (r.delivery_delta_max for r in rollups), default=None),
+        'min_delivery_delta': min(
+            (r.delivery_delta_min for r in rollups), default=None),
+        'tb_2000_sales': count_where(
+            lambda r: r.toothbrush_type == TOOTHBRUSH_2000),
+        'tb_4000_sales': count_where(
+            lambda r: r.toothbrush_type == TOOTHBRUSH_4000),
+        'tb_4000_sales_iexact': count_where(
+            lambda r: r.toothbrush_type.upper() == tb_4000)
+    }
+
+
+def _group_rollups(rollups, dimension):
+    groups = {}
+    for rollup in rollups:
+        groups.setdefault(getattr(rollup, dimension), []).append(rollup)
+    return groups
+
+
+def _filtered(model, toothbrush_type):
+    rollups = model.objects.all()
+    if toothbrush_type is not None:
+        rollups = rollups.filter(toothbrush_type__iexact=toothbrush_type)
+    return list(rollups)
+
+
+def full_data_from_rollups(toothbrush_type=None):
+    """
+    Return the 'get_full_data' sections computed from the rollup
+    tables, in the same shape as 'aggregate_full_data'.
+    """
+
+    statuses = _filtered(DeliveryStatusRollup, toothbrush_type)
+    ages = _filtered(CustomerAgeRollup, toothbrush_type)
+    areas = _filtered(PostcodeAreaRollup, toothbrush_type)
+
+    rows = [_rollup_row(GRAND_TOTAL, statuses)]
+    rows.extend(
+        _rollup_row(BY_AGE, group, customer_age=age)
+        for age, group in _group_rollups(ages, 'customer_age').items()
+    )
+    rows.extend(
+        _rollup_row(BY_POSTCODE_AREA, group, postcode_area=area or None)
+        for area, group in _group_rollups(areas, 'postcode_area').items()
+    )
+
+    return sections_from_rows(rows)
+
+
+def toothbrush_summary(toothbrush_type):
+    """
+    Return the average customer age, average delivery delta
+    and total sales of one toothbrush type (case insensitive).
+    """
+
+    totals = _rollup_row(
+        GRAND_TOTAL, _filtered(DeliveryStatusRollup, toothbrush_type))
+
+    return {
+        'avg_customer_age': totals['avg_customer_age'],
+        'avg_delivery_delta': totals['avg_delivery_delta'],
+        'total_sales': totals['total']
+    }
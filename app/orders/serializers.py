@@ -1,18 +1,41 @@
 """Serializers for the Orders API View."""
 
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from core.models import (FullOrder, TodaysOrder, NullOrder,
-                         DeliveryPostcode, BillingPostcode)
+                         DeliveryPostcode, BillingPostcode, IngestJob)
 
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.core.exceptions import ValidationError
 
-from django.db.models import Avg
+from django.utils import timezone
 
-import datetime
+from core.metrics import TimedDataMixin, TimedListSerializer
 
+from orders.rollups import record_full_orders
+from orders.postcodes import resolve_postcodes
+from orders.projections import ProjectedSerializer
+from orders.upsert import upsert_orders
+from orders.columnar import validate_rows
 
-class DeliveryPostcodeSerializer(serializers.ModelSerializer):
+
+class PostcodeSerializerMixin:
+    """
+    Postcodes are shared between orders, so posting a postcode
+    that already exists returns the stored postcode.
+    """
+
+    def create(self, validated_data):
+        postcode, _ = self.Meta.model.objects.get_or_create(
+            postcode=validated_data['postcode'],
+            defaults=validated_data
+        )
+        return postcode
+
+
+class DeliveryPostcodeSerializer(TimedDataMixin,
+                                 PostcodeSerializerMixin,
+                                 serializers.ModelSerializer):
     """
     Serializer for Delivery Postcodes.
     """
@@ -20,9 +43,13 @@ class DeliveryPostcodeSerializer(serializers.ModelSerializer):
         model = DeliveryPostcode
         fields = ['id', 'postcode', 'postcode_area']
         read_only_fields = ['id']
+        extra_kwargs = {'postcode': {'validators': []}}
+        list_serializer_class = TimedListSerializer
 
 
-class BillingPostcodeSerializer(serializers.ModelSerializer):
+class BillingPostcodeSerializer(TimedDataMixin,
+                                PostcodeSerializerMixin,
+                                serializers.ModelSerializer):
     """
     Serializer for Billing Postcodes.
     """
@@ -30,25 +57,181 @@ class BillingPostcodeSerializer(serializers.ModelSerializer):
         model = BillingPostcode
         fields = ['id', 'postcode', 'postcode_area']
         read_only_fields = ['id']
+        extra_kwargs = {'postcode': {'validators': []}}
+        list_serializer_class = TimedListSerializer
 
 
-class BulkCreateOrderSerializer(serializers.ListSerializer):
+class BulkCreateOrderSerializer(TimedDataMixin,
+                                serializers.ListSerializer):
     """
     List Serializer for creating objects in bulk.
+
+    Orders are built in memory by the child serializer, their
+    postcodes are resolved to shared postcode rows, and the orders
+    are inserted with chunked 'bulk_create' calls, so the number of
+    statements depends on the batch size rather than on the number
+    of orders. The orders are validated a column at a time (see
+    orders.columnar), with the errors of a row-by-row validation.
+
+    With 'skip_invalid' in the context, invalid orders are left out
+    instead of failing the batch, and each chunk is written in its
+    own savepoint. A chunk that fails is retried one order at a time
+    to find the orders at fault. The indexes of the orders left out
+    and their errors are kept in 'rejected'.
     """
 
+    batch_size = 1000
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            if self.context.get('skip_invalid'):
+                self.rejected, self.row_indexes = [], []
+            return super().to_internal_value(data)
+
+        validated, errors = validate_rows(self.child, data)
+
+        if self.context.get('skip_invalid'):
+            self.rejected = [
+                {'index': index, 'errors': row_errors}
+                for index, row_errors in enumerate(errors) if row_errors
+            ]
+            self.row_indexes = [
+                index for index, row_errors in enumerate(errors)
+                if not row_errors
+            ]
+            return [attrs for attrs in validated if attrs is not None]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return validated
+
     def create(self, validated_data):
-        res = [self.child.create(attrs) for attrs in validated_data]
+        model = self.child.Meta.model
+        res = [self.child.build_order(attrs) for attrs in validated_data]
+
+        if self.context.get('skip_invalid'):
+            with transaction.atomic():
+                self._resolve_postcodes(res)
+            return self._create_in_chunks(model, res)
+
+        if self.context.get('upsert'):
+            with transaction.atomic():
+                self._resolve_postcodes(res)
+                self.upsert_counts = upsert_orders(
+                    model, res, chunk_size=self.batch_size)
+            return res
 
         try:
-            self.child.Meta.model.objects.bulk_create(res)
+            with transaction.atomic():
+                self._resolve_postcodes(res)
+                self._write(model, res)
         except IntegrityError as e:
             raise ValidationError(e)
 
         return res
 
+    def _write(self, model, orders):
+        if self.context.get('upsert'):
+            counts = upsert_orders(model, orders, chunk_size=self.batch_size)
+            for key, count in counts.items():
+                self.upsert_counts[key] += count
+            return
+
+        model.objects.bulk_create(orders, batch_size=self.batch_size)
+
+        if model is FullOrder:
+            record_full_orders(orders)
+
+    def _create_in_chunks(self, model, orders):
+        """
+        Write the orders a chunk at a time, leaving out and
+        rejecting those the database refuses.
+        """
+
+        if self.context.get('upsert'):
+            self.upsert_counts = dict.fromkeys(
+                ['inserted', 'updated', 'unchanged'], 0)
+        created = []
+
+        for i in range(0, len(orders), self.batch_size):
+            chunk = orders[i:i + self.batch_size]
+            indexes = self.row_indexes[i:i + self.batch_size]
+
+            try:
+                with transaction.atomic():
+                    self._write(model, chunk)
+            except (IntegrityError, serializers.ValidationError):
+                pass
+            else:
+                created.extend(chunk)
+                continue
+
+            for index, order in zip(indexes, chunk):
+                # Ids handed out by the rolled back insert are void.
+                order.pk = None
+                order._state.adding = True
+                try:
+                    with transaction.atomic():
+                        self._write(model, [order])
+                except serializers.ValidationError as e:
+                    self.rejected.append({'index': index, 'errors': e.detail})
+                except IntegrityError as e:
+                    self.rejected.append({
+                        'index': index,
+                        'errors': {'non_field_errors': [str(e).strip()]}
+                    })
+                else:
+                    created.append(order)
+
+        self.rejected.sort(key=lambda row: row['index'])
+        return created
+
+    def _resolve_postcodes(self, orders):
+        """
+        Resolve the unsaved postcodes attached to each order
+        to the ids of the shared postcode rows.
+        """
+
+        for field in ('delivery_postcode', 'billing_postcode'):
+            resolve_postcodes(
+                [
+                    getattr(order, field) for order in orders
+                    if getattr(order, field) is not None
+                ],
+                batch_size=self.batch_size
+            )
+
+            # Attaching the postcodes again sets the foreign key ids.
+            # Otherwise saving the orders sets them and drops the
+            # cached postcodes, and the rollups and the response
+            # would fetch each one back.
+            for order in orders:
+                setattr(order, field, getattr(order, field))
+
+
+class UpsertOrderMixin:
+    """
+    Bulk creates in upsert mode update the orders whose order number
+    exists, so order numbers in use must not be rejected.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        if (self.context.get('upsert')
+                and isinstance(self.parent, serializers.ListSerializer)):
+            order_number = fields['order_number']
+            order_number.validators = [
+                validator for validator in order_number.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
 
-class FullOrderSerializer(serializers.ModelSerializer):
+        return fields
+
+
+class FullOrderSerializer(TimedDataMixin, UpsertOrderMixin,
+                          serializers.ModelSerializer):
     """
     Serializer for Full Orders.
     """
@@ -64,37 +247,42 @@ class FullOrderSerializer(serializers.ModelSerializer):
                   'dispatch_date', 'delivery_status', 'delivery_date', 'avg_customer_age']
         read_only_fields = ['id', 'avg_customer_age']
         list_serializer_class = BulkCreateOrderSerializer
+        # The partitioned table only enforces order numbers unique
+        # per order date.
+        extra_kwargs = {
+            'order_number': {
+                'validators': [
+                    UniqueValidator(queryset=FullOrder.objects.all())
+                ]
+            }
+        }
     
 
     def create(self, validated_data):
 
-        delivery_postcode = validated_data.pop('delivery_postcode', {})
-        billing_postcode = validated_data.pop('billing_postcode', {})
-
-        instance = FullOrder(**validated_data)
-        self._get_or_create_delivery_postcode(delivery_postcode, instance)
-        self._get_or_create_billing_postcode(billing_postcode, instance)
+        instance = self.build_order(validated_data)
 
-        if isinstance(self._kwargs['data'], dict):
+        with transaction.atomic():
+            resolve_postcodes([instance.delivery_postcode])
+            resolve_postcodes([instance.billing_postcode])
             instance.save()
+            record_full_orders([instance])
 
         return instance
-    
-    def _get_or_create_billing_postcode(self, postcode, order):
 
-        billing_postcode = BillingPostcode.objects.create(
-            **postcode
-        )
+    def build_order(self, validated_data):
+        """
+        Return an unsaved Full Order with unresolved postcodes attached.
+        """
 
-        order.billing_postcode = billing_postcode
-    
-    def _get_or_create_delivery_postcode(self, postcode, order):
+        delivery_postcode = validated_data.pop('delivery_postcode', {})
+        billing_postcode = validated_data.pop('billing_postcode', {})
 
-        delivery_postcode = DeliveryPostcode.objects.create(
-            **postcode
-        )
+        instance = FullOrder(**validated_data)
+        instance.delivery_postcode = DeliveryPostcode(**delivery_postcode)
+        instance.billing_postcode = BillingPostcode(**billing_postcode)
 
-        order.delivery_postcode = delivery_postcode
+        return instance
     
     # def get_avg_customer_age(self, obj):
     #     return FullOrder.objects.all().aggregate(
@@ -102,7 +290,8 @@ class FullOrderSerializer(serializers.ModelSerializer):
     #     )
     
 
-class TodaysOrderSerializer(serializers.ModelSerializer):
+class TodaysOrderSerializer(TimedDataMixin, UpsertOrderMixin,
+                            serializers.ModelSerializer):
     """
     Serializer for Todays Orders.
     """
@@ -119,7 +308,15 @@ class TodaysOrderSerializer(serializers.ModelSerializer):
         list_serializer_class = BulkCreateOrderSerializer
 
     def create(self, validated_data):
-   
+
+        instance = self.build_order(validated_data)
+        instance.save()
+
+        return instance
+
+    def build_order(self, validated_data):
+        """Return an unsaved Todays Order."""
+
         delivery_postcode = validated_data.pop('delivery_postcode', {})
         billing_postcode = validated_data.pop('billing_postcode', {})
 
@@ -127,9 +324,6 @@ class TodaysOrderSerializer(serializers.ModelSerializer):
         # self._get_or_create_billing_postcode(billing_postcode, instance)
         # self._get_or_create_delivery_postcode(delivery_postcode, instance)
 
-        if isinstance(self._kwargs['data'], dict):
-            instance.save()
-
         return instance
     
     def _get_or_create_billing_postcode(self, postcode, order):
@@ -160,7 +354,23 @@ class TodaysOrderSerializer(serializers.ModelSerializer):
         return instance
 
 
-class NullOrderSerializer(serializers.ModelSerializer):
+class OrderStatusUpdateSerializer(serializers.Serializer):
+    """
+    One dispatch and delivery status change of a Todays Order,
+    for batched updates.
+    """
+
+    order_number = serializers.CharField(max_length=30)
+    dispatch_status = serializers.CharField(
+        max_length=30, allow_null=True, allow_blank=True)
+    dispatch_date = serializers.DateTimeField(allow_null=True)
+    delivery_status = serializers.CharField(
+        max_length=30, allow_null=True, allow_blank=True)
+    delivery_date = serializers.DateTimeField(allow_null=True)
+
+
+class NullOrderSerializer(TimedDataMixin, UpsertOrderMixin,
+                          serializers.ModelSerializer):
     """
     Serializer for Null Orders.
     """
@@ -179,6 +389,14 @@ class NullOrderSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
 
+        instance = self.build_order(validated_data)
+        instance.save()
+
+        return instance
+
+    def build_order(self, validated_data):
+        """Return an unsaved Null Order."""
+
         delivery_postcode = validated_data.pop('delivery_postcode', {})
         billing_postcode = validated_data.pop('billing_postcode', {})
 
@@ -186,9 +404,6 @@ class NullOrderSerializer(serializers.ModelSerializer):
         # self._get_or_create_delivery_postcode(delivery_postcode, instance)
         # self._get_or_create_billing_postcode(billing_postcode, instance)
 
-        if isinstance(self._kwargs['data'], dict):
-            instance.save()
-
         return instance
     
     def _get_or_create_billing_postcode(self, postcode, order):
@@ -208,7 +423,7 @@ class NullOrderSerializer(serializers.ModelSerializer):
         order.delivery_postcode = delivery_postcode
 
 
-class CountTBSerializer(serializers.ModelSerializer):
+class CountTBSerializer(TimedDataMixin, serializers.ModelSerializer):
     """
     Serializer to display two fields only,
     pertaining to the amount of each toothbrush sold.
@@ -220,6 +435,7 @@ class CountTBSerializer(serializers.ModelSerializer):
     class Meta:
         model = FullOrder
         fields = ('max_toothbrush_2000','max_toothbrush_4000',)
+        list_serializer_class = TimedListSerializer
 
 
     def get_max_toothbrush_2000(self, obj):
@@ -229,32 +445,32 @@ class CountTBSerializer(serializers.ModelSerializer):
         return FullOrder.objects.filter(toothbrush_type='Toothbrush 4000').count()
 
 
-class PostcodeFrequencySerializer(serializers.Serializer):
+class PostcodeFrequencySerializer(ProjectedSerializer):
 
     delivery_postcode__postcode_area = serializers.CharField()
     postcode_count = serializers.IntegerField()
 
 
-class AvgCustomerAgeSerializer(serializers.Serializer):
+class AvgCustomerAgeSerializer(ProjectedSerializer):
 
     avg_customer_age = serializers.IntegerField()
 
 
-class DeliveryDeltaSerializer(serializers.Serializer):
+class DeliveryDeltaSerializer(ProjectedSerializer):
 
     avg_delivery_delta = serializers.CharField()
     max_delivery_delta = serializers.CharField()
     min_delivery_delta = serializers.CharField()
 
 
-class CustomerAgeSerializer(serializers.Serializer):
+class CustomerAgeSerializer(ProjectedSerializer):
 
     avg_customer_age = serializers.IntegerField()
     max_customer_age = serializers.IntegerField()
     min_customer_age = serializers.IntegerField()
 
 
-class FullPostcodeDataSerializer(serializers.Serializer):
+class FullPostcodeDataSerializer(ProjectedSerializer):
 
     delivery_postcode__postcode_area = serializers.CharField()
     avg_customer_age = serializers.IntegerField()
@@ -264,39 +480,89 @@ class FullPostcodeDataSerializer(serializers.Serializer):
     tb_4000_sales = serializers.IntegerField()
 
 
-class TB2000FullDataSerializer(serializers.Serializer):
+class TB2000FullDataSerializer(ProjectedSerializer):
 
     avg_customer_age = serializers.IntegerField()
     avg_delivery_delta = serializers.CharField()
     total_sales = serializers.IntegerField()
 
-class TB4000FullDataSerializer(serializers.Serializer):
+
+class TB4000FullDataSerializer(ProjectedSerializer):
 
     avg_customer_age = serializers.IntegerField()
     avg_delivery_delta = serializers.CharField()
     total_sales = serializers.IntegerField()
 
 
-class TBSalesByAgeSerializer(serializers.Serializer):
+class TBSalesByAgeSerializer(ProjectedSerializer):
 
     customer_age = serializers.IntegerField()
     total_sales = serializers.IntegerField()
 
 
-class OrderQuantitySerializer(serializers.Serializer):
+class OrderQuantitySerializer(ProjectedSerializer):
 
     customer_age = serializers.IntegerField(required=False)
     delivery_postcode__postcode_area = serializers.CharField(required=False)
     order_quantity = serializers.IntegerField()
 
 
-class TotalOrdersSerializer(serializers.Serializer):
+class TotalOrdersSerializer(ProjectedSerializer):
 
     total_orders = serializers.IntegerField()
 
 
-class DeliveryStatusSerializer(serializers.Serializer):
+class DeliveryStatusSerializer(ProjectedSerializer):
 
     delivery_successful = serializers.IntegerField()
     delivery_unsuccessful = serializers.IntegerField()
     delivery_in_transit = serializers.IntegerField()
+
+
+class SalesOverTimeSerializer(ProjectedSerializer):
+
+    period = serializers.DateField()
+    toothbrush_type = serializers.CharField(read_only=True)
+    order_count = serializers.IntegerField()
+    units = serializers.IntegerField()
+    avg_delivery_delta = serializers.CharField()
+
+
+class DistributionSerializer(ProjectedSerializer):
+
+    total = serializers.IntegerField()
+    delivery_delta_seconds = serializers.DictField()
+    customer_age = serializers.DictField()
+
+
+class NullOrderCountSerializer(ProjectedSerializer):
+
+    null_order_count = serializers.IntegerField()
+
+
+class IngestJobSerializer(TimedDataMixin, serializers.ModelSerializer):
+    """
+    Progress of an asynchronous bulk ingest, with its throughput in
+    orders written per second since it started.
+    """
+
+    rows_per_second = serializers.SerializerMethodField()
+
+    class Meta:
+        model = IngestJob
+        fields = [
+            'id', 'order_type', 'upsert', 'status', 'total_rows',
+            'processed_rows', 'rows_per_second', 'counts', 'rejected_rows',
+            'rejected', 'error', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_rows_per_second(self, obj) -> float:
+        if obj.started_at is None:
+            return None
+
+        elapsed = ((obj.finished_at or timezone.now())
+                   - obj.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        return round(obj.processed_rows / elapsed, 1)
@@ -0,0 +1,81 @@
+"""
+Batched dispatch and delivery status updates for Todays Orders.
+
+A batch of status changes is applied with one
+'UPDATE ... FROM (VALUES ...)' statement per chunk, all in one
+transaction, instead of a request and an UPDATE per order.
+"""
+
+from django.db import connection, transaction
+
+from core.models import TodaysOrder
+
+from orders.cache import bump_data_version, TODAYS_ORDERS
+
+
+STATUS_FIELDS = [
+    'dispatch_status', 'dispatch_date', 'delivery_status', 'delivery_date']
+
+CHUNK_SIZE = 1000
+
+# Values are cast in the SET clause: a column of nulls only would
+# otherwise be typed as text.
+UPDATE_STATUSES_SQL = """
+    UPDATE {table} o SET
+        dispatch_status = v.dispatch_status::varchar,
+        dispatch_date = v.dispatch_date::timestamptz,
+        delivery_status = v.delivery_status::varchar,
+        delivery_date = v.delivery_date::timestamptz
+    FROM (VALUES {values}) AS v (order_number, {fields})
+    WHERE o.order_number = v.order_number
+    RETURNING o.order_number
+"""
+
+
+def update_statuses(updates, chunk_size=CHUNK_SIZE):
+    """
+    Apply a list of status updates, dicts holding an 'order_number'
+    and the 'STATUS_FIELDS'. A later update of the same order number
+    replaces an earlier one.
+
+    Returns the order numbers matched and those not found.
+    """
+
+    # Keyed by order number so an order is never updated twice by
+    # one statement. Sorted so concurrent batches lock rows in the
+    # same order.
+    latest = {update['order_number']: update for update in updates}
+    order_numbers = sorted(latest)
+
+    table = connection.ops.quote_name(TodaysOrder._meta.db_table)
+    placeholders = '(' + ', '.join(['%s'] * (len(STATUS_FIELDS) + 1)) + ')'
+    matched = set()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(0, len(order_numbers), chunk_size):
+            chunk = order_numbers[i:i + chunk_size]
+            params = []
+            for order_number in chunk:
+                params.append(order_number)
+                params.extend(
+                    latest[order_number].get(field)
+                    for field in STATUS_FIELDS
+                )
+
+            cursor.execute(
+                UPDATE_STATUSES_SQL.format(
+                    table=table,
+                    values=', '.join([placeholders] * len(chunk)),
+                    fields=', '.join(STATUS_FIELDS)
+                ),
+                params
+            )
+            matched.update(row[0] for row in cursor.fetchall())
+
+        if matched:
+            bump_data_version(TODAYS_ORDERS)
+
+    return {
+        'matched': [n for n in order_numbers if n in matched],
+        'unmatched': [n for n in order_numbers if n not in matched],
+    }
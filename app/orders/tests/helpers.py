@@ -0,0 +1,40 @@
+"""
+Order factories shared by the order tests.
+"""
+import datetime
+import pytz
+
+
+time_now = pytz.utc.localize(datetime.datetime(2023, 1, 10, 12))
+
+
+def order_fields(order_number, **params):
+    """Return model fields for creating an order directly."""
+    fields = {
+        'order_number': order_number,
+        'toothbrush_type': 'Toothbrush 2000',
+        'order_date': time_now,
+        'customer_age': 30,
+        'order_quantity': 1,
+        'is_first': True,
+        'dispatch_status': 'Dispatched',
+        'dispatch_date': time_now,
+        'delivery_status': 'Delivered',
+        'delivery_date': time_now,
+    }
+    fields.update(params)
+    return fields
+
+
+def order_payload(order_number, **params):
+    """Return a JSON order payload for posting to the order API."""
+    payload = {
+        key: value.isoformat() if isinstance(value, datetime.datetime)
+        else value
+        for key, value in order_fields(order_number).items()
+    }
+    payload['delivery_postcode'] = {
+        'postcode': 'LS1 1AA', 'postcode_area': 'LS'}
+    payload['billing_postcode'] = {'postcode': 'LS1 1AA'}
+    payload.update(params)
+    return payload
@@ -0,0 +1,95 @@
+"""Tests for the analytics response cache."""
+
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import caches
+from django.db import connection
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import TodaysOrder, DataVersion
+
+from orders.cache import get_data_versions, TODAYS_ORDERS, FULL_ORDERS
+from orders.tests.helpers import order_payload
+
+
+TODAYS_ORDER_URL = reverse('orders:todays_orders-list')
+TODAYS_COUNT_URL = reverse('orders:todays_orders-count')
+TODAYS_DELETE_URL = reverse('orders:todays_orders-delete')
+
+
+class AnalyticsCacheTests(TestCase):
+    """Test analytics responses are cached until orders change."""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['analytics'].clear()
+
+    def _post(self, payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(TODAYS_ORDER_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_repeated_read_served_from_cache(self):
+        """Test a repeated read does not recount the orders."""
+
+        self._post(order_payload('BRU00001'))
+        self.client.get(TODAYS_COUNT_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(TODAYS_COUNT_URL)
+
+        self.assertEqual(res.data, {'count': 1})
+        for query in queries:
+            self.assertNotIn(TodaysOrder._meta.db_table, query['sql'])
+
+    def test_query_params_are_normalized(self):
+        """Test the cache key ignores query parameter order."""
+
+        self._post(order_payload('BRU00001'))
+        self.client.get(
+            TODAYS_COUNT_URL + '?toothbrush_type=toothbrush_2000&a=1')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                TODAYS_COUNT_URL + '?a=1&toothbrush_type=toothbrush_2000')
+
+        for query in queries:
+            self.assertNotIn(TodaysOrder._meta.db_table, query['sql'])
+
+    def test_writes_invalidate_cached_reads(self):
+        """Test create, bulk create and delete all clear the cache."""
+
+        self.assertEqual(self.client.get(TODAYS_COUNT_URL).data['count'], 0)
+
+        self._post(order_payload('BRU00001'))
+        self.assertEqual(self.client.get(TODAYS_COUNT_URL).data['count'], 1)
+
+        self._post([order_payload('BRU00002'), order_payload('BRU00003')])
+        self.assertEqual(self.client.get(TODAYS_COUNT_URL).data['count'], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(TODAYS_DELETE_URL)
+        self.assertEqual(self.client.get(TODAYS_COUNT_URL).data['count'], 0)
+
+    def test_failed_write_keeps_version(self):
+        """Test a rejected write does not bump the data version."""
+
+        payload = order_payload('BRU00001')
+        del payload['customer_age']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(TODAYS_ORDER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(DataVersion.objects.exists())
+
+    def test_writes_only_bump_their_own_scope(self):
+        """Test writing todays orders leaves full order data cached."""
+
+        self._post(order_payload('BRU00001'))
+
+        self.assertEqual(
+            get_data_versions([TODAYS_ORDERS, FULL_ORDERS]), [1, 0])
@@ -0,0 +1,121 @@
+"""Tests for approximate analytics."""
+
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from django.core.cache import caches
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import FullOrder, TodaysOrder
+
+from orders.aggregations import aggregate_full_data
+from orders.approximate import Sample, approximate_count, estimated_rows
+from orders.timeseries import sales_over_time
+from orders.tests.helpers import order_fields, time_now
+
+import datetime
+
+
+FULL_DATA_URL = reverse('orders:full_orders-get-full-data')
+TODAYS_COUNT_URL = reverse('orders:todays_orders-count')
+NULL_ORDERS_URL = reverse('orders:null_orders-get-null-orders')
+
+
+class SampleTests(SimpleTestCase):
+    """Test the scaling and error bounds of a sample."""
+
+    def test_scale_and_error(self):
+        """Test counts are scaled by the sampled fraction."""
+
+        sample = Sample(10)
+        rows = sample.scale_rows(
+            [{'count': 40, 'units': 80}, {'count': 60, 'units': None}],
+            ('count', 'units'), 'count')
+
+        self.assertEqual(rows, [{'count': 400, 'units': 800},
+                                {'count': 600, 'units': None}])
+        self.assertEqual(sample.sampled_rows, 100)
+        self.assertAlmostEqual(sample.relative_error(),
+                               1.96 * (0.9 / 100) ** 0.5)
+        self.assertEqual(sample.clause(), 'TABLESAMPLE SYSTEM (10)')
+
+
+class ApproximateQueryTests(TestCase):
+    """Test sampled queries and estimated counts."""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['analytics'].clear()
+
+        for x in range(3):
+            FullOrder.objects.create(
+                **order_fields(f'BRU0000{x}', order_quantity=2))
+            TodaysOrder.objects.create(**order_fields(
+                f'BRU0001{x}',
+                toothbrush_type='Toothbrush 4000' if x else 'Toothbrush 2000'
+            ))
+
+    def test_full_sample_matches_exact_data(self):
+        """Test sampling every page gives the exact figures."""
+
+        sample = Sample(100)
+        start = time_now - datetime.timedelta(days=1)
+
+        self.assertEqual(
+            aggregate_full_data(start=start, sample=sample),
+            aggregate_full_data(start=start)
+        )
+        self.assertEqual(sample.sampled_rows, 3)
+
+        buckets = sales_over_time(sample=Sample(100))
+        self.assertEqual(buckets[0]['units'], 6)
+
+    def test_small_tables_are_exact(self):
+        """Test tables below the sample size are never sampled."""
+
+        self.assertLess(estimated_rows(TodaysOrder), 100000)
+
+        res = self.client.get(TODAYS_COUNT_URL, {'approximate': 'true'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'count': 3, 'approximation': None})
+
+        res = self.client.get(FULL_DATA_URL, {
+            'approximate': 'true', 'start_date': '2023-01-01'})
+        self.assertEqual(res.data['total_orders'], {'total_orders': 3})
+        self.assertIsNone(res.data['approximation'])
+
+    @patch('orders.approximate.estimated_rows', return_value=5000000)
+    def test_unfiltered_count_uses_estimate(self, patched_estimate):
+        """Test unfiltered totals come from the planner estimate."""
+
+        res = self.client.get(TODAYS_COUNT_URL, {'approximate': '1'})
+
+        self.assertEqual(res.data, {
+            'count': 5000000,
+            'approximation': {'method': 'estimate'}
+        })
+        patched_estimate.assert_called_once_with(TodaysOrder)
+
+    @patch('orders.approximate.estimated_rows', return_value=5000000)
+    def test_filtered_count_is_sampled(self, patched_estimate):
+        """Test filtered counts are sampled and report their error."""
+
+        res = self.client.get(NULL_ORDERS_URL, {
+            'approximate': 'true', 'toothbrush_type': 'toothbrush_2000'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['null_order_count'], 0)
+        self.assertEqual(res.data['approximation']['method'], 'sample')
+        self.assertEqual(res.data['approximation']['sample_percent'], 2.0)
+
+    def test_exact_responses_unchanged(self):
+        """Test the 'approximation' key is only added on request."""
+
+        res = self.client.get(TODAYS_COUNT_URL)
+
+        self.assertEqual(res.data, {'count': 3})
+        self.assertEqual(approximate_count(TodaysOrder), (3, None))
@@ -0,0 +1,98 @@
+"""Tests for the synthetic data generator and the benchmark runner."""
+
+from django.test import TestCase, SimpleTestCase
+
+from core.models import FullOrder, NullOrder, TodaysOrder, CustomerAgeRollup
+
+from orders.benchmarks import run_benchmarks, compare
+from orders.generator import generate_orders, parse_row_count
+
+
+def result(p95=10.0, queries=3, memory=100.0):
+    return {
+        'latency_ms': {'p50': p95 / 2, 'p95': p95, 'p99': p95},
+        'queries': queries,
+        'peak_memory_kb': memory,
+    }
+
+
+class GeneratorTests(TestCase):
+    """Test generating synthetic orders."""
+
+    def test_parse_row_count(self):
+        """Test row counts with k and m suffixes."""
+
+        self.assertEqual(parse_row_count('10k'), 10000)
+        self.assertEqual(parse_row_count('1M'), 1000000)
+        self.assertEqual(parse_row_count('250'), 250)
+
+        with self.assertRaises(ValueError):
+            parse_row_count('0')
+
+    def test_generate_orders(self):
+        """Test every order type is loaded in several chunks."""
+
+        counts = generate_orders(250, 'full', seed=1, chunk_size=100,
+                                 postcodes=50)
+        generate_orders(50, 'todays', seed=1, postcodes=10)
+        generate_orders(50, 'null', seed=1, postcodes=10)
+
+        self.assertEqual(counts['orders_created'], 250)
+        self.assertEqual(FullOrder.objects.count(), 250)
+        self.assertEqual(TodaysOrder.objects.count(), 50)
+        self.assertFalse(
+            NullOrder.objects.exclude(delivery_status=None).exists())
+        self.assertEqual(
+            sum(CustomerAgeRollup.objects.values_list(
+                'order_count', flat=True)),
+            250
+        )
+
+
+class BenchmarkRunnerTests(TestCase):
+    """Test running the endpoint benchmarks."""
+
+    def test_run_benchmarks(self):
+        """Test results are recorded and writes are rolled back."""
+
+        generate_orders(20, 'full', seed=1, postcodes=10)
+
+        results = run_benchmarks(
+            iterations=2,
+            names=['full_orders.get_full_data', 'full_orders.create']
+        )
+
+        self.assertEqual(
+            set(results['endpoints']),
+            {'full_orders.get_full_data', 'full_orders.create'}
+        )
+        created = results['endpoints']['full_orders.create']
+        self.assertGreater(created['queries'], 0)
+        self.assertGreater(created['latency_ms']['p95'], 0)
+        self.assertEqual(results['rows']['core_fullorder'], 20)
+        self.assertEqual(FullOrder.objects.count(), 20)
+
+
+class BenchmarkCompareTests(SimpleTestCase):
+    """Test comparing benchmark results against a baseline."""
+
+    def test_compare_flags_regressions(self):
+        """Test slower, chattier or hungrier endpoints are reported."""
+
+        baseline = {'endpoints': {
+            'a': result(), 'b': result(), 'c': result(), 'd': result()
+        }}
+        current = {'endpoints': {
+            'a': result(p95=11.0),
+            'b': result(p95=13.0),
+            'c': result(queries=4),
+            'd': result(memory=150.0),
+            'new': result(),
+        }}
+
+        regressions = compare(baseline, current, threshold=0.2)
+
+        self.assertEqual(
+            [regression.split(':')[0] for regression in regressions],
+            ['b', 'c', 'd']
+        )
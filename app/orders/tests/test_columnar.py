@@ -0,0 +1,148 @@
+"""Tests for column-at-a-time validation of bulk payloads."""
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import serializers
+
+from orders.columnar import column_plan, validate_rows
+from orders.serializers import (
+    FullOrderSerializer,
+    TodaysOrderSerializer,
+    NullOrderSerializer
+)
+from orders.tests.helpers import (
+    order_fields,
+    order_payload,
+    time_now
+)
+
+from core.models import FullOrder
+
+
+def row_by_row(serializer, rows):
+    """Validate the rows the way ListSerializer does."""
+
+    validated = []
+    errors = []
+
+    for row in rows:
+        try:
+            validated.append(serializer.run_validation(row))
+            errors.append({})
+        except serializers.ValidationError as e:
+            validated.append(None)
+            errors.append(e.detail)
+
+    return validated, errors
+
+
+class ColumnarValidationTests(TestCase):
+    """Test column validation matches row-by-row validation."""
+
+    def setUp(self):
+        FullOrder.objects.create(**order_fields('BRU99999'))
+
+    def assert_matches_row_by_row(self, serializer_class, rows):
+        child = serializer_class(many=True).child
+
+        self.assertIsNotNone(column_plan(child))
+        self.assertEqual(validate_rows(child, rows),
+                         row_by_row(child, rows))
+
+    def test_valid_rows(self):
+        """Test valid rows give the serializer's validated data."""
+
+        rows = [
+            order_payload('BRU00001'),
+            order_payload('  BRU00002  ',
+                          order_date='2023-01-10T12:00:00',
+                          dispatch_date='2023-01-10 13:00:00+01:00'),
+            order_payload('BRU00003', billing_postcode={
+                'postcode': 'LS2 2AA', 'postcode_area': None}),
+        ]
+        del rows[2]['delivery_postcode']
+
+        self.assert_matches_row_by_row(FullOrderSerializer, rows)
+
+        validated, _ = validate_rows(
+            FullOrderSerializer(many=True).child, rows)
+        self.assertEqual(validated[1]['order_number'], 'BRU00002')
+        self.assertEqual(validated[1]['order_date'], time_now)
+
+    def test_invalid_rows(self):
+        """Test invalid rows get the serializer's errors."""
+
+        rows = [
+            order_payload('BRU00001', customer_age='thirty'),
+            order_payload('BRU00002', customer_age=2 ** 40),
+            order_payload('BRU00003', order_quantity=True),
+            order_payload('BRU00004', order_date='10/01/2023'),
+            order_payload('BRU00005', dispatch_date='2023-02-30T12:00'),
+            order_payload('B' * 31),
+            order_payload(''),
+            order_payload(None),
+            order_payload('BRU00009', is_first='maybe'),
+            order_payload('BRU00010', delivery_postcode={'postcode': None}),
+            order_payload('BRU00011', toothbrush_type=['Toothbrush 2000']),
+            order_payload('BRU99999'),
+            'not an order',
+        ]
+        del rows[0]['delivery_date']
+
+        self.assert_matches_row_by_row(FullOrderSerializer, rows)
+
+    def test_coerced_values(self):
+        """Test values the fields coerce are validated as they are."""
+
+        rows = [
+            order_payload('BRU00001', customer_age='30', is_first='true'),
+            order_payload('BRU00002', order_quantity=2.0),
+            order_payload(12345),
+        ]
+
+        self.assert_matches_row_by_row(FullOrderSerializer, rows)
+
+    def test_nullable_fields(self):
+        """Test null and blank values of optional fields."""
+
+        rows = [
+            order_payload('BRU00001', dispatch_status=None,
+                          dispatch_date=None, delivery_status='',
+                          delivery_date=None),
+            order_payload('BRU00002', dispatch_status='   '),
+        ]
+        del rows[1]['delivery_date']
+
+        self.assert_matches_row_by_row(TodaysOrderSerializer, rows)
+        self.assert_matches_row_by_row(NullOrderSerializer, rows)
+
+    def test_unique_check_is_one_query(self):
+        """Test the order numbers are checked with a single query."""
+
+        child = FullOrderSerializer(many=True).child
+        rows = [order_payload(f'BRU{x:05}') for x in range(50)]
+
+        with CaptureQueriesContext(connection) as queries:
+            validated, errors = validate_rows(child, rows)
+
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(any(errors))
+        self.assertEqual(validated[0]['order_date'], time_now)
+
+    def test_bulk_create_errors_unchanged(self):
+        """Test bulk creates report the errors of each row."""
+
+        serializer = FullOrderSerializer(
+            data=[order_payload('BRU00001'),
+                  order_payload('BRU00002', customer_age='old')],
+            many=True
+        )
+
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors[0], {})
+        self.assertEqual(
+            [str(e) for e in serializer.errors[1]['customer_age']],
+            ['A valid integer is required.']
+        )
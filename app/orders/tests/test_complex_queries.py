@@ -0,0 +1,322 @@
+"""Tests for the aggregate analytics queries of the Orders API."""
+
+from django.test import TestCase
+from django.core.cache import caches
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import FullOrder, DeliveryPostcode
+
+from orders.aggregations import aggregate_full_data
+from orders.rollups import full_data_from_rollups, rebuild_rollups
+
+import datetime
+import pytz
+
+
+FULL_ORDER_URL = reverse('orders:full_orders-list')
+FULL_DATA_URL = reverse('orders:full_orders-get-full-data')
+FULL_DATA_BY_TB_URL = reverse('orders:full_orders-get-full-data-by-tb-type')
+
+time_now = pytz.utc.localize(datetime.datetime(2023, 1, 10, 12, 0))
+
+
+def create_full_order(order_number, postcode_area=None, **params):
+    """Create and return a Full Order with a delivery postcode."""
+
+    delivery_postcode, _ = DeliveryPostcode.objects.get_or_create(
+        postcode=f'{postcode_area} 1AA',
+        defaults={'postcode_area': postcode_area}
+    )
+
+    defaults = {
+        'order_number': order_number,
+        'toothbrush_type': 'Toothbrush 2000',
+        'order_date': time_now,
+        'customer_age': 30,
+        'order_quantity': 1,
+        'is_first': True,
+        'dispatch_status': 'Dispatched',
+        'dispatch_date': time_now,
+        'delivery_status': 'Delivered',
+        'delivery_date': time_now + datetime.timedelta(days=2),
+        'delivery_postcode': delivery_postcode
+    }
+    defaults.update(params)
+
+    return FullOrder.objects.create(**defaults)
+
+
+class FullDataAggregationTests(TestCase):
+    """Test the single-pass 'get_full_data' aggregation."""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['analytics'].clear()
+
+        create_full_order('BRU00001', 'LS', customer_age=20)
+        create_full_order('BRU00002', 'LS', customer_age=40,
+                          delivery_status='In Transit')
+        create_full_order('BRU00003', 'M', customer_age=20,
+                          toothbrush_type='Toothbrush 4000',
+                          delivery_status='Unsuccessful',
+                          delivery_date=time_now + datetime.timedelta(days=4))
+        create_full_order('BRU00004', 'M', customer_age=60,
+                          toothbrush_type='toothbrush 4000')
+
+        rebuild_rollups()
+
+    def test_full_data_sections(self):
+        """Test every section is split out of the grouped rows."""
+
+        sections = aggregate_full_data()
+
+        self.assertEqual(sections['total_orders'], {'total_orders': 4})
+        self.assertEqual(sections['delivery_statuses'], {
+            'delivery_successful': 2,
+            'delivery_unsuccessful': 1,
+            'delivery_in_transit': 1
+        })
+        self.assertEqual(sections['sales_by_age'], [
+            {'customer_age': 20, 'total_sales': 2},
+            {'customer_age': 40, 'total_sales': 1},
+            {'customer_age': 60, 'total_sales': 1}
+        ])
+        self.assertEqual(sections['customer_age'], {
+            'avg_customer_age': 35.0,
+            'max_customer_age': 60,
+            'min_customer_age': 20
+        })
+        self.assertEqual(
+            sections['avg_delivery_delta']['max_delivery_delta'],
+            datetime.timedelta(days=4)
+        )
+        self.assertEqual(sections['tb_2000_orders_by_age'], [
+            {'customer_age': 20, 'order_quantity': 1},
+            {'customer_age': 40, 'order_quantity': 1}
+        ])
+        self.assertEqual(
+            sorted(row['customer_age']
+                   for row in sections['tb_4000_orders_by_age']),
+            [20, 60]
+        )
+        self.assertEqual(sections['tb_4000_orders_by_postcode'], [
+            {'delivery_postcode__postcode_area': 'M', 'order_quantity': 1}
+        ])
+
+        postcode_areas = {
+            row['delivery_postcode__postcode_area']: row
+            for row in sections['data_by_postcode']
+        }
+        self.assertEqual(postcode_areas['LS']['total_tb_sales'], 2)
+        self.assertEqual(postcode_areas['LS']['tb_2000_sales'], 2)
+        self.assertEqual(postcode_areas['M']['tb_4000_sales'], 1)
+
+    def test_full_data_filtered_by_toothbrush_type(self):
+        """Test sections are restricted to a toothbrush type."""
+
+        sections = aggregate_full_data('toothbrush 4000')
+
+        self.assertEqual(sections['total_orders'], {'total_orders': 2})
+        self.assertEqual(sections['customer_age']['max_customer_age'], 60)
+
+    def test_rollups_match_raw_aggregation(self):
+        """Test rollup sections equal those computed from raw orders."""
+
+        self.assertEqual(full_data_from_rollups(), aggregate_full_data())
+        self.assertEqual(
+            full_data_from_rollups('TOOTHBRUSH 4000'),
+            aggregate_full_data('TOOTHBRUSH 4000')
+        )
+
+    def test_get_full_data_reads_rollups(self):
+        """Test the 'get_full_data' endpoint never scans raw orders."""
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(FULL_DATA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for query in queries:
+            self.assertNotIn(FullOrder._meta.db_table, query['sql'])
+        self.assertEqual(res.data['total_orders'], {'total_orders': 4})
+        self.assertEqual(res.data['sales_by_age'], res.data['tb_sales_by_age'])
+
+    def test_get_full_data_by_toothbrush_type(self):
+        """Test the filtered response keeps its original keys."""
+
+        res = self.client.get(
+            FULL_DATA_URL, {'toothbrush_type': 'toothbrush_2000'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data), {
+            'data_by_postcode', 'sales_by_age', 'total_orders',
+            'delivery_statuses', 'avg_delivery_delta', 'customer_age'
+        })
+        self.assertEqual(res.data['total_orders'], {'total_orders': 2})
+
+    def test_get_full_data_by_tb_type(self):
+        """Test per toothbrush summary is read from the rollups."""
+
+        res = self.client.get(
+            FULL_DATA_BY_TB_URL, {'toothbrush_type': 'toothbrush_4000'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total_sales'], 2)
+        self.assertEqual(res.data['avg_customer_age'], 40)
+
+
+class DateRangeTests(TestCase):
+    """Test analytics restricted to a range of order dates."""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['analytics'].clear()
+
+        create_full_order('BRU00001', 'LS', customer_age=20)
+        create_full_order('BRU00002', 'M', customer_age=40,
+                          order_date=time_now - datetime.timedelta(days=40))
+        create_full_order('BRU00003', 'N', customer_age=60,
+                          toothbrush_type='Toothbrush 4000',
+                          order_date=time_now + datetime.timedelta(days=40))
+
+        rebuild_rollups()
+
+    def test_get_full_data_date_range(self):
+        """Test only orders within the inclusive range are counted."""
+
+        res = self.client.get(FULL_DATA_URL, {
+            'start_date': '2023-01-10', 'end_date': '2023-01-10'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total_orders'], {'total_orders': 1})
+        self.assertEqual(res.data['customer_age']['max_customer_age'], 20)
+
+    def test_get_full_data_open_ended_range(self):
+        """Test either bound may be left out."""
+
+        res = self.client.get(FULL_DATA_URL, {'start_date': '2023-01-01'})
+        self.assertEqual(res.data['total_orders'], {'total_orders': 2})
+
+        res = self.client.get(FULL_DATA_URL, {'end_date': '2023-01-09'})
+        self.assertEqual(res.data['total_orders'], {'total_orders': 1})
+
+    def test_get_full_data_by_tb_type_date_range(self):
+        """Test the per toothbrush summary honours the range."""
+
+        res = self.client.get(FULL_DATA_BY_TB_URL, {
+            'toothbrush_type': 'toothbrush_4000',
+            'start_date': '2023-01-01', 'end_date': '2023-01-31'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total_sales'], 0)
+
+    def test_invalid_date_range(self):
+        """Test malformed or reversed dates are rejected."""
+
+        res = self.client.get(FULL_DATA_URL, {'start_date': '10/01/2023'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(FULL_DATA_URL, {
+            'start_date': '2023-02-01', 'end_date': '2023-01-01'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RollupIngestTests(TestCase):
+    """Test rollups are maintained as orders are ingested."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _payload(self, order_number, **params):
+        payload = {
+            'order_number': order_number,
+            'toothbrush_type': 'Toothbrush 2000',
+            'order_date': time_now,
+            'customer_age': 25,
+            'order_quantity': 3,
+            'delivery_postcode': {'postcode': 'LS1 1AA',
+                                  'postcode_area': 'LS'},
+            'billing_postcode': {'postcode': 'LS1 1AA'},
+            'is_first': True,
+            'dispatch_status': 'Dispatched',
+            'dispatch_date': time_now,
+            'delivery_status': 'Delivered',
+            'delivery_date': time_now + datetime.timedelta(days=1)
+        }
+        payload.update(params)
+        return payload
+
+    def test_single_and_bulk_create_update_rollups(self):
+        """Test created orders are added to the rollups."""
+
+        res = self.client.post(
+            FULL_ORDER_URL, self._payload('BRU00001'), format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(FULL_ORDER_URL, [
+            self._payload('BRU00002', customer_age=50),
+            self._payload('BRU00003', toothbrush_type='Toothbrush 4000',
+                          delivery_status='In Transit')
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        incremental = full_data_from_rollups()
+        self.assertEqual(incremental, aggregate_full_data())
+        self.assertEqual(incremental['total_orders'], {'total_orders': 3})
+
+        rebuild_rollups()
+        self.assertEqual(full_data_from_rollups(), incremental)
+
+    def test_delete_order_refreshes_rollups(self):
+        """Test deleting an order removes it from the rollups."""
+
+        self.client.post(FULL_ORDER_URL, [
+            self._payload('BRU00001'),
+            self._payload('BRU00002', customer_age=60)
+        ], format='json')
+
+        order = FullOrder.objects.get(order_number='BRU00002')
+        res = self.client.delete(
+            reverse('orders:full_orders-detail', args=[order.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            full_data_from_rollups()['customer_age']['max_customer_age'], 25)
+        self.assertEqual(full_data_from_rollups(), aggregate_full_data())
+
+    def test_update_order_moves_it_between_rollups(self):
+        """
+        Test updating an order moves it between rollup groups
+        without rebuilding the rollup tables.
+        """
+
+        self.client.post(FULL_ORDER_URL, [
+            self._payload('BRU00001'),
+            self._payload('BRU00002', customer_age=60),
+            self._payload('BRU00003', toothbrush_type='Toothbrush 4000')
+        ], format='json')
+
+        order = FullOrder.objects.get(order_number='BRU00002')
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.patch(
+                reverse('orders:full_orders-detail', args=[order.id]),
+                {'customer_age': 40, 'delivery_status': 'In Transit'},
+                format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(
+            'LOCK TABLE' in query['sql'] for query in queries.captured_queries
+        ))
+
+        incremental = full_data_from_rollups()
+        self.assertEqual(incremental, aggregate_full_data())
+        self.assertEqual(
+            incremental['customer_age']['max_customer_age'], 40)
+
+        rebuild_rollups()
+        self.assertEqual(full_data_from_rollups(), incremental)
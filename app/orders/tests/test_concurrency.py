@@ -0,0 +1,126 @@
+"""Tests for running analytics queries concurrently."""
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.db import connection
+
+from core.metrics import QueryRecorder
+from core.models import FullOrder
+
+from orders.aggregations import aggregate_full_data, month_ranges
+from orders.concurrency import run_concurrently
+
+from functools import partial
+
+import datetime
+import threading
+import time
+import pytz
+
+
+def count_orders():
+    return FullOrder.objects.count()
+
+
+class RunConcurrentlyTests(TransactionTestCase):
+    """Test calls run on worker threads with their own connections."""
+
+    def test_results_in_order_and_capped(self):
+        """Test results keep their order and the cap is respected."""
+
+        lock = threading.Lock()
+        running = []
+        peak = []
+
+        def call(value):
+            with lock:
+                running.append(value)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(value)
+            return value, threading.get_ident()
+
+        results = run_concurrently(
+            [partial(call, x) for x in range(6)], max_workers=2)
+
+        self.assertEqual([value for value, _ in results], list(range(6)))
+        self.assertEqual(max(peak), 2)
+        self.assertNotIn(
+            threading.get_ident(), {ident for _, ident in results})
+
+    @override_settings(ANALYTICS_QUERY_CONCURRENCY=3)
+    def test_queries_counted_and_results_match(self):
+        """Test a period read in ranges of months matches one query."""
+
+        for x in range(6):
+            order_date = pytz.utc.localize(
+                datetime.datetime(2023, 1 + x, 10))
+            FullOrder.objects.create(
+                order_number=f'BRU0000{x}',
+                toothbrush_type='Toothbrush 2000',
+                order_date=order_date,
+                customer_age=20 + x % 2,
+                order_quantity=1,
+                is_first=True,
+                dispatch_status='Dispatched',
+                dispatch_date=order_date,
+                delivery_status='Delivered',
+                delivery_date=order_date + datetime.timedelta(days=x)
+            )
+
+        start = pytz.utc.localize(datetime.datetime(2023, 1, 5))
+        end = pytz.utc.localize(datetime.datetime(2023, 7, 1))
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            concurrent = aggregate_full_data(start=start, end=end)
+
+        with override_settings(ANALYTICS_QUERY_CONCURRENCY=1):
+            sequential = aggregate_full_data(start=start, end=end)
+
+        self.assertEqual(concurrent, sequential)
+        self.assertEqual(concurrent['total_orders'], {'total_orders': 6})
+        self.assertEqual(
+            concurrent['avg_delivery_delta']['avg_delivery_delta'],
+            datetime.timedelta(days=2, hours=12)
+        )
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(run_concurrently([count_orders] * 2), [6, 6])
+
+
+class MonthRangesTests(TestCase):
+    """Test periods are split at month boundaries."""
+
+    def test_month_ranges(self):
+        """Test ranges cover the period with at most the given count."""
+
+        start = pytz.utc.localize(datetime.datetime(2023, 1, 5))
+        end = pytz.utc.localize(datetime.datetime(2023, 6, 20))
+
+        ranges = month_ranges(start, end, 3)
+
+        self.assertEqual(len(ranges), 3)
+        self.assertEqual(ranges[0][0], start)
+        self.assertEqual(ranges[-1][1], end)
+        self.assertEqual(
+            [upper for _, upper in ranges[:-1]],
+            [pytz.utc.localize(datetime.datetime(2023, month, 1))
+             for month in (3, 5)]
+        )
+        self.assertEqual(month_ranges(start, end, 10)[1][0].month, 2)
+        self.assertEqual(
+            month_ranges(start, start + datetime.timedelta(days=2), 3),
+            [(start, start + datetime.timedelta(days=2))]
+        )
+
+
+class RunInTransactionTests(TestCase):
+    """Test calls inside a transaction stay on its connection."""
+
+    def test_sequential_inside_transaction(self):
+        """Test uncommitted rows are visible to the calls."""
+
+        results = run_concurrently(
+            [threading.get_ident, threading.get_ident], max_workers=2)
+
+        self.assertEqual(set(results), {threading.get_ident()})
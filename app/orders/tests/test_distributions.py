@@ -0,0 +1,103 @@
+"""Tests for the delivery delta and customer age distributions."""
+
+from django.test import TestCase
+from django.core.cache import caches
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import FullOrder, DeliveryPostcode
+
+from orders.distributions import distributions
+
+import datetime
+import pytz
+
+
+DISTRIBUTIONS_URL = reverse('orders:full_orders-get-distributions')
+
+time_now = pytz.utc.localize(datetime.datetime(2023, 1, 10, 12, 0))
+
+DAY = 24 * 60 * 60
+
+
+class DistributionTests(TestCase):
+    """Test percentiles and histograms computed in the database."""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['analytics'].clear()
+
+        leeds = DeliveryPostcode.objects.create(
+            postcode='LS1 1AA', postcode_area='LS')
+
+        for days, age in ((1, 20), (2, 30), (3, 40), (4, 50)):
+            FullOrder.objects.create(
+                order_number=f'BRU0000{days}',
+                toothbrush_type='Toothbrush 2000',
+                order_date=time_now,
+                customer_age=age,
+                order_quantity=1,
+                is_first=True,
+                dispatch_status='Dispatched',
+                dispatch_date=time_now,
+                delivery_status='Delivered',
+                delivery_date=time_now + datetime.timedelta(days=days),
+                delivery_postcode=leeds if days <= 2 else None
+            )
+
+    def test_percentiles(self):
+        """Test interpolated percentiles of both metrics."""
+
+        data = distributions(percentiles=[50, 90])
+
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(data['customer_age']['percentiles'],
+                         {'p50': 35.0, 'p90': 47.0})
+        self.assertEqual(
+            data['delivery_delta_seconds']['percentiles']['p50'],
+            2.5 * DAY)
+        self.assertEqual(data['delivery_delta_seconds']['max'], 4 * DAY)
+
+    def test_histogram(self):
+        """Test equal width bins, the last including the maximum."""
+
+        histogram = distributions(bins=3)['customer_age']['histogram']
+
+        self.assertEqual(
+            [(row['lower'], row['upper'], row['count'])
+             for row in histogram],
+            [(20, 30, 1), (30, 40, 1), (40, 50, 2)]
+        )
+
+    def test_endpoint_filters(self):
+        """Test the postcode area filter and query parameters."""
+
+        res = self.client.get(DISTRIBUTIONS_URL, {
+            'postcode_area': 'LS', 'percentiles': '50', 'bins': '2'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total'], 2)
+        self.assertEqual(res.data['customer_age']['percentiles'],
+                         {'p50': 25.0})
+        self.assertEqual(len(res.data['customer_age']['histogram']), 2)
+
+    def test_no_orders(self):
+        """Test an empty selection returns empty distributions."""
+
+        res = self.client.get(
+            DISTRIBUTIONS_URL, {'toothbrush_type': 'toothbrush_4000'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['total'], 0)
+        self.assertEqual(res.data['customer_age']['histogram'], [])
+        self.assertIsNone(res.data['customer_age']['percentiles']['p50'])
+
+    def test_invalid_parameters(self):
+        """Test out of range percentiles and bins are rejected."""
+
+        for params in ({'percentiles': '50,101'}, {'percentiles': 'x'},
+                       {'bins': '0'}):
+            res = self.client.get(DISTRIBUTIONS_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
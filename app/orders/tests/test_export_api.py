@@ -0,0 +1,99 @@
+"""Tests for the streaming order export."""
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import FullOrder, NullOrder, DeliveryPostcode
+
+import csv
+import datetime
+import io
+import json
+import pytz
+
+
+FULL_ORDER_EXPORT_URL = reverse('orders:full_orders-export')
+NULL_ORDER_EXPORT_URL = reverse('orders:null_orders-export')
+
+time_now = pytz.utc.localize(datetime.datetime(2023, 1, 10, 12, 0))
+
+
+def create_order(model, order_number, **params):
+    defaults = {
+        'order_number': order_number,
+        'toothbrush_type': 'Toothbrush 2000',
+        'order_date': time_now,
+        'customer_age': 30,
+        'order_quantity': 1,
+        'is_first': True,
+        'dispatch_status': 'Dispatched',
+        'dispatch_date': time_now,
+        'delivery_status': 'Delivered',
+        'delivery_date': time_now
+    }
+    defaults.update(params)
+
+    return model.objects.create(**defaults)
+
+
+def streamed_content(res):
+    return b''.join(res.streaming_content).decode('utf-8')
+
+
+class OrderExportTests(TestCase):
+    """Test streaming exports of orders."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.postcode = DeliveryPostcode.objects.create(
+            postcode='LS1 1AA', postcode_area='LS')
+
+    def test_export_full_orders_csv(self):
+        """Test exporting full orders as CSV with joined postcodes."""
+
+        for x in range(3):
+            create_order(FullOrder, f'BRU0000{x}',
+                         delivery_postcode=self.postcode)
+
+        res = self.client.get(FULL_ORDER_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+
+        rows = list(csv.DictReader(io.StringIO(streamed_content(res))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['order_number'], 'BRU00000')
+        self.assertEqual(rows[0]['order_date'], '2023-01-10T12:00:00Z')
+        self.assertEqual(rows[0]['delivery_postcode'], 'LS1 1AA')
+        self.assertEqual(rows[0]['delivery_postcode_area'], 'LS')
+        self.assertEqual(rows[0]['billing_postcode'], '')
+
+    def test_export_null_orders_ndjson(self):
+        """Test exporting null orders as NDJSON in the API shape."""
+
+        create_order(NullOrder, 'BRU00001', delivery_status=None,
+                     delivery_date=None, delivery_postcode=self.postcode)
+
+        res = self.client.get(
+            NULL_ORDER_EXPORT_URL, {'file_format': 'ndjson'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        lines = streamed_content(res).splitlines()
+        self.assertEqual(len(lines), 1)
+
+        order = json.loads(lines[0])
+        self.assertIsNone(order['delivery_status'])
+        self.assertEqual(order['delivery_postcode'],
+                         {'postcode': 'LS1 1AA', 'postcode_area': 'LS'})
+        self.assertIsNone(order['billing_postcode'])
+
+    def test_export_unknown_format_rejected(self):
+        """Test an unknown export format returns a 400."""
+
+        res = self.client.get(FULL_ORDER_EXPORT_URL, {'file_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
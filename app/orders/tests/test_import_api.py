@@ -0,0 +1,165 @@
+"""Tests for the COPY based order import."""
+
+from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    FullOrder,
+    TodaysOrder,
+    DeliveryPostcode,
+    BillingPostcode,
+    DeliveryStatusRollup
+)
+
+import json
+
+
+FULL_ORDER_IMPORT_URL = reverse('orders:full_orders-import-file')
+TODAYS_ORDER_IMPORT_URL = reverse('orders:todays_orders-import-file')
+
+CSV_HEADER = (
+    'order_number,toothbrush_type,order_date,customer_age,order_quantity,'
+    'is_first,dispatch_status,dispatch_date,delivery_status,delivery_date,'
+    'delivery_postcode,delivery_postcode_area,billing_postcode\n'
+)
+
+
+def csv_row(order_number, postcode='LS1 1AA', order_date='2023-01-10'):
+    return (
+        f'{order_number},Toothbrush 2000,{order_date}T10:00:00Z,30,1,'
+        'true,Dispatched,2023-01-10T12:00:00Z,Delivered,'
+        f'2023-01-12T10:00:00Z,{postcode},LS,{postcode}\n'
+    )
+
+
+def upload(name, content):
+    return SimpleUploadedFile(name, content.encode('utf-8'))
+
+
+class OrderImportTests(TestCase):
+    """Test importing order files through the API."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_import_full_orders_csv(self):
+        """Test a CSV import creates orders, postcodes and rollups."""
+
+        content = CSV_HEADER + ''.join(
+            csv_row(f'BRU0000{x}', postcode=f'LS{x % 2} 1AA')
+            for x in range(5)
+        )
+
+        res = self.client.post(
+            FULL_ORDER_IMPORT_URL,
+            {'file': upload('orders.csv', content)},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['rows'], 5)
+        self.assertEqual(res.data['orders_created'], 5)
+        self.assertEqual(FullOrder.objects.count(), 5)
+        self.assertEqual(DeliveryPostcode.objects.count(), 2)
+        self.assertEqual(BillingPostcode.objects.count(), 2)
+
+        order = FullOrder.objects.get(order_number='BRU00003')
+        self.assertEqual(order.delivery_postcode.postcode, 'LS1 1AA')
+        self.assertEqual(order.delivery_postcode.postcode_area, 'LS')
+        self.assertEqual(
+            DeliveryStatusRollup.objects.get(
+                delivery_status='Delivered').order_count,
+            5
+        )
+
+    def test_import_todays_orders_ndjson(self):
+        """Test an NDJSON import with nested postcodes and null fields."""
+
+        lines = [
+            {
+                'order_number': f'BRU0000{x}',
+                'toothbrush_type': 'Toothbrush 4000',
+                'order_date': '2023-01-10T10:00:00+00:00',
+                'customer_age': 40,
+                'order_quantity': 2,
+                'is_first': False,
+                'delivery_postcode': {
+                    'postcode': 'M1 1AA',
+                    'postcode_area': 'M'
+                }
+            }
+            for x in range(3)
+        ]
+        content = '\n'.join(json.dumps(line) for line in lines) + '\n'
+
+        res = self.client.post(
+            TODAYS_ORDER_IMPORT_URL,
+            {'file': upload('orders.ndjson', content)},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(TodaysOrder.objects.count(), 3)
+
+        order = TodaysOrder.objects.get(order_number='BRU00001')
+        self.assertIsNone(order.delivery_status)
+        self.assertIsNone(order.billing_postcode)
+        self.assertEqual(order.delivery_postcode.postcode_area, 'M')
+
+    def test_import_unknown_columns_rejected(self):
+        """Test a CSV with unknown columns is rejected."""
+
+        res = self.client.post(
+            FULL_ORDER_IMPORT_URL,
+            {'file': upload('orders.csv', 'order_number,colour\n1,red\n')},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_duplicate_order_rolled_back(self):
+        """Test a failing import leaves no rows behind."""
+
+        content = CSV_HEADER + csv_row('BRU00001') + csv_row('BRU00001')
+
+        res = self.client.post(
+            FULL_ORDER_IMPORT_URL,
+            {'file': upload('orders.csv', content)},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(FullOrder.objects.count(), 0)
+        self.assertEqual(DeliveryPostcode.objects.count(), 0)
+
+    def test_import_order_number_with_another_date_rejected(self):
+        """
+        Test importing a Full Order number in use with another order
+        date fails rather than adding a second order.
+        """
+
+        self.client.post(
+            FULL_ORDER_IMPORT_URL,
+            {'file': upload('orders.csv', CSV_HEADER + csv_row('BRU00001'))},
+            format='multipart'
+        )
+
+        content = (CSV_HEADER + csv_row('BRU00002')
+                   + csv_row('BRU00001', order_date='2023-02-10'))
+        res = self.client.post(
+            FULL_ORDER_IMPORT_URL,
+            {'file': upload('orders.csv', content)},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(FullOrder.objects.count(), 1)
+        self.assertEqual(
+            DeliveryStatusRollup.objects.get(
+                delivery_status='Delivered').order_count,
+            1
+        )
@@ -0,0 +1,220 @@
+"""Tests for asynchronous ingest jobs."""
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from orders import jobs
+from orders.tests.helpers import order_fields, order_payload, time_now
+
+from core.models import FullOrder, TodaysOrder, IngestJob
+
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+
+
+FULL_ORDER_URL = reverse('orders:full_orders-list') + '?async=true'
+TODAYS_ORDER_URL = reverse('orders:todays_orders-list') + '?async=true'
+
+
+def job_url(job_id):
+    return reverse('orders:jobs-detail', args=[job_id])
+
+
+class IterJsonListTests(SimpleTestCase):
+    """Test reading the spooled list of orders incrementally."""
+
+    def test_items_split_across_reads(self):
+        """Test items are read whole whatever the buffer size."""
+
+        items = [order_payload('BRU00001', text='Zürich €'), [], 12.5e3,
+                 None, 'x']
+        body = ('\n' + json.dumps(items, ensure_ascii=False, indent=2)
+                ).encode('utf-8')
+
+        for size in (1, 2, 7, len(body)):
+            self.assertEqual(
+                list(jobs.iter_json_list(io.BytesIO(body), size)), items)
+
+    def test_invalid_lists_rejected(self):
+        """Test anything but a single JSON list raises ValueError."""
+
+        for body in (b'{"a": 1}', b'[1, 2', b'[1 2]', b'[1,]', b'[1] 2'):
+            with self.assertRaises(ValueError):
+                list(jobs.iter_json_list(io.BytesIO(body), 2))
+
+
+class IngestJobTests(TestCase):
+    """Test queueing and running ingest jobs."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir)
+
+        settings = override_settings(INGEST_SPOOL_DIR=self.spool_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_async_create_spools_upload(self):
+        """Test the upload is spooled and a pending job returned."""
+
+        data = [order_payload('BRU00001'), order_payload('BRU00002')]
+
+        res = self.client.post(FULL_ORDER_URL, data, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['status'], IngestJob.PENDING)
+        self.assertEqual(res['Location'], job_url(res.data['id']))
+        self.assertFalse(FullOrder.objects.exists())
+
+        job = IngestJob.objects.get()
+        self.assertEqual(job.order_type, 'full')
+        with open(job.file_path) as spool:
+            self.assertEqual(json.load(spool), data)
+
+    def test_async_create_requires_json(self):
+        """Test uploads other than JSON are refused."""
+
+        res = self.client.post(
+            FULL_ORDER_URL, {'order_number': 'BRU00001'},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertFalse(IngestJob.objects.exists())
+
+    def test_run_job(self):
+        """Test a job writes its valid orders and reports the rest."""
+
+        self.client.post(
+            TODAYS_ORDER_URL,
+            [
+                order_payload('BRU00001'),
+                order_payload('BRU00002', customer_age='old'),
+                order_payload('BRU00003'),
+            ],
+            format='json'
+        )
+
+        job = jobs.claim_job()
+        self.assertEqual(job.status, IngestJob.RUNNING)
+        self.assertIsNone(jobs.claim_job())
+
+        jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.SUCCEEDED)
+        self.assertEqual(job.total_rows, 3)
+        self.assertEqual(job.processed_rows, 3)
+        self.assertEqual(job.counts, {'created': 2})
+        self.assertEqual(job.rejected_rows, 1)
+        self.assertEqual(job.rejected[0]['index'], 1)
+        self.assertIn('customer_age', job.rejected[0]['errors'])
+        self.assertEqual(TodaysOrder.objects.count(), 2)
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_run_job_in_chunks(self):
+        """Test rejected indexes count from the start of the upload."""
+
+        chunk_rows = jobs.CHUNK_ROWS
+        jobs.CHUNK_ROWS = 2
+        self.addCleanup(setattr, jobs, 'CHUNK_ROWS', chunk_rows)
+
+        self.client.post(
+            TODAYS_ORDER_URL + '&upsert=true',
+            [order_payload(f'BRU{x:05}') for x in range(4)]
+            + [order_payload('BRU00005', order_quantity='many')],
+            format='json'
+        )
+
+        job = jobs.run_job(jobs.claim_job())
+
+        self.assertEqual(
+            job.counts, {'inserted': 4, 'updated': 0, 'unchanged': 0})
+        self.assertEqual([row['index'] for row in job.rejected], [4])
+
+    def test_run_job_failure(self):
+        """Test an unreadable upload fails the job and is kept."""
+
+        path = os.path.join(self.spool_dir, 'broken.json')
+        with open(path, 'w') as spool:
+            spool.write('{"order_number": ')
+        IngestJob.objects.create(order_type='full', file_path=path)
+
+        job = jobs.run_job(jobs.claim_job())
+
+        self.assertEqual(job.status, IngestJob.FAILED)
+        self.assertTrue(job.error)
+        self.assertIsNotNone(job.finished_at)
+        self.assertTrue(os.path.exists(path))
+
+    def test_stale_job_resumed(self):
+        """
+        Test a running job without a recent heartbeat is claimed
+        again and resumes after its last committed chunk.
+        """
+
+        chunk_rows = jobs.CHUNK_ROWS
+        jobs.CHUNK_ROWS = 2
+        self.addCleanup(setattr, jobs, 'CHUNK_ROWS', chunk_rows)
+
+        self.client.post(
+            TODAYS_ORDER_URL,
+            [order_payload(f'BRU{x:05}') for x in range(4)],
+            format='json'
+        )
+        job = jobs.claim_job()
+
+        # A worker that died after committing the first chunk.
+        for x in range(2):
+            TodaysOrder.objects.create(**order_fields(f'BRU{x:05}'))
+        stale = time_now - datetime.timedelta(days=1)
+        IngestJob.objects.filter(pk=job.pk).update(
+            processed_rows=2, counts={'created': 2}, heartbeat_at=stale)
+
+        job = jobs.run_job(jobs.claim_job())
+
+        self.assertEqual(job.status, IngestJob.SUCCEEDED)
+        self.assertEqual(job.processed_rows, 4)
+        self.assertEqual(job.counts, {'created': 4})
+        self.assertEqual(TodaysOrder.objects.count(), 4)
+
+    def test_reclaimed_job_left_to_new_worker(self):
+        """Test a worker stops once its job has been claimed again."""
+
+        self.client.post(
+            TODAYS_ORDER_URL, [order_payload('BRU00001')], format='json')
+        job = jobs.claim_job()
+
+        with override_settings(INGEST_JOB_HEARTBEAT_TIMEOUT=-1):
+            reclaimed = jobs.claim_job()
+        self.assertEqual(reclaimed.pk, job.pk)
+
+        jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, IngestJob.RUNNING)
+        self.assertEqual(job.heartbeat_at, reclaimed.heartbeat_at)
+        self.assertFalse(TodaysOrder.objects.exists())
+
+    def test_job_status(self):
+        """Test the job endpoint reports progress and throughput."""
+
+        res = self.client.post(
+            TODAYS_ORDER_URL, [order_payload('BRU00001')], format='json')
+        jobs.run_job(jobs.claim_job())
+
+        res = self.client.get(job_url(res.data['id']))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], IngestJob.SUCCEEDED)
+        self.assertEqual(res.data['processed_rows'], 1)
+        self.assertIn('rows_per_second', res.data)
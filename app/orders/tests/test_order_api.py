@@ -1,6 +1,8 @@
 """Tests for the order API."""
 
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 
 from rest_framework import status
@@ -15,7 +17,8 @@ from time import perf_counter
 
 import json
 
-from core.models import FullOrder, NullOrder, TodaysOrder
+from core.models import (FullOrder, NullOrder, TodaysOrder,
+                         DeliveryPostcode, BillingPostcode)
 
 
 def detail_url(order_type, order_id, filtered=None):
@@ -115,6 +118,17 @@ class PublicOrderAPITests(TestCase):
             order_number=self.payload['order_number'])
         self.assertEqual(order.order_number, self.payload['order_number'])
 
+    def test_create_full_order_duplicate_order_number(self):
+        """Test an order number in use is rejected whatever its date."""
+
+        self.client.post(FULL_ORDER_URL, self.payload, format='json')
+        self.payload['order_date'] = time_now - datetime.timedelta(days=1)
+
+        res = self.client.post(FULL_ORDER_URL, self.payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('order_number', res.data)
+
     def test_create_full_order_with_invalid_data_raises_error(self):
         """
         Test 400 error thrown when attempting to create
@@ -169,6 +183,55 @@ class PublicOrderAPITests(TestCase):
         t2 = perf_counter()
         print(f'Optimized task took {t2 - t1} seconds to complete.')
 
+    def test_bulk_full_order_creation_query_count_is_fixed(self):
+        """
+        Test bulk creating full orders issues the same number
+        of queries regardless of the number of orders.
+        """
+
+        def bulk_payload(start, size):
+            return [
+                {
+                    "order_number": f"BRU{x:05}",
+                    "toothbrush_type": "Test Toothbrush",
+                    "order_date": json_time,
+                    "customer_age": 20,
+                    "order_quantity": 1,
+                    "delivery_postcode": {
+                        "postcode": f"LS{x} 1AA",
+                        "postcode_area": "LS"
+                    },
+                    "billing_postcode": {
+                        "postcode": f"LS{x} 1AA"
+                    },
+                    "is_first": True,
+                    "dispatch_status": "Test Dispatch Status",
+                    "dispatch_date": json_time,
+                    "delivery_status": "Test Delivery Status",
+                    "delivery_date": json_time
+                }
+                for x in range(start, start + size)
+            ]
+
+        with CaptureQueriesContext(connection) as small_batch:
+            res = self.client.post(
+                FULL_ORDER_URL, bulk_payload(0, 5), format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        with CaptureQueriesContext(connection) as large_batch:
+            res = self.client.post(
+                FULL_ORDER_URL, bulk_payload(5, 50), format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(len(small_batch), len(large_batch))
+        self.assertEqual(FullOrder.objects.count(), 55)
+        self.assertEqual(DeliveryPostcode.objects.count(), 55)
+        self.assertEqual(BillingPostcode.objects.count(), 55)
+
+        order = FullOrder.objects.get(order_number='BRU00042')
+        self.assertEqual(order.delivery_postcode.postcode, 'LS42 1AA')
+        self.assertEqual(order.billing_postcode.postcode, 'LS42 1AA')
+
     def test_todays_order_creation(self):
         """Test posting to create_todays_order endpoint is successful"""
         res = self.client.post(
@@ -305,11 +368,11 @@ class PublicOrderAPITests(TestCase):
 
         res = self.client.get(FULL_ORDER_URL)
 
-        all_full_orders = FullOrder.objects.all()
+        all_full_orders = FullOrder.objects.order_by('order_date', 'id')
         serializer = FullOrderSerializer(all_full_orders, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_null_orders(self):
         """Test retrieving a list of null orders."""
@@ -320,11 +383,11 @@ class PublicOrderAPITests(TestCase):
 
         res = self.client.get(NULL_ORDER_URL)
 
-        all_null_orders = NullOrder.objects.all()
+        all_null_orders = NullOrder.objects.order_by('order_date', 'id')
         serializer = NullOrderSerializer(all_null_orders, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_todays_orders(self):
         """Test retrieving a list of todays orders."""
@@ -335,11 +398,11 @@ class PublicOrderAPITests(TestCase):
 
         res = self.client.get(TODAYS_ORDER_URL)
 
-        all_todays_orders = TodaysOrder.objects.all()
+        all_todays_orders = TodaysOrder.objects.order_by('order_date', 'id')
         serializer = TodaysOrderSerializer(all_todays_orders, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
     
     def test_get_null_orders(self):
         """Test getting only null orders from DB"""
@@ -380,10 +443,62 @@ class PublicOrderAPITests(TestCase):
         res = self.client.get(url, data={'filter_by_null': True}, format='json')
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        queryset = TodaysOrder.objects.filter(delivery_status=None)
+        queryset = TodaysOrder.objects.filter(
+            delivery_status=None).order_by('order_date', 'id')
 
         serializer = TodaysOrderSerializer(queryset, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_list_orders_keyset_pagination(self):
+        """Test paging through orders with a client page size."""
+
+        for x in range(7):
+            create_order('Full Order', order_number=f'BRU0000{x}',
+                         order_date=time_now + datetime.timedelta(
+                             minutes=x % 3))
+
+        expected = list(
+            FullOrder.objects.order_by('order_date', 'id')
+            .values_list('order_number', flat=True)
+        )
+
+        seen = []
+        res = self.client.get(FULL_ORDER_URL, {'page_size': 3})
+        pages = [res]
+
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            pages.append(res)
+
+        for page in pages:
+            self.assertEqual(page.status_code, status.HTTP_200_OK)
+            seen.extend(order['order_number']
+                        for order in page.data['results'])
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0].data['previous'])
+
+        res = self.client.get(pages[-1].data['previous'])
+        self.assertEqual(res.data['results'], pages[1].data['results'])
+
+    def test_list_orders_page_size_capped(self):
+        """Test the client page size cannot exceed the maximum."""
+
+        for x in range(3):
+            create_order('Full Order', order_number=f'BRU0000{x}')
+
+        res = self.client.get(FULL_ORDER_URL, {'page_size': 10 ** 9})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_list_orders_invalid_cursor(self):
+        """Test an invalid cursor returns a 404."""
+
+        res = self.client.get(FULL_ORDER_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_bulk_order_update(self):
         """Test bulk update of orders."""
@@ -429,7 +544,7 @@ class PublicOrderAPITests(TestCase):
             'filter_by_null': True
         })
 
-        todaysorders_data = todaysorders_queryset.data
+        todaysorders_data = todaysorders_queryset.data['results']
 
         for d in todaysorders_data:
             for k, v in d.items():
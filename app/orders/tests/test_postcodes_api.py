@@ -1,6 +1,6 @@
 """Test for Postcode API Operations."""
 
-from django.test import TestCase
+from django.test import TestCase, SimpleTestCase
 from django.urls import reverse
 
 from rest_framework import status
@@ -11,7 +11,8 @@ from core.models import (
     TodaysOrder,
     NullOrder,
     DeliveryPostcode,
-    BillingPostcode
+    BillingPostcode,
+    PostcodeAreaRollup
 )
 
 from orders.serializers import (
@@ -22,9 +23,18 @@ from orders.serializers import (
     BillingPostcodeSerializer
 )
 
+from orders.postcodes import (
+    PostcodeCache,
+    get_postcode_cache,
+    resolve_postcodes
+)
+from orders.cache import get_data_versions, POSTCODES
+from orders.rollups import record_full_orders
+
 import datetime
 import pytz
 
+FULL_ORDER_URL = reverse('orders:full_orders-list')
 DELIVERY_POSTCODE_URL = reverse('orders:delivery_postcodes-list')
 BILLING_POSTCODE_URL = reverse('orders:billing_postcodes-list')
 
@@ -132,3 +142,161 @@ class PublicPostcodeAPITests(TestCase):
 
         self.assertEqual(delivery_res.data, delivery_serializer.data)
         self.assertEqual(billing_res.data, billing_serializer.data)
+
+    def test_postcode_POST_existing_postcode(self):
+        """Test posting a known postcode returns the stored postcode."""
+
+        existing = DeliveryPostcode.objects.create(
+            postcode='LS1 1AA', postcode_area='LS')
+
+        res = self.client.post(
+            DELIVERY_POSTCODE_URL, {'postcode': 'LS1 1AA'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['id'], existing.id)
+        self.assertEqual(DeliveryPostcode.objects.count(), 1)
+
+    def test_orders_share_postcodes(self):
+        """Test orders to the same postcode share one postcode row."""
+
+        existing = DeliveryPostcode.objects.create(
+            postcode='M1 1AA', postcode_area='M')
+
+        payload = [
+            {
+                'order_number': f'BRU0000{x}',
+                'toothbrush_type': 'Test Toothbrush',
+                'order_date': json_time,
+                'customer_age': 20,
+                'order_quantity': 5,
+                'delivery_postcode': {
+                    'postcode': 'LS1 1AA' if x % 2 else 'M1 1AA',
+                    'postcode_area': 'LS' if x % 2 else 'M'
+                },
+                'billing_postcode': {'postcode': 'LS1 1AA'},
+                'is_first': True,
+                'dispatch_status': 'Test Dispatch Status',
+                'dispatch_date': json_time,
+                'delivery_status': 'Test Delivery Status',
+                'delivery_date': json_time
+            }
+            for x in range(6)
+        ]
+
+        res = self.client.post(FULL_ORDER_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(DeliveryPostcode.objects.count(), 2)
+        self.assertEqual(BillingPostcode.objects.count(), 1)
+        self.assertEqual(
+            FullOrder.objects.filter(delivery_postcode=existing).count(), 3)
+
+    def test_resolve_postcodes_inserts_missing_postcodes(self):
+        """Test unresolved postcodes are inserted once."""
+
+        postcodes = [
+            DeliveryPostcode(postcode='LS1 1AA', postcode_area='LS'),
+            DeliveryPostcode(postcode='LS1 1AA', postcode_area='LS'),
+            DeliveryPostcode(postcode='M1 1AA', postcode_area='M')
+        ]
+
+        resolve_postcodes(postcodes)
+
+        self.assertEqual(DeliveryPostcode.objects.count(), 2)
+        self.assertEqual(postcodes[0].pk, postcodes[1].pk)
+        self.assertEqual(
+            postcodes[2].pk,
+            DeliveryPostcode.objects.get(postcode='M1 1AA').pk
+        )
+
+    def test_delete_postcode_in_use_rejected(self):
+        """Test a postcode orders still use cannot be deleted."""
+
+        postcode = DeliveryPostcode.objects.create(
+            postcode='LS1 1AA', postcode_area='LS')
+        create_order('Full Order', delivery_postcode=postcode)
+
+        res = self.client.delete(
+            reverse('orders:delivery_postcodes-detail', args=[postcode.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(FullOrder.objects.count(), 1)
+
+    def test_edit_postcode_invalidates_cached_ids(self):
+        """Test editing a postcode empties every worker's id cache."""
+
+        postcode = DeliveryPostcode.objects.create(
+            postcode='LS1 1AA', postcode_area='LS')
+        cache = get_postcode_cache(DeliveryPostcode)
+        cache.sync(get_data_versions([POSTCODES])[0])
+        cache.set_many({'LS1 1AA': postcode.id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(
+                reverse('orders:delivery_postcodes-detail',
+                        args=[postcode.id]),
+                {'postcode': 'LS2 1AA'},
+                format='json'
+            )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        new = DeliveryPostcode(postcode='LS1 1AA', postcode_area='LS')
+        resolve_postcodes([new])
+
+        self.assertNotEqual(new.pk, postcode.id)
+        self.assertEqual(DeliveryPostcode.objects.count(), 2)
+
+    def test_edit_postcode_area_moves_rollups(self):
+        """Test editing a postcode area moves its orders' rollups."""
+
+        postcode = DeliveryPostcode.objects.create(
+            postcode='LS1 1AA', postcode_area='LS')
+        order = create_order('Full Order', delivery_postcode=postcode)
+        record_full_orders([order])
+
+        res = self.client.patch(
+            reverse('orders:delivery_postcodes-detail', args=[postcode.id]),
+            {'postcode_area': 'LD'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            dict(PostcodeAreaRollup.objects.values_list(
+                'postcode_area', 'order_count')),
+            {'LD': 1}
+        )
+
+
+class PostcodeCacheTests(SimpleTestCase):
+    """Unit tests for the postcode id LRU cache."""
+
+    def test_least_recently_used_postcode_evicted(self):
+        """Test the cache never grows beyond its size."""
+
+        cache = PostcodeCache(maxsize=2)
+        cache.set_many({'LS1 1AA': 1, 'M1 1AA': 2})
+
+        cache.get_many(['LS1 1AA'])
+        cache.set_many({'B1 1AA': 3})
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(
+            cache.get_many(['LS1 1AA', 'M1 1AA', 'B1 1AA']),
+            {'LS1 1AA': 1, 'B1 1AA': 3}
+        )
+
+    def test_new_version_empties_cache(self):
+        """
+        Test the cache is emptied under a new postcode version, and
+        ids read under an older one are never cached.
+        """
+
+        cache = PostcodeCache(maxsize=10)
+        cache.sync(1)
+        cache.set_many({'LS1 1AA': 1}, 1)
+
+        cache.sync(2)
+        cache.set_many({'M1 1AA': 2}, 1)
+
+        self.assertEqual(cache.get_many(['LS1 1AA', 'M1 1AA']), {})
@@ -0,0 +1,97 @@
+"""Tests for the compiled aggregate serializer projections."""
+
+from django.test import SimpleTestCase
+
+from rest_framework import serializers
+
+from orders.projections import ProjectedSerializer
+from orders.serializers import (
+    FullPostcodeDataSerializer,
+    OrderQuantitySerializer,
+    DeliveryDeltaSerializer
+)
+
+import datetime
+
+
+def drf_data(serializer_class, instance, many=False):
+    """Return the output of the plain DRF Serializer implementation."""
+
+    serializer = serializer_class()
+    if not many:
+        return serializers.Serializer.to_representation(serializer, instance)
+    return [
+        serializers.Serializer.to_representation(serializer, row)
+        for row in instance
+    ]
+
+
+class ProjectionTests(SimpleTestCase):
+    """Test projections give the same output as DRF."""
+
+    def test_rows_match_drf(self):
+        """Test averages, deltas and nulls are converted like DRF."""
+
+        rows = [
+            {
+                'delivery_postcode__postcode_area': 'LS',
+                'avg_customer_age': 31.7,
+                'avg_delivery_delta': datetime.timedelta(days=2, hours=3),
+                'total_tb_sales': 4,
+                'tb_2000_sales': 3,
+                'tb_4000_sales': 1,
+                'unused': 'ignored'
+            },
+            {
+                'delivery_postcode__postcode_area': None,
+                'avg_customer_age': None,
+                'avg_delivery_delta': None,
+                'total_tb_sales': 0,
+                'tb_2000_sales': 0,
+                'tb_4000_sales': 0
+            }
+        ]
+
+        data = FullPostcodeDataSerializer(rows, many=True).data
+
+        self.assertEqual(
+            data, drf_data(FullPostcodeDataSerializer, rows, many=True))
+        self.assertEqual(data[0]['avg_customer_age'], 31)
+        self.assertEqual(data[0]['avg_delivery_delta'], '2 days, 3:00:00')
+        self.assertEqual(
+            list(data[0]), list(FullPostcodeDataSerializer().fields))
+
+    def test_optional_fields_skipped(self):
+        """Test missing optional keys are left out, as in DRF."""
+
+        rows = [
+            {'customer_age': 30, 'order_quantity': 2},
+            {'delivery_postcode__postcode_area': 'M', 'order_quantity': 1}
+        ]
+
+        data = OrderQuantitySerializer(rows, many=True).data
+
+        self.assertEqual(
+            data, drf_data(OrderQuantitySerializer, rows, many=True))
+        self.assertEqual(data[0], {'customer_age': 30, 'order_quantity': 2})
+
+    def test_missing_required_field_raises(self):
+        """Test a missing required key raises like DRF does."""
+
+        with self.assertRaises(KeyError):
+            DeliveryDeltaSerializer({'avg_delivery_delta': 1}).data
+
+    def test_objects_and_fallback_fields(self):
+        """Test attribute access and non fast-path fields."""
+
+        class Row:
+            name = 'LS'
+            created = datetime.date(2023, 1, 10)
+
+        class RowSerializer(ProjectedSerializer):
+            name = serializers.CharField()
+            created = serializers.DateField()
+            label = serializers.CharField(source='name')
+
+        self.assertEqual(
+            RowSerializer(Row()).data, drf_data(RowSerializer, Row()))
@@ -0,0 +1,144 @@
+"""Tests for the Todays Order rollover."""
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    FullOrder,
+    NullOrder,
+    TodaysOrder,
+    DeliveryPostcode,
+    DeliveryStatusRollup
+)
+
+import datetime
+import pytz
+
+
+ROLLOVER_URL = reverse('orders:todays_orders-rollover')
+
+time_now = pytz.utc.localize(datetime.datetime(2023, 1, 10, 12))
+
+
+def create_todays_order(order_number, **params):
+    defaults = {
+        'order_number': order_number,
+        'toothbrush_type': 'Toothbrush 2000',
+        'order_date': time_now,
+        'customer_age': 30,
+        'order_quantity': 1,
+        'is_first': True,
+        'dispatch_status': 'Dispatched',
+        'dispatch_date': time_now,
+        'delivery_status': 'Delivered',
+        'delivery_date': time_now,
+    }
+    defaults.update(params)
+    return TodaysOrder.objects.create(**defaults)
+
+
+class RolloverTests(TestCase):
+    """Test rolling Todays Orders over into Full and Null Orders."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.postcode = DeliveryPostcode.objects.create(
+            postcode='LS1 1AA', postcode_area='LS')
+
+    def test_rollover_splits_complete_and_incomplete_orders(self):
+        """Test complete orders become Full Orders, the rest Null."""
+
+        create_todays_order('BRU00001', delivery_postcode=self.postcode)
+        create_todays_order('BRU00002', delivery_postcode=self.postcode)
+        create_todays_order('BRU00003', delivery_date=None)
+        create_todays_order('BRU00004', dispatch_status='')
+
+        res = self.client.post(ROLLOVER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'todays_orders': 4,
+            'full_orders_created': 2,
+            'null_orders_created': 2,
+            'duplicates_skipped': 0,
+        })
+        self.assertFalse(TodaysOrder.objects.exists())
+        self.assertEqual(
+            set(FullOrder.objects.values_list('order_number', flat=True)),
+            {'BRU00001', 'BRU00002'}
+        )
+        self.assertEqual(
+            set(NullOrder.objects.values_list('order_number', flat=True)),
+            {'BRU00003', 'BRU00004'}
+        )
+
+        order = FullOrder.objects.get(order_number='BRU00001')
+        self.assertEqual(order.delivery_postcode, self.postcode)
+        self.assertEqual(order.delivery_date, time_now)
+
+    def test_rollover_updates_rollups(self):
+        """Test rolled over Full Orders are added to the rollups."""
+
+        create_todays_order('BRU00001', delivery_postcode=self.postcode)
+        create_todays_order('BRU00002', delivery_postcode=self.postcode)
+
+        self.client.post(ROLLOVER_URL)
+
+        self.assertEqual(
+            DeliveryStatusRollup.objects.get(
+                delivery_status='Delivered').order_count,
+            2
+        )
+
+    def test_rollover_skips_orders_already_rolled_over(self):
+        """Test an order number already in Full Orders is skipped."""
+
+        FullOrder.objects.create(
+            order_number='BRU00001', toothbrush_type='Toothbrush 2000',
+            order_date=time_now, customer_age=30, order_quantity=1,
+            is_first=True, dispatch_status='Dispatched',
+            dispatch_date=time_now, delivery_status='Delivered',
+            delivery_date=time_now
+        )
+        create_todays_order('BRU00001')
+        create_todays_order('BRU00002')
+
+        res = self.client.post(ROLLOVER_URL)
+
+        self.assertEqual(res.data['full_orders_created'], 1)
+        self.assertEqual(res.data['duplicates_skipped'], 1)
+        self.assertEqual(FullOrder.objects.count(), 2)
+        self.assertFalse(TodaysOrder.objects.exists())
+
+    def test_rollover_skips_order_numbers_with_another_date(self):
+        """
+        Test an order number in Full Orders with another order date
+        is skipped rather than added as a second Full Order.
+        """
+
+        FullOrder.objects.create(
+            order_number='BRU00001', toothbrush_type='Toothbrush 2000',
+            order_date=time_now - datetime.timedelta(days=40),
+            customer_age=30, order_quantity=1, is_first=True,
+            dispatch_status='Dispatched', dispatch_date=time_now,
+            delivery_status='Delivered', delivery_date=time_now
+        )
+        create_todays_order('BRU00001')
+
+        res = self.client.post(ROLLOVER_URL)
+
+        self.assertEqual(res.data['full_orders_created'], 0)
+        self.assertEqual(res.data['duplicates_skipped'], 1)
+        self.assertEqual(FullOrder.objects.count(), 1)
+        self.assertFalse(DeliveryStatusRollup.objects.exists())
+
+    def test_rollover_empty(self):
+        """Test rolling over no orders changes nothing."""
+
+        res = self.client.post(ROLLOVER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['todays_orders'], 0)
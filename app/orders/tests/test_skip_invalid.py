@@ -0,0 +1,142 @@
+"""Tests for bulk creates that skip invalid orders."""
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from orders.serializers import BulkCreateOrderSerializer
+from orders.tests.helpers import order_payload
+
+from core.models import FullOrder, TodaysOrder, DeliveryStatusRollup
+
+
+FULL_ORDER_URL = reverse('orders:full_orders-list') + '?skip_invalid=true'
+TODAYS_ORDER_URL = (
+    reverse('orders:todays_orders-list') + '?skip_invalid=true')
+
+
+class SkipInvalidTests(TestCase):
+    """Test bulk creating orders with 'skip_invalid=true'."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_invalid_orders_rejected_by_index(self):
+        """Test valid orders are created and invalid ones listed."""
+
+        res = self.client.post(
+            FULL_ORDER_URL,
+            [
+                order_payload('BRU00001'),
+                order_payload('BRU00002', customer_age='old'),
+                order_payload('BRU00003'),
+                order_payload('BRU00004', order_date='yesterday'),
+            ],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(
+            [row['index'] for row in res.data['rejected']], [1, 3])
+        self.assertIn('customer_age', res.data['rejected'][0]['errors'])
+        self.assertIn('order_date', res.data['rejected'][1]['errors'])
+        self.assertEqual(
+            set(FullOrder.objects.values_list('order_number', flat=True)),
+            {'BRU00001', 'BRU00003'}
+        )
+        self.assertEqual(
+            DeliveryStatusRollup.objects.get(
+                delivery_status='Delivered').order_count,
+            2
+        )
+
+    def test_orders_refused_by_database_rejected(self):
+        """
+        Test a chunk the database refuses is retried order by order,
+        keeping the orders of the chunk that can be written.
+        """
+
+        res = self.client.post(
+            TODAYS_ORDER_URL,
+            [
+                order_payload('BRU00001'),
+                order_payload('BRU00002'),
+                order_payload('BRU00001'),
+            ],
+            format='json'
+        )
+
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(
+            [row['index'] for row in res.data['rejected']], [2])
+        self.assertEqual(TodaysOrder.objects.count(), 2)
+
+    def test_existing_order_number_rejected(self):
+        """Test an order number in use is rejected by validation."""
+
+        self.client.post(
+            TODAYS_ORDER_URL, [order_payload('BRU00001')], format='json')
+
+        res = self.client.post(
+            TODAYS_ORDER_URL,
+            [order_payload('BRU00001'), order_payload('BRU00002')],
+            format='json'
+        )
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertIn('order_number', res.data['rejected'][0]['errors'])
+
+    def test_chunks_written_separately(self):
+        """Test a failing chunk does not undo the chunks before it."""
+
+        batch_size = BulkCreateOrderSerializer.batch_size
+        BulkCreateOrderSerializer.batch_size = 2
+        self.addCleanup(
+            setattr, BulkCreateOrderSerializer, 'batch_size', batch_size)
+
+        res = self.client.post(
+            TODAYS_ORDER_URL,
+            [order_payload(f'BRU{x:05}') for x in range(4)]
+            + [order_payload('BRU00000')],
+            format='json'
+        )
+
+        self.assertEqual(res.data['created'], 4)
+        self.assertEqual(
+            [row['index'] for row in res.data['rejected']], [4])
+
+    def test_all_orders_invalid(self):
+        """Test nothing is created when every order is invalid."""
+
+        res = self.client.post(
+            TODAYS_ORDER_URL,
+            [order_payload('BRU00001', order_quantity='many')],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['created'], 0)
+        self.assertFalse(TodaysOrder.objects.exists())
+
+    def test_with_upsert(self):
+        """Test upserts report counts alongside the rejected orders."""
+
+        url = TODAYS_ORDER_URL + '&upsert=true'
+        self.client.post(url, [order_payload('BRU00001')], format='json')
+
+        res = self.client.post(
+            url,
+            [
+                order_payload('BRU00001', delivery_status='Returned'),
+                order_payload('BRU00002', customer_age='old'),
+            ],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual(
+            [row['index'] for row in res.data['rejected']], [1])
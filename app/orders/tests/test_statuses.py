@@ -0,0 +1,116 @@
+"""Tests for batched Todays Order status updates."""
+
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import TodaysOrder
+
+from orders.statuses import update_statuses
+
+import datetime
+import pytz
+
+
+UPDATE_STATUSES_URL = reverse('orders:todays_orders-update-statuses')
+
+time_now = pytz.utc.localize(datetime.datetime(2023, 1, 10, 12, 0))
+
+
+def status_update(order_number, **params):
+    update = {
+        'order_number': order_number,
+        'dispatch_status': 'Dispatched',
+        'dispatch_date': time_now,
+        'delivery_status': 'Delivered',
+        'delivery_date': time_now + datetime.timedelta(days=1),
+    }
+    update.update(params)
+    return update
+
+
+class StatusUpdateTests(TestCase):
+    """Test applying many status changes at once."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+        for x in range(5):
+            TodaysOrder.objects.create(
+                order_number=f'BRU0000{x}',
+                toothbrush_type='Toothbrush 2000',
+                order_date=time_now,
+                customer_age=30,
+                order_quantity=1,
+                is_first=True
+            )
+
+    def test_batch_update_reports_matches(self):
+        """Test matched orders are updated and unknown ones reported."""
+
+        res = self.client.patch(UPDATE_STATUSES_URL, [
+            status_update('BRU00001'),
+            status_update('BRU00003', delivery_status=None,
+                          delivery_date=None),
+            status_update('UNKNOWN'),
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            'matched': ['BRU00001', 'BRU00003'],
+            'unmatched': ['UNKNOWN'],
+        })
+
+        order = TodaysOrder.objects.get(order_number='BRU00001')
+        self.assertEqual(order.delivery_status, 'Delivered')
+        self.assertEqual(order.dispatch_date, time_now)
+
+        order = TodaysOrder.objects.get(order_number='BRU00003')
+        self.assertEqual(order.dispatch_status, 'Dispatched')
+        self.assertIsNone(order.delivery_date)
+
+        untouched = TodaysOrder.objects.get(order_number='BRU00002')
+        self.assertIsNone(untouched.dispatch_status)
+
+    def test_one_statement_per_chunk(self):
+        """Test updates are chunked rather than one per order."""
+
+        updates = [status_update(f'BRU0000{x}') for x in range(5)]
+
+        with CaptureQueriesContext(connection) as queries:
+            result = update_statuses(updates, chunk_size=2)
+
+        updates_run = [
+            q for q in queries if q['sql'].lstrip().startswith('UPDATE')]
+        self.assertEqual(len(updates_run), 3)
+        self.assertEqual(len(result['matched']), 5)
+
+    def test_later_update_of_an_order_wins(self):
+        """Test repeated order numbers keep the last update."""
+
+        update_statuses([
+            status_update('BRU00001', delivery_status='In Transit'),
+            status_update('BRU00001', delivery_status='Delivered'),
+        ])
+
+        self.assertEqual(
+            TodaysOrder.objects.get(order_number='BRU00001').delivery_status,
+            'Delivered'
+        )
+
+    def test_invalid_batch(self):
+        """Test empty batches and invalid items are rejected."""
+
+        res = self.client.patch(UPDATE_STATUSES_URL, [], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.patch(UPDATE_STATUSES_URL, [
+            status_update('BRU00001', dispatch_date='not a date')
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIsNone(
+            TodaysOrder.objects.get(order_number='BRU00001').dispatch_status)
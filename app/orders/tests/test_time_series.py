@@ -0,0 +1,117 @@
+"""Tests for the sales over time endpoint."""
+
+from django.test import TestCase
+from django.core.cache import caches
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import FullOrder
+
+from orders.timeseries import sales_over_time
+
+import datetime
+import pytz
+
+
+SALES_OVER_TIME_URL = reverse('orders:full_orders-get-sales-over-time')
+
+
+def create_full_order(order_number, order_date, **params):
+    defaults = {
+        'order_number': order_number,
+        'toothbrush_type': 'Toothbrush 2000',
+        'order_date': order_date,
+        'customer_age': 30,
+        'order_quantity': 1,
+        'is_first': True,
+        'dispatch_status': 'Dispatched',
+        'dispatch_date': order_date,
+        'delivery_status': 'Delivered',
+        'delivery_date': order_date + datetime.timedelta(days=2),
+    }
+    defaults.update(params)
+    return FullOrder.objects.create(**defaults)
+
+
+def day(month, day, hour=12):
+    return pytz.utc.localize(datetime.datetime(2023, month, day, hour))
+
+
+class SalesOverTimeTests(TestCase):
+    """Test Full Order sales bucketed by date."""
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['analytics'].clear()
+
+        # Monday 2 and Wednesday 4 January are in the same week.
+        create_full_order('BRU00001', day(1, 2), order_quantity=2)
+        create_full_order('BRU00002', day(1, 2, 23), order_quantity=3,
+                          toothbrush_type='Toothbrush 4000')
+        create_full_order('BRU00003', day(1, 4),
+                          delivery_date=day(1, 8))
+        create_full_order('BRU00004', day(2, 14))
+
+    def test_daily_buckets(self):
+        """Test orders are counted per day, oldest first."""
+
+        res = self.client.get(SALES_OVER_TIME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['period'], row['order_count'], row['units'])
+             for row in res.data],
+            [('2023-01-02', 2, 5), ('2023-01-04', 1, 1),
+             ('2023-02-14', 1, 1)]
+        )
+        self.assertNotIn('toothbrush_type', res.data[0])
+
+    def test_weekly_and_monthly_buckets(self):
+        """Test weeks start on Monday and months on the first."""
+
+        weeks = sales_over_time('week')
+        self.assertEqual(weeks[0]['period'], datetime.date(2023, 1, 2))
+        self.assertEqual(weeks[0]['order_count'], 3)
+        # Deltas of 2, 2 and 4 days.
+        self.assertEqual(
+            weeks[0]['avg_delivery_delta'],
+            datetime.timedelta(days=2, hours=16))
+
+        res = self.client.get(SALES_OVER_TIME_URL, {'interval': 'month'})
+        self.assertEqual(
+            [(row['period'], row['order_count']) for row in res.data],
+            [('2023-01-01', 3), ('2023-02-01', 1)]
+        )
+
+    def test_by_toothbrush_type(self):
+        """Test each bucket can be split by toothbrush type."""
+
+        res = self.client.get(SALES_OVER_TIME_URL, {
+            'interval': 'month', 'by_toothbrush_type': '1',
+            'end_date': '2023-01-31'})
+
+        self.assertEqual(
+            [(row['toothbrush_type'], row['units']) for row in res.data],
+            [('Toothbrush 2000', 3), ('Toothbrush 4000', 3)]
+        )
+
+    def test_filtered_by_toothbrush_type_and_dates(self):
+        """Test the type filter and inclusive date bounds."""
+
+        res = self.client.get(SALES_OVER_TIME_URL, {
+            'toothbrush_type': 'toothbrush_2000',
+            'start_date': '2023-01-03', 'end_date': '2023-02-14'})
+
+        self.assertEqual(
+            [row['period'] for row in res.data],
+            ['2023-01-04', '2023-02-14']
+        )
+
+    def test_invalid_interval(self):
+        """Test an unknown interval is rejected."""
+
+        res = self.client.get(SALES_OVER_TIME_URL, {'interval': 'year'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
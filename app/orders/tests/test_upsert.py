@@ -0,0 +1,163 @@
+"""Tests for upserting orders in bulk."""
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    FullOrder,
+    NullOrder,
+    TodaysOrder,
+    DeliveryStatusRollup
+)
+
+from orders.aggregations import aggregate_full_data
+from orders.rollups import full_data_from_rollups
+from orders.tests.helpers import order_payload, time_now
+
+import datetime
+
+
+FULL_ORDER_URL = reverse('orders:full_orders-list') + '?upsert=true'
+TODAYS_ORDER_URL = reverse('orders:todays_orders-list') + '?upsert=true'
+NULL_ORDER_URL = reverse('orders:null_orders-list') + '?upsert=true'
+
+
+class UpsertTests(TestCase):
+    """Test bulk creating orders with 'upsert=true'."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_replayed_batch_changes_nothing(self):
+        """Test sending the same batch twice leaves it unchanged."""
+
+        data = [order_payload(f'BRU{x:05}') for x in range(3)]
+
+        res = self.client.post(FULL_ORDER_URL, data, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, {'inserted': 3, 'updated': 0, 'unchanged': 0})
+
+        res = self.client.post(FULL_ORDER_URL, data, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data, {'inserted': 0, 'updated': 0, 'unchanged': 3})
+        self.assertEqual(FullOrder.objects.count(), 3)
+
+    def test_upsert_updates_and_inserts(self):
+        """Test changed orders are updated and new ones inserted."""
+
+        self.client.post(
+            TODAYS_ORDER_URL,
+            [order_payload('BRU00001'), order_payload('BRU00002')],
+            format='json'
+        )
+
+        res = self.client.post(
+            TODAYS_ORDER_URL,
+            [
+                order_payload('BRU00001', delivery_status='Returned'),
+                order_payload('BRU00002'),
+                order_payload('BRU00003'),
+            ],
+            format='json'
+        )
+
+        self.assertEqual(
+            res.data, {'inserted': 1, 'updated': 1, 'unchanged': 1})
+        self.assertEqual(
+            TodaysOrder.objects.get(order_number='BRU00001').delivery_status,
+            'Returned'
+        )
+        self.assertEqual(TodaysOrder.objects.count(), 3)
+
+    def test_later_duplicate_in_batch_wins(self):
+        """Test the last of two orders with one number is kept."""
+
+        res = self.client.post(
+            NULL_ORDER_URL,
+            [
+                order_payload('BRU00001', customer_age=20),
+                order_payload('BRU00001', customer_age=40),
+            ],
+            format='json'
+        )
+
+        self.assertEqual(
+            res.data, {'inserted': 1, 'updated': 0, 'unchanged': 0})
+        self.assertEqual(NullOrder.objects.get().customer_age, 40)
+
+    def test_upsert_keeps_rollups_in_step(self):
+        """Test an updated Full Order moves between rollup groups."""
+
+        self.client.post(
+            FULL_ORDER_URL,
+            [order_payload('BRU00001'), order_payload('BRU00002')],
+            format='json'
+        )
+        res = self.client.post(
+            FULL_ORDER_URL,
+            [
+                order_payload('BRU00001', delivery_status='Returned'),
+                order_payload('BRU00003')
+            ],
+            format='json'
+        )
+        self.assertEqual(
+            res.data, {'inserted': 1, 'updated': 1, 'unchanged': 0})
+
+        counts = dict(DeliveryStatusRollup.objects.values_list(
+            'delivery_status', 'order_count'))
+        self.assertEqual(counts.get('Delivered'), 2)
+        self.assertEqual(counts.get('Returned'), 1)
+        self.assertEqual(full_data_from_rollups(), aggregate_full_data())
+
+    def test_full_order_with_another_date_rejected(self):
+        """
+        Test a Full Order number stored with another order date is
+        rejected rather than added as a second order.
+        """
+
+        self.client.post(
+            FULL_ORDER_URL, [order_payload('BRU00001')], format='json')
+
+        later = (time_now + datetime.timedelta(days=40)).isoformat()
+        res = self.client.post(
+            FULL_ORDER_URL,
+            [order_payload('BRU00001', order_date=later)],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(FullOrder.objects.count(), 1)
+
+    def test_order_number_with_two_dates_in_batch_rejected(self):
+        """Test a batch giving one order number two dates is rejected."""
+
+        later = (time_now + datetime.timedelta(days=40)).isoformat()
+        res = self.client.post(
+            FULL_ORDER_URL,
+            [order_payload('BRU00001'),
+             order_payload('BRU00001', order_date=later)],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(FullOrder.objects.exists())
+
+    def test_without_upsert_duplicates_rejected(self):
+        """Test bulk creates still reject numbers in use by default."""
+
+        url = reverse('orders:todays_orders-list')
+        self.client.post(url, [order_payload('BRU00001')], format='json')
+
+        res = self.client.post(
+            url, [order_payload('BRU00001')], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(TodaysOrder.objects.count(), 1)
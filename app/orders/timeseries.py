@@ -0,0 +1,77 @@
+"""
+Full Order sales bucketed by day, week or month.
+
+Buckets are computed in the database with 'date_trunc' over the
+order date in the current time zone; weeks start on Monday. The
+query reads only 'order_date', 'toothbrush_type', 'order_quantity'
+and 'delivery_date', all held by the covering index
+'fullorder_time_series_idx', so it runs as an index only scan over
+the partitions of the requested range.
+"""
+
+from django.db import connection
+from django.utils import timezone
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import FullOrder
+
+from orders.aggregations import order_filters
+
+
+INTERVALS = ('day', 'week', 'month')
+
+TIME_SERIES_SQL = """
+    SELECT
+        date_trunc(%(interval)s, o.order_date AT TIME ZONE %(time_zone)s)
+            ::date AS period,
+        {toothbrush_type}
+        COUNT(*) AS order_count,
+        SUM(o.order_quantity) AS units,
+        AVG(o.delivery_date - o.order_date) AS avg_delivery_delta
+    FROM {order_table} o {sample}
+    {where}
+    GROUP BY {group_by}
+    ORDER BY {group_by}
+"""
+
+
+def sales_over_time(interval='day', toothbrush_type=None, start=None,
+                    end=None, by_toothbrush_type=False, sample=None):
+    """
+    Return one dict per bucket holding its 'period' (first day),
+    'order_count', 'units' and 'avg_delivery_delta', oldest first.
+    Buckets without orders are left out.
+
+    With 'by_toothbrush_type' there is a row per toothbrush type in
+    each bucket, holding its 'toothbrush_type' too. With a 'sample'
+    (orders.approximate), counts and units are estimates.
+    """
+
+    if interval not in INTERVALS:
+        raise ValidationError(
+            {'interval': f'Expected one of {", ".join(INTERVALS)}.'})
+
+    params = {
+        'interval': interval,
+        'time_zone': timezone.get_current_timezone_name(),
+    }
+    group_by = 'period, o.toothbrush_type' if by_toothbrush_type else 'period'
+
+    sql = TIME_SERIES_SQL.format(
+        toothbrush_type='o.toothbrush_type,' if by_toothbrush_type else '',
+        order_table=connection.ops.quote_name(FullOrder._meta.db_table),
+        sample=sample.clause() if sample is not None else '',
+        where=order_filters(params, toothbrush_type, start, end),
+        group_by=group_by
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    if sample is not None:
+        sample.scale_rows(rows, ('order_count', 'units'), 'order_count')
+
+    return rows
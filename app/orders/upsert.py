@@ -0,0 +1,224 @@
+"""
+Idempotent bulk ingest of orders.
+
+Orders are written with 'INSERT ... ON CONFLICT DO UPDATE', so a
+retried batch updates the orders it already created instead of
+failing on their order numbers. Rows identical to the stored order
+are left alone, so a replay writes nothing.
+
+Each chunk is first inserted with 'ON CONFLICT DO NOTHING', which
+reports the orders it created. Only if some were already stored are
+those orders locked, and read for their rollups in the case of Full
+Orders, before the upsert updates the ones that differ: at most
+three statements per chunk.
+
+Each batch is sorted by its conflict key, so concurrent ingests
+lock the rows they share in the same order and never deadlock.
+"""
+
+from django.db import connection, transaction
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import FullOrder, TodaysOrder, NullOrder
+
+from orders.cache import (
+    bump_data_version,
+    FULL_ORDERS,
+    TODAYS_ORDERS,
+    NULL_ORDERS
+)
+from orders.importer import ORDER_COLUMNS
+from orders.rollups import record_full_orders_where, remove_full_orders
+
+
+UPSERT_COLUMNS = ORDER_COLUMNS + [
+    'delivery_postcode_id', 'billing_postcode_id']
+
+# Full Orders are partitioned by order date, so their unique key
+# includes it.
+CONFLICT_KEYS = {
+    FullOrder: ['order_number', 'order_date'],
+    TodaysOrder: ['order_number'],
+    NullOrder: ['order_number'],
+}
+
+DATA_VERSION_SCOPES = {
+    FullOrder: FULL_ORDERS,
+    TodaysOrder: TODAYS_ORDERS,
+    NullOrder: NULL_ORDERS,
+}
+
+CHUNK_SIZE = 1000
+
+# System columns such as 'xmax' cannot be returned from the
+# partitioned Full Order table, so inserts and updates are told apart
+# by running them as separate statements.
+INSERT_SQL = """
+    INSERT INTO {table} AS o ({columns}) VALUES {values}
+    ON CONFLICT ({conflict}) DO NOTHING
+    RETURNING o.id, {conflict}
+"""
+
+UPSERT_SQL = """
+    INSERT INTO {table} AS o ({columns}) VALUES {values}
+    ON CONFLICT ({conflict}) DO UPDATE SET {assignments}
+    WHERE ({current}) IS DISTINCT FROM ({excluded})
+    RETURNING o.id, {conflict}
+"""
+
+
+def _sql(template, model, rows):
+    conflict = CONFLICT_KEYS[model]
+    updated = [c for c in UPSERT_COLUMNS if c not in conflict]
+    placeholders = '(' + ', '.join(['%s'] * len(UPSERT_COLUMNS)) + ')'
+
+    return template.format(
+        table=connection.ops.quote_name(model._meta.db_table),
+        columns=', '.join(UPSERT_COLUMNS),
+        values=', '.join([placeholders] * rows),
+        conflict=', '.join(conflict),
+        assignments=', '.join(f'{c} = EXCLUDED.{c}' for c in updated),
+        current=', '.join(f'o.{c}' for c in updated),
+        excluded=', '.join(f'EXCLUDED.{c}' for c in updated)
+    )
+
+
+def _check_order_dates(orders):
+    """
+    Raise ValidationError if an order number of 'orders' is given
+    with two order dates, or a Full Order sharing it is stored with
+    another order date: upserting it would add a second order with
+    that order number, which FullOrderNumber refuses.
+    """
+
+    dates = {}
+    repeated = set()
+    for order in orders:
+        if dates.setdefault(order.order_number,
+                            order.order_date) != order.order_date:
+            repeated.add(order.order_number)
+
+    if repeated:
+        raise ValidationError({
+            'order_number': [
+                f'Order {n} is given with more than one order date.'
+                for n in sorted(repeated)
+            ]
+        })
+
+    stored = FullOrder.objects.filter(order_number__in=list(dates)) \
+        .values_list('order_number', 'order_date')
+
+    moved = sorted(n for n, date in stored if date != dates[n])
+    if moved:
+        raise ValidationError({
+            'order_number': [
+                f'Order {n} exists with another order date.' for n in moved
+            ]
+        })
+
+
+def _lock_stored(model, keys):
+    """
+    Lock the stored orders with the given conflict keys, in key
+    order, and return them by key. Full Orders come with their
+    delivery postcodes, for their rollup groups.
+    """
+
+    conflict = CONFLICT_KEYS[model]
+    stored = model.objects \
+        .filter(order_number__in=[key[0] for key in keys]) \
+        .order_by(*conflict) \
+        .select_for_update(of=('self',))
+
+    if model is FullOrder:
+        stored = stored.select_related('delivery_postcode')
+
+    keys = set(keys)
+    by_key = {}
+    for order in stored:
+        key = tuple(getattr(order, c) for c in conflict)
+        if key in keys:
+            by_key[key] = order
+
+    return by_key
+
+
+def upsert_orders(model, orders, chunk_size=CHUNK_SIZE):
+    """
+    Insert or update unsaved orders (with their postcodes resolved)
+    keyed on order number. A later order of a batch replaces an
+    earlier one with the same key.
+
+    Returns the number of orders inserted, updated, and left
+    unchanged because they matched the stored order.
+    """
+
+    conflict = CONFLICT_KEYS[model]
+    fields = [model._meta.get_field(c) for c in UPSERT_COLUMNS]
+
+    latest = {
+        tuple(getattr(order, c) for c in conflict): order
+        for order in orders
+    }
+    orders = [latest[key] for key in sorted(latest)]
+
+    counts = {'inserted': 0, 'updated': 0}
+    written_ids = []
+    previous = []
+
+    def execute(cursor, template, chunk):
+        params = [
+            field.get_db_prep_save(getattr(order, field.attname),
+                                   connection)
+            for order in chunk
+            for field in fields
+        ]
+        cursor.execute(_sql(template, model, len(chunk)), params)
+        return {tuple(row[1:]): row[0] for row in cursor.fetchall()}
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if model is FullOrder:
+            _check_order_dates(orders)
+
+        for i in range(0, len(orders), chunk_size):
+            chunk = orders[i:i + chunk_size]
+
+            inserted = execute(cursor, INSERT_SQL, chunk)
+            counts['inserted'] += len(inserted)
+            written_ids.extend(inserted.values())
+
+            rest = [
+                order for order in chunk
+                if tuple(getattr(order, c) for c in conflict)
+                not in inserted
+            ]
+            if not rest:
+                continue
+
+            stored = _lock_stored(
+                model, [tuple(getattr(o, c) for c in conflict)
+                        for o in rest])
+            updated = execute(cursor, UPSERT_SQL, rest)
+
+            for key, pk in updated.items():
+                # An order deleted since the insert is inserted again.
+                if key in stored:
+                    counts['updated'] += 1
+                    previous.append(stored[key])
+                else:
+                    counts['inserted'] += 1
+                written_ids.append(pk)
+
+        if model is FullOrder:
+            # Updated orders may have moved between groups.
+            remove_full_orders(previous)
+            if written_ids:
+                record_full_orders_where(
+                    'WHERE o.id = ANY(%s)', [written_ids])
+
+        bump_data_version(DATA_VERSION_SCOPES[model])
+
+    counts['unchanged'] = len(orders) - counts['inserted'] - counts['updated']
+    return counts
@@ -7,7 +7,8 @@ from orders.views import (
     NullOrderViewSet,
     CountToothbrushTypesViewSet,
     DeliveryPostcodeViewSet,
-    BillingPostcodeViewset
+    BillingPostcodeViewset,
+    IngestJobViewSet
 )
 
 from rest_framework.routers import DefaultRouter
@@ -21,6 +22,7 @@ router.register('todays_orders', TodaysOrderViewSet, basename='todays_orders')
 router.register('null_orders', NullOrderViewSet, basename='null_orders'),
 router.register('delivery_postcodes', DeliveryPostcodeViewSet, basename='delivery_postcodes')
 router.register('billing_postcodes', BillingPostcodeViewset, basename='billing_postcodes')
+router.register('jobs', IngestJobViewSet, basename='jobs')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,6 +1,6 @@
 """Views for Orders API"""
 
-from rest_framework import viewsets
+from rest_framework import viewsets, mixins
 from orders.serializers import (
     FullOrderSerializer,
     TodaysOrderSerializer,
@@ -17,24 +17,74 @@ from orders.serializers import (
     TBSalesByAgeSerializer,
     OrderQuantitySerializer,
     TotalOrdersSerializer,
-    DeliveryStatusSerializer
+    DeliveryStatusSerializer,
+    NullOrderCountSerializer,
+    SalesOverTimeSerializer,
+    DistributionSerializer,
+    OrderStatusUpdateSerializer,
+    IngestJobSerializer
+)
+from orders.importer import import_orders, guess_file_format, ImportFileError
+from orders.rollover import rollover_todays_orders
+from orders import exporter, statuses
+from orders.jobs import spool_upload
+from orders.pagination import OrderKeysetPagination, PostcodeKeysetPagination
+from orders.cache import (
+    DataVersionMixin,
+    cache_analytics,
+    FULL_ORDERS,
+    TODAYS_ORDERS,
+    NULL_ORDERS,
+    POSTCODES,
+    bump_data_version
+)
+from orders.rollups import (
+    full_data_from_rollups,
+    toothbrush_summary,
+    record_full_orders,
+    remove_full_orders
+)
+from orders.aggregations import (
+    aggregate_full_data,
+    summary_from_sections,
+    order_date_range,
+    order_filters
+)
+from orders.timeseries import sales_over_time, INTERVALS
+from orders.approximate import (
+    approximate_count,
+    sample_for,
+    wants_approximate,
+    with_approximation
+)
+from orders.distributions import (
+    distributions,
+    parse_percentiles,
+    parse_bins
 )
 from core.models import (
     FullOrder,
     TodaysOrder,
     NullOrder,
     DeliveryPostcode,
-    BillingPostcode
+    BillingPostcode,
+    IngestJob
 )
 
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 
-from django.db.models import Count, Avg, Max, Min, F, When, Case, Q
+from django.db import transaction, DataError, IntegrityError
+from django.http import StreamingHttpResponse
+from django.urls import reverse
 
-from functools import reduce
-import operator
+from psycopg2 import (
+    DataError as Psycopg2DataError,
+    IntegrityError as Psycopg2IntegrityError
+)
+from django.db.models import Count, ProtectedError
 
 from drf_spectacular.utils import (
     extend_schema_view,
@@ -43,9 +93,213 @@ from drf_spectacular.utils import (
     OpenApiTypes
 )
 
-import csv
+
+APPROXIMATE_PARAMETER = OpenApiParameter(
+    'approximate',
+    OpenApiTypes.BOOL,
+    description='Estimate from a sample of very large tables, reporting '
+                'the error bound under "approximation"'
+)
+
+# Analytics scoped to a period read the raw orders of that period
+# (only the partitions of its months) instead of the rollups.
+DATE_RANGE_PARAMETERS = [
+    OpenApiParameter(
+        'start_date',
+        OpenApiTypes.DATE,
+        description='Only orders placed on or after this date'
+    ),
+    OpenApiParameter(
+        'end_date',
+        OpenApiTypes.DATE,
+        description='Only orders placed on or before this date'
+    ),
+]
+
+
+class OrderExportMixin:
+    """
+    Adds an 'export' action streaming every order as CSV or NDJSON.
+    """
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'file_format',
+                OpenApiTypes.STR, enum=['csv', 'ndjson'],
+                description='Format of the export (default csv)'
+            )
+        ]
+    )
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream all orders without loading them into memory."""
+
+        file_format = request.query_params.get('file_format', 'csv')
+
+        if file_format not in exporter.STREAMS:
+            return Response(
+                {'detail': f'Unknown file format: {file_format}'},
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        model = self.queryset.model
+        queryset = model.objects.order_by('pk')
+
+        response = StreamingHttpResponse(
+            exporter.STREAMS[file_format](queryset),
+            content_type=exporter.CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{model._meta.db_table}.{file_format}"'
+        )
+
+        return response
+
+
+class OrderImportMixin:
+    """
+    Adds a bulk 'import' action loading a CSV or NDJSON upload
+    through Postgres COPY.
+    """
+
+    import_order_type = None
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'file_format',
+                OpenApiTypes.STR, enum=['csv', 'ndjson'],
+                description='Format of the uploaded file '
+                            '(guessed from its extension if omitted)'
+            )
+        ]
+    )
+    @action(methods=['POST'], detail=False, url_path='import',
+            parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """Import orders from an uploaded CSV or NDJSON file."""
+
+        upload = request.FILES.get('file')
+
+        if upload is None:
+            return Response(
+                {'detail': 'No file uploaded.'},
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        file_format = request.query_params.get(
+            'file_format', guess_file_format(upload.name))
+
+        try:
+            counts = import_orders(
+                upload, self.import_order_type, file_format)
+        except (ImportFileError, DataError, IntegrityError,
+                Psycopg2DataError, Psycopg2IntegrityError) as e:
+            return Response(
+                {'detail': str(e)},
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(counts, status.HTTP_201_CREATED)
+
+
+BULK_CREATE_PARAMETERS = [
+    OpenApiParameter(
+        'upsert',
+        OpenApiTypes.BOOL,
+        description='Update the orders of a bulk create whose order '
+                    'numbers exist instead of rejecting the batch'
+    ),
+    OpenApiParameter(
+        'skip_invalid',
+        OpenApiTypes.BOOL,
+        description='Create the valid orders of a bulk create and list '
+                    'the indexes and errors of the rest under "rejected"'
+    ),
+    OpenApiParameter(
+        'async',
+        OpenApiTypes.BOOL,
+        description='Queue a JSON list of orders for an ingest worker and '
+                    'return the job to poll at jobs/<id>; invalid orders '
+                    'are skipped'
+    ),
+]
+
+
+def _flag(request, name):
+    return request.query_params.get(name, '').lower() in ('1', 'true')
+
+
+class OrderBulkCreateMixin:
+    """
+    Options of bulk creates. With 'upsert=true' each order is inserted
+    or updated keyed on its order number, and the response counts the
+    orders inserted, updated and left unchanged. With
+    'skip_invalid=true' the valid orders are created and the rest are
+    listed by index with their errors, so a retry resends only those.
+    With 'async=true' the orders are queued for an ingest worker.
+    """
+
+    def queue_ingest(self, request):
+        """
+        Spool the request body for an ingest worker without parsing
+        it, and return the job.
+        """
+
+        if not request.content_type.startswith('application/json'):
+            return Response(
+                {'detail': 'Asynchronous ingest takes a JSON list of '
+                           'orders.'},
+                status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+
+        if request.stream is None:
+            return Response(
+                {'detail': 'No orders uploaded.'},
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        job = spool_upload(request.stream, self.import_order_type,
+                           upsert=_flag(request, 'upsert'))
+
+        return Response(
+            IngestJobSerializer(job).data,
+            status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('orders:jobs-detail',
+                                         args=[job.pk])}
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None:
+            context['upsert'] = _flag(self.request, 'upsert')
+            context['skip_invalid'] = _flag(self.request, 'skip_invalid')
+        return context
+
+    def created_response(self, serializer):
+        counts = getattr(serializer, 'upsert_counts', None)
+        rejected = getattr(serializer, 'rejected', None)
+
+        if rejected is None:
+            if counts is not None:
+                return Response(counts, status.HTTP_200_OK)
+            return Response(serializer.data, status.HTTP_201_CREATED)
+
+        if counts is not None:
+            return Response(dict(counts, rejected=rejected),
+                            status.HTTP_200_OK)
+
+        created = len(serializer.instance)
+        return Response(
+            {'created': created, 'rejected': rejected},
+            status.HTTP_201_CREATED if created or not rejected
+            else status.HTTP_400_BAD_REQUEST
+        )
+
 
 @extend_schema_view(
+    create=extend_schema(parameters=BULK_CREATE_PARAMETERS),
     list=extend_schema(
         parameters=[
             OpenApiParameter(
@@ -56,9 +310,14 @@ import csv
         ]
     )
 )
-class FullOrderViewSet(viewsets.ModelViewSet):
+class FullOrderViewSet(DataVersionMixin, OrderBulkCreateMixin,
+                       OrderImportMixin, OrderExportMixin,
+                       viewsets.ModelViewSet):
     serializer_class = FullOrderSerializer
     queryset = FullOrder.objects.all()
+    pagination_class = OrderKeysetPagination
+    import_order_type = 'full'
+    data_version_scopes = (FULL_ORDERS,)
 
     def get_serializer(self, *args, **kwargs):
         if isinstance(kwargs.get("data", {}), list):
@@ -77,228 +336,257 @@ class FullOrderViewSet(viewsets.ModelViewSet):
         return self.serializer_class
 
     def create(self, request, *args, **kwargs):
-
+        if _flag(request, 'async'):
+            return self.queue_ingest(request)
 
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
 
-        return Response(serializer.data, status.HTTP_201_CREATED)
+        return self.created_response(serializer)
+
+    def perform_update(self, serializer):
+        """
+        Update an order, moving it from the rollup groups of its
+        previous values to those of its new ones.
+        """
+
+        with transaction.atomic():
+            previous = FullOrder.objects \
+                .select_related('delivery_postcode') \
+                .select_for_update(of=('self',)) \
+                .get(pk=serializer.instance.pk)
+            order = serializer.save()
+            remove_full_orders([previous])
+            record_full_orders([order])
+
+    def perform_destroy(self, instance):
+        """Delete an order and take it out of its rollup groups."""
+
+        with transaction.atomic():
+            previous = FullOrder.objects \
+                .select_related('delivery_postcode') \
+                .select_for_update(of=('self',)) \
+                .get(pk=instance.pk)
+            instance.delete()
+            remove_full_orders([previous])
     
+    @extend_schema(parameters=DATE_RANGE_PARAMETERS + [APPROXIMATE_PARAMETER])
     @action(detail=False)
+    @cache_analytics(FULL_ORDERS)
     def get_full_data_by_tb_type(self, request):
         """
         Return comprehensive data for each
         toothbrush type.
         """
 
-        data_by_toothbrush = None
-        toothbrush_type = None
-
         toothbrush_type = ' '.join(request.query_params['toothbrush_type'].split('_'))
+        start, end = order_date_range(request.query_params)
+        sample = None
 
-        if toothbrush_type == 'toothbrush 2000':
-            data_by_toothbrush = FullOrder.objects.filter(
-                toothbrush_type__iexact=toothbrush_type
-            ).aggregate(
-                avg_customer_age=Avg('customer_age'),
-                avg_delivery_delta=Avg(F('delivery_date') - F('order_date')),
-                total_sales=Count('toothbrush_type')
-            )
+        if start is None and end is None:
+            data_by_toothbrush = toothbrush_summary(toothbrush_type)
         else:
-            data_by_toothbrush = FullOrder.objects.filter(
-                toothbrush_type__iexact=toothbrush_type
-            ).aggregate(
-                avg_customer_age=Avg('customer_age'),
-                avg_delivery_delta=Avg(F('delivery_date') - F('order_date')),
-                total_sales=Count('toothbrush_type')
-            )
+            sample = sample_for(FullOrder, request.query_params)
+            data_by_toothbrush = summary_from_sections(
+                aggregate_full_data(toothbrush_type, start, end, sample))
         
         serializer = TB2000FullDataSerializer(data_by_toothbrush)
 
-        return Response(serializer.data)
+        return Response(with_approximation(
+            dict(serializer.data), request.query_params, sample))
     
+    @extend_schema(
+        parameters=DATE_RANGE_PARAMETERS + [
+            OpenApiParameter(
+                'interval',
+                OpenApiTypes.STR, enum=list(INTERVALS),
+                description='Bucket size (default day)'
+            ),
+            OpenApiParameter(
+                'toothbrush_type',
+                OpenApiTypes.STR,
+                description='Only orders of this toothbrush type'
+            ),
+            OpenApiParameter(
+                'by_toothbrush_type',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='One row per toothbrush type in each bucket'
+            ),
+            APPROXIMATE_PARAMETER,
+        ],
+        responses=SalesOverTimeSerializer(many=True)
+    )
     @action(detail=False)
-    def get_full_data(self, request):
-
+    @cache_analytics(FULL_ORDERS)
+    def get_sales_over_time(self, request):
+        """
+        Return order counts, units sold and the average delivery
+        delta per day, week or month.
+        """
 
         toothbrush_type = None
-        data_by_postcode = None
-        tb_sales_by_age = None
-        total_orders = None
-        delivery_statuses = None
-        avg_delivery_delta = None
 
         if 'toothbrush_type' in request.query_params:
-            toothbrush_type = ' '.join(request.query_params['toothbrush_type'].split('_'))
+            toothbrush_type = ' '.join(
+                request.query_params['toothbrush_type'].split('_'))
+
+        start, end = order_date_range(request.query_params)
+        sample = sample_for(FullOrder, request.query_params)
+
+        buckets = sales_over_time(
+            request.query_params.get('interval', 'day'),
+            toothbrush_type,
+            start,
+            end,
+            by_toothbrush_type=request.query_params.get(
+                'by_toothbrush_type') == '1',
+            sample=sample
+        )
 
-            total_orders = FullOrder.objects.filter(
-                toothbrush_type__iexact=toothbrush_type).aggregate(
-                total_orders=Count('order_quantity')
-            )
+        serializer = SalesOverTimeSerializer(buckets, many=True)
 
-            delivery_statuses = FullOrder.objects.filter(
-                toothbrush_type__iexact=toothbrush_type).aggregate(
-                delivery_successful=Count('pk', filter=Q(delivery_status='Delivered')),
-                delivery_unsuccessful=Count('pk', filter=Q(delivery_status='Unsuccessful')),
-                delivery_in_transit=Count('pk', filter=Q(delivery_status='In Transit'))
-            )
+        if not wants_approximate(request.query_params):
+            return Response(serializer.data)
 
-            data_by_postcode = FullOrder.objects.filter(toothbrush_type__iexact=toothbrush_type).values(
-            'delivery_postcode__postcode_area'
-            ).annotate(
-                avg_customer_age=Avg('customer_age'),
-                total_tb_sales=Count('toothbrush_type'),
-                avg_delivery_delta=Avg(F('delivery_date') - F('order_date')),
-                tb_2000_sales=Count('pk', filter=Q(
-                    toothbrush_type='Toothbrush 2000')),
-                tb_4000_sales=Count('pk', filter=Q(
-                    toothbrush_type='Toothbrush 4000')
-                )
-            ).order_by('-total_tb_sales')
-
-            tb_sales_by_age = FullOrder.objects.filter(toothbrush_type__iexact=toothbrush_type).values(
-                'customer_age'
-            ).annotate(
-                total_sales=Count('toothbrush_type')
-            ).order_by('customer_age')
-
-             # Delivery Deltas
-            avg_delivery_delta = FullOrder.objects.filter(toothbrush_type__iexact=toothbrush_type).aggregate(
-                avg_delivery_delta=Avg(F('delivery_date') - F('order_date')),
-                max_delivery_delta=Max(F('delivery_date') - F('order_date')),
-                min_delivery_delta=Min(F('delivery_date') - F('order_date'))
-            )
+        return Response(with_approximation(
+            {'results': serializer.data}, request.query_params, sample))
 
-            # Customer Ages
-            customer_age = FullOrder.objects.filter(toothbrush_type__iexact=toothbrush_type).aggregate(
-                avg_customer_age=Avg('customer_age'),
-                max_customer_age=Max('customer_age'),
-                min_customer_age=Min('customer_age')
-            )
-        
-            data_by_postcode_serializer = FullPostcodeDataSerializer(data_by_postcode, many=True)
-            tb_sales_by_age_serializer = TBSalesByAgeSerializer(tb_sales_by_age, many=True)
-            total_orders_serializer = TotalOrdersSerializer(total_orders, many=False)
-            delivery_status_serializer = DeliveryStatusSerializer(delivery_statuses, many=False)
-            delivery_delta_serializer = DeliveryDeltaSerializer(avg_delivery_delta, many=False)
-            customer_age_serializer = CustomerAgeSerializer(customer_age, many=False)
+    @extend_schema(
+        parameters=DATE_RANGE_PARAMETERS + [
+            OpenApiParameter(
+                'percentiles',
+                OpenApiTypes.STR,
+                description='Comma separated percentiles (default 50,90,99)'
+            ),
+            OpenApiParameter(
+                'bins',
+                OpenApiTypes.INT,
+                description='Number of histogram bins (default 10)'
+            ),
+            OpenApiParameter(
+                'toothbrush_type',
+                OpenApiTypes.STR,
+                description='Only orders of this toothbrush type'
+            ),
+            OpenApiParameter(
+                'postcode_area',
+                OpenApiTypes.STR,
+                description='Only orders delivered to this postcode area'
+            ),
+            APPROXIMATE_PARAMETER,
+        ],
+        responses=DistributionSerializer
+    )
+    @action(detail=False)
+    @cache_analytics(FULL_ORDERS)
+    def get_distributions(self, request):
+        """
+        Return percentiles and histograms of the delivery delta
+        (in seconds) and customer age of full orders.
+        """
 
-            return Response({
-                'data_by_postcode': data_by_postcode_serializer.data,
-                'sales_by_age': tb_sales_by_age_serializer.data,
-                'total_orders': total_orders_serializer.data,
-                'delivery_statuses': delivery_status_serializer.data,
-                'avg_delivery_delta': delivery_delta_serializer.data,
-                'customer_age': customer_age_serializer.data
-            })
+        toothbrush_type = None
 
-        total_orders = FullOrder.objects.aggregate(
-            total_orders=Count('order_quantity')
+        if 'toothbrush_type' in request.query_params:
+            toothbrush_type = ' '.join(
+                request.query_params['toothbrush_type'].split('_'))
+
+        start, end = order_date_range(request.query_params)
+        sample = sample_for(FullOrder, request.query_params)
+
+        data = distributions(
+            parse_percentiles(request.query_params.get('percentiles')),
+            parse_bins(request.query_params.get('bins')),
+            toothbrush_type,
+            request.query_params.get('postcode_area'),
+            start,
+            end,
+            sample
         )
 
-        delivery_statuses = FullOrder.objects.aggregate(
-            delivery_successful=Count('pk', filter=Q(delivery_status='Delivered')),
-            delivery_unsuccessful=Count('pk', filter=Q(delivery_status='Unsuccessful')),
-            delivery_in_transit=Count('pk', filter=Q(delivery_status='In Transit'))
-        )
+        serializer = DistributionSerializer(data)
+        return Response(with_approximation(
+            dict(serializer.data), request.query_params, sample))
 
-        # Sales by Age
-        tb_sales_by_age = FullOrder.objects.values(
-                'customer_age'
-            ).annotate(
-                total_sales=Count('toothbrush_type')
-            ).order_by('customer_age')
-        
-        # FullOrder data by postcode
-        data_by_postcode = FullOrder.objects.values(
-            'delivery_postcode__postcode_area'
-        ).annotate(
-            avg_customer_age=Avg('customer_age'),
-            total_tb_sales=Count('toothbrush_type'),
-            avg_delivery_delta=Avg(F('delivery_date') - F('order_date')),
-            tb_2000_sales=Count('pk', filter=Q(
-                toothbrush_type='Toothbrush 2000')),
-            tb_4000_sales=Count('pk', filter=Q(
-                toothbrush_type='Toothbrush 4000'))
-
-        ).order_by('-total_tb_sales')
-
-        # Customer Ages
-        customer_age = FullOrder.objects.aggregate(
-                avg_customer_age=Avg('customer_age'),
-                max_customer_age=Max('customer_age'),
-                min_customer_age=Min('customer_age')
-            )
-        
-        # Delivery Deltas
-        avg_delivery_delta = FullOrder.objects.aggregate(
-            avg_delivery_delta=Avg(F('delivery_date') - F('order_date')),
-            max_delivery_delta=Max(F('delivery_date') - F('order_date')),
-            min_delivery_delta=Min(F('delivery_date') - F('order_date'))
-        )
+    @extend_schema(parameters=DATE_RANGE_PARAMETERS + [APPROXIMATE_PARAMETER])
+    @action(detail=False)
+    @cache_analytics(FULL_ORDERS)
+    def get_full_data(self, request):
+        """
+        Return dashboard data for all full orders,
+        or for a single toothbrush type if specified.
+        """
 
-        # Toothbrush Sales per Age
-        tb_sales_by_age = FullOrder.objects.values(
-            'customer_age'
-        ).annotate(
-            total_sales=Count('toothbrush_type')
-        ).order_by('customer_age')
-
-        # Order Quantities 
-        tb_2000_order_quantity = FullOrder.objects.filter(
-                toothbrush_type='Toothbrush 2000'
-            ).values('customer_age').annotate(
-                order_quantity=Count('order_quantity')
-            ).order_by('-order_quantity')
-        
+        toothbrush_type = None
 
-        tb_4000_order_quantity = FullOrder.objects.filter(
-            toothbrush_type__iexact='Toothbrush 4000'
-        ).values('customer_age').annotate(
-            order_quantity=Count('order_quantity')
-            ).order_by('-order_quantity')
-        
-        tb_2000_order_quantity_by_postcode = FullOrder.objects.filter(
-            toothbrush_type='Toothbrush 2000'
-        ).values('delivery_postcode__postcode_area').annotate(
-            order_quantity=Count('order_quantity')
-        ).order_by('-order_quantity')
-
-        tb_4000_order_quantity_by_postcode = FullOrder.objects.filter(
-            toothbrush_type='Toothbrush 4000'
-        ).values('delivery_postcode__postcode_area').annotate(
-            order_quantity=Count('order_quantity')
-        ).order_by('-order_quantity')
-
-        sales_by_age_serializer = TBSalesByAgeSerializer(tb_sales_by_age, many=True)
-        data_by_postcode_serializer = FullPostcodeDataSerializer(data_by_postcode, many=True)
-        customer_age_serializer = CustomerAgeSerializer(customer_age)
-        avg_delivery_delta_serializer = DeliveryDeltaSerializer(avg_delivery_delta)
-        tb_sales_by_age_serializer = TBSalesByAgeSerializer(tb_sales_by_age, many=True)
-        tb_2000_order_quantity_serializer = OrderQuantitySerializer(tb_2000_order_quantity, many=True)
-        tb_4000_order_quantity_serializer = OrderQuantitySerializer(tb_4000_order_quantity, many=True)
-        tb_2000_order_quantity_by_postcode_serializer = OrderQuantitySerializer(tb_2000_order_quantity_by_postcode, many=True)
-        tb_4000_order_quantity_by_postcode_serializer = OrderQuantitySerializer(tb_4000_order_quantity_by_postcode, many=True)
-        total_orders_serializer = TotalOrdersSerializer(total_orders, many=False)
-        delivery_status_serializer = DeliveryStatusSerializer(delivery_statuses, many=False)
+        if 'toothbrush_type' in request.query_params:
+            toothbrush_type = ' '.join(request.query_params['toothbrush_type'].split('_'))
 
-        return Response({
+        start, end = order_date_range(request.query_params)
+
+        sample = None
+
+        # The rollups are small whatever the number of orders, so
+        # only dated requests are ever sampled.
+        if start is None and end is None:
+            sections = full_data_from_rollups(toothbrush_type)
+        else:
+            sample = sample_for(FullOrder, request.query_params)
+            sections = aggregate_full_data(
+                toothbrush_type, start, end, sample)
+
+        data_by_postcode_serializer = FullPostcodeDataSerializer(
+            sections['data_by_postcode'], many=True)
+        sales_by_age_serializer = TBSalesByAgeSerializer(
+            sections['sales_by_age'], many=True)
+        total_orders_serializer = TotalOrdersSerializer(
+            sections['total_orders'], many=False)
+        delivery_status_serializer = DeliveryStatusSerializer(
+            sections['delivery_statuses'], many=False)
+        delivery_delta_serializer = DeliveryDeltaSerializer(
+            sections['avg_delivery_delta'], many=False)
+        customer_age_serializer = CustomerAgeSerializer(
+            sections['customer_age'], many=False)
+
+        if toothbrush_type is not None:
+            return Response(with_approximation({
+                'data_by_postcode': data_by_postcode_serializer.data,
+                'sales_by_age': sales_by_age_serializer.data,
+                'total_orders': total_orders_serializer.data,
+                'delivery_statuses': delivery_status_serializer.data,
+                'avg_delivery_delta': delivery_delta_serializer.data,
+                'customer_age': customer_age_serializer.data
+            }, request.query_params, sample))
+
+        tb_2000_order_quantity_serializer = OrderQuantitySerializer(
+            sections['tb_2000_orders_by_age'], many=True)
+        tb_4000_order_quantity_serializer = OrderQuantitySerializer(
+            sections['tb_4000_orders_by_age'], many=True)
+        tb_2000_order_quantity_by_postcode_serializer = (
+            OrderQuantitySerializer(
+                sections['tb_2000_orders_by_postcode'], many=True))
+        tb_4000_order_quantity_by_postcode_serializer = (
+            OrderQuantitySerializer(
+                sections['tb_4000_orders_by_postcode'], many=True))
+
+        return Response(with_approximation({
             'total_orders': total_orders_serializer.data,
             'sales_by_age': sales_by_age_serializer.data,
             'data_by_postcode': data_by_postcode_serializer.data,
-            'avg_delivery_delta': avg_delivery_delta_serializer.data,
+            'avg_delivery_delta': delivery_delta_serializer.data,
             'customer_age': customer_age_serializer.data,
-            'tb_sales_by_age': tb_sales_by_age_serializer.data,
+            'tb_sales_by_age': sales_by_age_serializer.data,
             'tb_2000_orders_by_age': tb_2000_order_quantity_serializer.data,
             'tb_2000_orders_by_postcode': tb_2000_order_quantity_by_postcode_serializer.data,
             'tb_4000_orders_by_age': tb_4000_order_quantity_serializer.data,
             'tb_4000_orders_by_postcode': tb_4000_order_quantity_by_postcode_serializer.data,
             'delivery_statuses': delivery_status_serializer.data
-        })
+        }, request.query_params, sample))
  
 
 @extend_schema_view(
+    create=extend_schema(parameters=BULK_CREATE_PARAMETERS),
     list=extend_schema(
         parameters=[
             OpenApiParameter(
@@ -314,17 +602,23 @@ class FullOrderViewSet(viewsets.ModelViewSet):
         ]
     )
 )
-class TodaysOrderViewSet(viewsets.ModelViewSet):
+class TodaysOrderViewSet(DataVersionMixin, OrderBulkCreateMixin,
+                         OrderImportMixin, OrderExportMixin,
+                         viewsets.ModelViewSet):
     serializer_class = TodaysOrderSerializer
     queryset = TodaysOrder.objects.all()
+    pagination_class = OrderKeysetPagination
+    import_order_type = 'todays'
+    data_version_scopes = (TODAYS_ORDERS,)
 
     def create(self, request, *args, **kwargs):
+        if _flag(request, 'async'):
+            return self.queue_ingest(request)
+
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        return Response(
-            serializer.data, status.HTTP_201_CREATED
-        )
+        return self.created_response(serializer)
 
     def get_serializer(self, *args, **kwargs):
         if isinstance(kwargs.get("data", {}), list):
@@ -350,14 +644,27 @@ class TodaysOrderViewSet(viewsets.ModelViewSet):
             
         return queryset
     
+    @extend_schema(parameters=[APPROXIMATE_PARAMETER])
     @action(methods=['GET'], detail=False)
+    @cache_analytics(TODAYS_ORDERS)
     def count(self, request):
         todays_order_count = None
         toothbrush_type = None
 
         if 'toothbrush_type' in request.query_params:
-            print('YES')
             toothbrush_type = ' '.join(request.query_params['toothbrush_type'].split('_'))
+
+        if wants_approximate(request.query_params):
+            params = {}
+            where = order_filters(params, toothbrush_type)
+            todays_order_count, approximation = approximate_count(
+                TodaysOrder, where, params)
+            return Response({
+                'count': todays_order_count,
+                'approximation': approximation
+            })
+
+        if toothbrush_type is not None:
             todays_order_count = TodaysOrder.objects.filter(toothbrush_type__iexact=toothbrush_type).count()
         else:
             todays_order_count = TodaysOrder.objects.all().count()
@@ -372,19 +679,56 @@ class TodaysOrderViewSet(viewsets.ModelViewSet):
         queryset.delete()
         return Response(status.HTTP_204_NO_CONTENT)
 
-    
+    @extend_schema(
+        request=OrderStatusUpdateSerializer(many=True),
+        responses={200: OpenApiTypes.OBJECT}
+    )
+    @action(methods=['PATCH'], detail=False, url_path='statuses')
+    def update_statuses(self, request):
+        """
+        Apply a batch of dispatch and delivery status changes, keyed
+        by order number, in one transaction. Returns the order
+        numbers matched and those not found.
+        """
+
+        serializer = OrderStatusUpdateSerializer(
+            data=request.data, many=True, allow_empty=False)
+        serializer.is_valid(raise_exception=True)
 
-class NullOrderViewSet(viewsets.ModelViewSet):
+        return Response(
+            statuses.update_statuses(serializer.validated_data))
+
+    @action(methods=['POST'], detail=False)
+    def rollover(self, request):
+        """
+        Move every Todays Order into Full Orders (complete delivery
+        details) or Null Orders (anything missing), then empty
+        Todays Orders, in one transaction.
+        """
+
+        return Response(rollover_todays_orders())
+
+
+@extend_schema_view(
+    create=extend_schema(parameters=BULK_CREATE_PARAMETERS)
+)
+class NullOrderViewSet(DataVersionMixin, OrderBulkCreateMixin,
+                       OrderImportMixin, OrderExportMixin,
+                       viewsets.ModelViewSet):
     serializer_class = NullOrderSerializer
     queryset = NullOrder.objects.all()
+    pagination_class = OrderKeysetPagination
+    import_order_type = 'null'
+    data_version_scopes = (NULL_ORDERS,)
 
     def create(self, request, *args, **kwargs):
+        if _flag(request, 'async'):
+            return self.queue_ingest(request)
+
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        return Response(
-            serializer.data, status.HTTP_201_CREATED
-        )
+        return self.created_response(serializer)
     
     def get_queryset(self):
         queryset = self.queryset
@@ -392,16 +736,14 @@ class NullOrderViewSet(viewsets.ModelViewSet):
         toothbrush_type = None
 
         if 'count_null_orders' in self.request.query_params:
-            print('HEYYYY')
             if 'toothbrush_type' in self.request.query_params:
-                toothbrush_type = ' '.join(request.query_params['toothbrush_type'].split('_'))
-                queryset = NullOrder.objects.filter(
+                toothbrush_type = ' '.join(
+                    self.request.query_params['toothbrush_type'].split('_'))
+                queryset = queryset.filter(
                     toothbrush_type__iexact=toothbrush_type
-                ).aggregate(null_order_count=Count('id'))
+                )
 
-                return queryset
-        else:
-            queryset = NullOrder.objects.aggregate(null_order_count=Count('id'))
+            return queryset.aggregate(null_order_count=Count('id'))
 
         return queryset
     
@@ -420,37 +762,80 @@ class NullOrderViewSet(viewsets.ModelViewSet):
             status.HTTP_204_NO_CONTENT
         )
     
+    @extend_schema(parameters=DATE_RANGE_PARAMETERS + [APPROXIMATE_PARAMETER])
     @action(detail=False)
     def get_null_orders(self, request):
         """Retrieve and return null orders."""
 
-        null_orders = None
+        null_orders = NullOrder.objects.all()
         toothbrush_type = None
 
         if 'toothbrush_type' in request.query_params:
             toothbrush_type = ' '.join(request.query_params['toothbrush_type'].split('_'))
-            null_orders = NullOrder.objects.filter(
+            null_orders = null_orders.filter(
                 toothbrush_type__iexact=toothbrush_type
-            ).aggregate(
-                null_order_count=Count('id')
-            )
-        else:
-            toothbrush_type = NullOrder.objects.aggregate(
-                null_order_count=Count('id')
             )
+
+        start, end = order_date_range(request.query_params)
+        if start is not None:
+            null_orders = null_orders.filter(order_date__gte=start)
+        if end is not None:
+            null_orders = null_orders.filter(order_date__lt=end)
+
+        if wants_approximate(request.query_params):
+            params = {}
+            where = order_filters(params, toothbrush_type, start, end)
+            count, approximation = approximate_count(NullOrder, where, params)
+            return Response({
+                'null_order_count': count,
+                'approximation': approximation
+            })
+
+        null_orders = null_orders.aggregate(null_order_count=Count('id'))
         
-        serializer = NullOrderCountSerializer(null_orders, many=True)
+        serializer = NullOrderCountSerializer(null_orders)
         return Response(serializer.data)
 
 
 class CountToothbrushTypesViewSet(viewsets.ModelViewSet):
     serializer_class = CountTBSerializer
     queryset = FullOrder.objects.filter(id=1)
+
+    @cache_analytics(FULL_ORDERS)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
 
-class DeliveryPostcodeViewSet(viewsets.ModelViewSet):
+class SharedPostcodeMixin:
+    """
+    Postcodes are shared by all of their orders: editing one
+    changes the postcode of every order to it, and one that
+    orders still use cannot be deleted.
+    """
+
+    def perform_update(self, serializer):
+        serializer.save()
+        bump_data_version(
+            POSTCODES, FULL_ORDERS, TODAYS_ORDERS, NULL_ORDERS)
+
+    def destroy(self, request, *args, **kwargs):
+        try:
+            return super().destroy(request, *args, **kwargs)
+        except ProtectedError:
+            return Response(
+                {'detail': 'Postcode is used by orders.'},
+                status.HTTP_409_CONFLICT
+            )
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        bump_data_version(POSTCODES)
+
+
+class DeliveryPostcodeViewSet(SharedPostcodeMixin, viewsets.ModelViewSet):
     serializer_class = DeliveryPostcodeSerializer
     queryset = DeliveryPostcode.objects.all()
+    pagination_class = PostcodeKeysetPagination
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -461,10 +846,32 @@ class DeliveryPostcodeViewSet(viewsets.ModelViewSet):
             status.HTTP_201_CREATED
         )
 
+    def perform_update(self, serializer):
+        """
+        Update a postcode, moving its Full Orders between postcode
+        area rollups if its area changes.
+        """
 
-class BillingPostcodeViewset(viewsets.ModelViewSet):
+        with transaction.atomic():
+            orders = list(
+                FullOrder.objects.select_related('delivery_postcode')
+                .filter(delivery_postcode=serializer.instance)
+            )
+            super().perform_update(serializer)
+            postcode = serializer.instance
+
+            if orders and (orders[0].delivery_postcode.postcode_area
+                           != postcode.postcode_area):
+                remove_full_orders(orders)
+                for order in orders:
+                    order.delivery_postcode = postcode
+                record_full_orders(orders)
+
+
+class BillingPostcodeViewset(SharedPostcodeMixin, viewsets.ModelViewSet):
     serializer_class = BillingPostcodeSerializer
     queryset = BillingPostcode.objects.all()
+    pagination_class = PostcodeKeysetPagination
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -475,3 +882,9 @@ class BillingPostcodeViewset(viewsets.ModelViewSet):
             status.HTTP_201_CREATED
         )
 
+
+class IngestJobViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Progress of the bulk uploads queued with 'async=true'."""
+
+    serializer_class = IngestJobSerializer
+    queryset = IngestJob.objects.all()
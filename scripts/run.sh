@@ -5,5 +5,23 @@ set -e
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
+# Create the Full Order partitions of the coming months. The
+# 'partitions' service of docker-compose-deploy.yml keeps creating
+# them daily; orders of a month without one wait in the default
+# partition, so inserts never fail for want of a partition.
+python manage.py create_order_partitions
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+# Workers write their metrics here; stale samples from a previous
+# run must not be added to the new totals.
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Ingest workers write the bulk uploads queued with 'async=true'.
+for i in $(seq "${INGEST_WORKERS:-2}"); do
+    python manage.py run_ingest_jobs &
+done
+
+# Each worker serves UWSGI_THREADS requests at a time from one pool of
+# database connections (see DB_POOL in app/settings.py).
+uwsgi --socket :9000 --workers 4 --threads "${UWSGI_THREADS:-1}" \
+    --master --enable-threads --module app.wsgi
\ No newline at end of file